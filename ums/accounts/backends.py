@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class RoleProfileBackend(ModelBackend):
+    """
+    ``ModelBackend`` that loads the user of each request together with its
+    ``Student`` / ``Faculty`` profile and that profile's department, in one
+    query.  ``request.user.student`` and ``request.user.faculty`` (and the
+    ``hasattr`` checks on them) then no longer hit the database; a missing
+    profile is cached as well and raises ``DoesNotExist`` without a query.
+    """
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = (
+                UserModel._default_manager
+                .select_related('student__department', 'faculty__department')
+                .get(pk=user_id)
+            )
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
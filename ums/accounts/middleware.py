@@ -0,0 +1,33 @@
+from django.core.exceptions import ObjectDoesNotExist
+
+from .permissions import Capabilities
+
+
+def get_role_profile(user):
+    """The ``Student`` or ``Faculty`` row of ``user``, or ``None``."""
+    if not user.is_authenticated:
+        return None
+    for attr in ('student', 'faculty'):
+        try:
+            return getattr(user, attr)
+        except ObjectDoesNotExist:
+            continue
+    return None
+
+
+class RoleProfileMiddleware:
+    """
+    Set ``request.role_profile`` to the signed-in user's ``Student`` or
+    ``Faculty`` profile (``None`` for admins, accountants and anonymous
+    users) and ``request.capabilities`` to what they may do (see
+    ``accounts.permissions``).  With ``accounts.backends.RoleProfileBackend``
+    the profile comes with the user query, so this costs nothing extra.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.role_profile = get_role_profile(request.user)
+        request.capabilities = Capabilities(request.user, request.role_profile)
+        return self.get_response(request)
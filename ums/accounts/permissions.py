@@ -0,0 +1,153 @@
+"""
+One place for "who may do what".
+
+``RoleProfileMiddleware`` puts a ``Capabilities`` object on every request::
+
+    request.capabilities.can(MANAGE_FEES)
+    request.capabilities.owns_course(course_id)
+    {% if 'teach' in request.capabilities %}
+
+The capability set itself comes from the user's role and profile, which are
+already loaded with the user (``accounts.backends.RoleProfileBackend``), so
+checking it costs no query.  The ids of the courses a teacher teaches or a
+student is enrolled in are read from the database once per request, on first
+use.  They decide what a user may open, so they are never kept in the cache:
+a teacher removed from a course loses access on their next request.
+
+Views are guarded with the decorators and mixin below instead of testing
+roles themselves.
+"""
+from functools import cached_property, wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.shortcuts import redirect
+
+from .models import CustomUser
+
+MANAGE_UNIVERSITY = 'manage_university'
+MANAGE_FEES = 'manage_fees'
+TEACH = 'teach'
+STUDY = 'study'
+
+DENIED_MESSAGES = {
+    MANAGE_UNIVERSITY: 'Access denied. Admin account required.',
+    MANAGE_FEES: 'Access denied. Accountant account required.',
+    TEACH: 'Access denied. Faculty account required.',
+    STUDY: 'Access denied. Student account required.',
+}
+
+BASE_TEMPLATES = [
+    (TEACH, 'teacher/base_teacher.html'),
+    (STUDY, 'student/base_student.html'),
+    (MANAGE_UNIVERSITY, 'base.html'),
+    (MANAGE_FEES, 'accountant/base_accountant.html'),
+]
+
+
+class Capabilities:
+    """What ``user`` (with its ``Student``/``Faculty`` ``profile``) may do."""
+
+    def __init__(self, user, profile=None):
+        self.user = user
+        self.profile = profile
+        self.perms = self._compute(user, profile)
+        self.department_id = getattr(profile, 'department_id', None)
+
+    @staticmethod
+    def _compute(user, profile):
+        if not user.is_authenticated:
+            return frozenset()
+        # Imported here: the profile models' apps import this module.
+        from faculty.models import Faculty
+        from students.models import Student
+
+        perms = set()
+        if user.is_superuser or user.role == CustomUser.Role.ADMIN:
+            perms |= {MANAGE_UNIVERSITY, MANAGE_FEES}
+        elif user.role == CustomUser.Role.ACCOUNTANT:
+            perms.add(MANAGE_FEES)
+        if isinstance(profile, Faculty):
+            perms.add(TEACH)
+        elif isinstance(profile, Student):
+            perms.add(STUDY)
+        return frozenset(perms)
+
+    def can(self, perm):
+        return perm in self.perms
+
+    def __contains__(self, perm):
+        return perm in self.perms
+
+    @cached_property
+    def course_ids(self):
+        """Ids of the courses taught (teachers) or taken (students); empty otherwise."""
+        if self.profile is None or not (self.can(TEACH) or self.can(STUDY)):
+            return frozenset()
+        from courses.models import Course
+
+        if self.can(TEACH):
+            return frozenset(Course.objects.filter(faculty=self.profile).values_list('id', flat=True))
+        return frozenset(Course.students.through.objects.filter(
+            student=self.profile).values_list('course_id', flat=True))
+
+    def owns_course(self, course_id):
+        """Whether ``course_id`` (an int or a string from a form) is one of ``course_ids``."""
+        try:
+            return int(course_id) in self.course_ids
+        except (TypeError, ValueError):
+            return False
+
+    @property
+    def base_template(self):
+        for perm, template in BASE_TEMPLATES:
+            if perm in self.perms:
+                return template
+        return 'base.html'
+
+
+def get_capabilities(request):
+    caps = getattr(request, 'capabilities', None)
+    if caps is None:
+        caps = request.capabilities = Capabilities(request.user, getattr(request, 'role_profile', None))
+    return caps
+
+
+def capability_required(perm):
+    """Decorator: user must be logged-in AND have ``perm``.  Works on async views too."""
+    def decorator(view_func):
+        def denied(request):
+            if not get_capabilities(request).can(perm):
+                messages.error(request, DENIED_MESSAGES[perm])
+                return redirect('login')
+            return None
+
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def wrapper(request, *args, **kwargs):
+                return denied(request) or await view_func(request, *args, **kwargs)
+        else:
+            @wraps(view_func)
+            def wrapper(request, *args, **kwargs):
+                return denied(request) or view_func(request, *args, **kwargs)
+        return login_required(wrapper)
+    return decorator
+
+
+admin_required = capability_required(MANAGE_UNIVERSITY)
+accountant_required = capability_required(MANAGE_FEES)
+faculty_required = capability_required(TEACH)
+student_required = capability_required(STUDY)
+
+
+class CapabilityRequiredMixin(LoginRequiredMixin):
+    """Class-based counterpart of ``capability_required``."""
+    required_capability = MANAGE_UNIVERSITY
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not get_capabilities(request).can(self.required_capability):
+            messages.error(request, DENIED_MESSAGES[self.required_capability])
+            return redirect('login')
+        return super().dispatch(request, *args, **kwargs)
@@ -1,3 +1,209 @@
-from django.test import TestCase
+from datetime import timedelta
+import os
+import tempfile
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.backends import RoleProfileBackend
+from accounts.middleware import get_role_profile
+from accounts.permissions import MANAGE_FEES, MANAGE_UNIVERSITY, STUDY, TEACH, Capabilities
+from courses.models import Course
+from core.benchmarks import load_baseline
+from core.tests.regression import SeededUniversity, reset_caches
+
+
+class RoleProfileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.uni = SeededUniversity(departments=1, students_per_department=1, attendance_sessions=1)
+
+    def test_backend_loads_profile_and_department_with_the_user(self):
+        backend = RoleProfileBackend()
+        with CaptureQueriesContext(connections['default']) as ctx:
+            student_user = backend.get_user(self.uni.student.user_id)
+            teacher_user = backend.get_user(self.uni.teacher.user_id)
+            admin = backend.get_user(self.uni.admin.pk)
+            self.assertEqual(get_role_profile(student_user), self.uni.student)
+            self.assertEqual(student_user.student.department, self.uni.department)
+            self.assertEqual(get_role_profile(teacher_user), self.uni.teacher)
+            self.assertEqual(teacher_user.faculty.department, self.uni.department)
+            self.assertIsNone(get_role_profile(admin))
+            self.assertFalse(hasattr(admin, 'student'))
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+    def test_role_decorators_use_request_role_profile(self):
+        self.client.force_login(self.uni.student.user)
+        self.assertEqual(self.client.get(reverse('student_dashboard')).status_code, 200)
+        response = self.client.get(reverse('teacher_dashboard'))
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+
+        self.client.force_login(self.uni.teacher.user)
+        response = self.client.get(reverse('attendance_list'))
+        self.assertEqual(response.wsgi_request.role_profile, self.uni.teacher)
+        self.assertTemplateUsed(response, 'teacher/base_teacher.html')
+
+    def test_session_user_and_profile_cost_one_query(self):
+        self.client.force_login(self.uni.student.user)
+        with CaptureQueriesContext(connections['default']) as ctx:
+            response = self.client.get(reverse('global_search'), {'q': 'zzz-no-match'})
+        self.assertTemplateUsed(response, 'student/base_student.html')
+        user_queries = [q for q in ctx.captured_queries if 'FROM "accounts_customuser"' in q['sql']
+                        and 'students_student' in q['sql']]
+        self.assertEqual(len(user_queries), 1)
+        self.assertFalse(any(q['sql'].startswith('SELECT') and 'FROM "students_student"' in q['sql']
+                             and 'WHERE "students_student"."user_id"' in q['sql']
+                             for q in ctx.captured_queries))
+
+
+class PermissionTests(TestCase):
+    """Capability sets come from the loaded user; course ownership is cached and invalidated."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.uni = SeededUniversity(departments=1, students_per_department=1, attendance_sessions=1)
+
+    def setUp(self):
+        reset_caches()
+        self.addCleanup(reset_caches)
+
+    def test_capability_sets_per_role(self):
+        uni = self.uni
+        self.assertEqual(Capabilities(uni.admin).perms, {MANAGE_UNIVERSITY, MANAGE_FEES})
+        self.assertEqual(Capabilities(uni.accountant).perms, {MANAGE_FEES})
+        teacher = Capabilities(uni.teacher.user, uni.teacher)
+        self.assertEqual(teacher.perms, {TEACH})
+        self.assertEqual(teacher.department_id, uni.department.pk)
+        self.assertEqual(teacher.base_template, 'teacher/base_teacher.html')
+        student = Capabilities(uni.student.user, uni.student)
+        self.assertEqual(student.perms, {STUDY})
+        self.assertEqual(student.course_ids, set(uni.student.enrolled_courses.values_list('id', flat=True)))
+
+    @override_settings(CACHE_SHARED=True)
+    def test_course_set_is_read_once_per_request_and_never_cached(self):
+        teacher, other = self.uni.teacher, self.uni.faculty[1]
+        caps = Capabilities(teacher.user, teacher)
+        with CaptureQueriesContext(connections['default']) as ctx:
+            self.assertTrue(caps.owns_course(str(self.uni.course.pk)))
+            self.assertTrue(caps.owns_course(self.uni.course.pk))
+            self.assertFalse(caps.owns_course('not-a-number'))
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        # Changed behind the signals' back, as another worker would see it
+        Course.objects.filter(pk=self.uni.course.pk).update(faculty=other)
+        self.assertFalse(Capabilities(teacher.user, teacher).owns_course(self.uni.course.pk))
+        self.assertTrue(Capabilities(other.user, other).owns_course(self.uni.course.pk))
+
+        student = self.uni.student
+        self.uni.course.students.remove(student)
+        self.assertFalse(Capabilities(student.user, student).owns_course(self.uni.course.pk))
+
+    def test_admin_views_refuse_other_roles(self):
+        for user in (self.uni.teacher.user, self.uni.student.user, self.uni.accountant):
+            self.client.force_login(user)
+            for url_name in ('course_list', 'exam_list', 'student_list', 'faculty_list'):
+                response = self.client.get(reverse(url_name))
+                self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.client.force_login(self.uni.accountant)
+        self.assertEqual(self.client.get(reverse('fee_payment_list')).status_code, 200)
+        self.client.force_login(self.uni.student.user)
+        response = self.client.get(reverse('fee_payment_list'))
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+
+    def test_teachers_only_open_attendance_of_their_courses(self):
+        other_course = Course.objects.exclude(faculty=self.uni.teacher).first()
+        attendance = other_course.attendance_set.first()
+        self.client.force_login(self.uni.teacher.user)
+        self.assertEqual(self.client.get(reverse('attendance_detail', args=[self.uni.attendance.pk])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('attendance_detail', args=[attendance.pk])).status_code, 404)
+
+    def test_dashboard_redirect_follows_capabilities(self):
+        for user, url_name in [(self.uni.admin, 'admin_dashboard'), (self.uni.accountant, 'accountant_dashboard'),
+                               (self.uni.teacher.user, 'teacher_dashboard'),
+                               (self.uni.student.user, 'student_dashboard')]:
+            self.client.force_login(user)
+            response = self.client.get(reverse('dashboard_redirect'))
+            self.assertRedirects(response, reverse(url_name), fetch_redirect_response=False)
+
+
+class SessionEngineTests(TestCase):
+    """Cached and cookie sessions spare the session table; expired rows are purged in batches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.uni = SeededUniversity(departments=1, students_per_department=1, attendance_sessions=1)
+
+    def setUp(self):
+        reset_caches()
+        self.addCleanup(reset_caches)
+
+    def session_queries(self):
+        with CaptureQueriesContext(connections['default']) as ctx:
+            self.assertEqual(self.client.get(reverse('student_profile')).status_code, 200)
+        return [q for q in ctx.captured_queries if 'django_session' in q['sql']]
+
+    def log_in(self, remember_me=True):
+        user = self.uni.student.user
+        user.set_password('pw-123456')
+        user.save()
+        data = {'username': user.username, 'password': 'pw-123456'}
+        if remember_me:
+            data['remember_me'] = 'on'
+        self.assertEqual(self.client.post(reverse('login'), data).status_code, 302)
+
+    def test_db_sessions_read_the_table(self):
+        self.log_in()
+        self.assertEqual(len(self.session_queries()), 1)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_db_sessions_are_read_from_the_cache(self):
+        self.log_in()
+        self.assertTrue(Session.objects.exists())
+        self.assertEqual(self.session_queries(), [])
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions_are_not_stored(self):
+        self.log_in(remember_me=False)
+        self.assertEqual(self.session_queries(), [])
+        self.assertFalse(Session.objects.exists())
+        # Without "remember me" the cookie ends with the browser session.
+        self.assertEqual(self.client.cookies['sessionid']['max-age'], '')
+
+    def test_purge_deletes_only_expired_sessions_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'old{i:029d}', session_data='', expire_date=now - timedelta(days=1)) for i in range(5)]
+            + [Session(session_key=f'new{i:029d}', session_data='', expire_date=now + timedelta(days=1)) for i in range(2)]
+        )
+        out = StringIO()
+        call_command('purge_sessions', dry_run=True, stdout=out)
+        self.assertIn('5 expired session(s)', out.getvalue())
+        self.assertEqual(Session.objects.count(), 7)
+
+        out = StringIO()
+        call_command('purge_sessions', batch_size=2, stdout=out)
+        self.assertIn('Deleted 5 expired session(s) in 3 batch(es)', out.getvalue())
+        self.assertEqual(sorted(Session.objects.values_list('session_key', flat=True))[0][:3], 'new')
+        self.assertEqual(Session.objects.count(), 2)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_purge_is_a_no_op_for_cookie_sessions(self):
+        out = StringIO()
+        call_command('purge_sessions', stdout=out)
+        self.assertIn('nothing to purge', out.getvalue())
+
+    def test_benchmark_command_compares_the_engines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'sessions.json')
+            call_command('benchmark_sessions', requests=2, warmup=0, baseline=path,
+                         save_baseline=True, stdout=StringIO())
+            baseline = load_baseline(path)
+        self.assertEqual(baseline['student_profile:db']['session_queries'], 1)
+        self.assertEqual(baseline['student_profile:cached_db']['session_queries'], 0)
+        self.assertEqual(baseline['student_profile:signed_cookies']['session_queries'], 0)
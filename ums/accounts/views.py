@@ -4,23 +4,20 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LoginView
 from django.contrib.auth import views as auth_views
-from .models import CustomUser
+from .permissions import MANAGE_FEES, MANAGE_UNIVERSITY, STUDY, TEACH, get_capabilities
+
+# First match wins: admins also have MANAGE_FEES.
+DASHBOARDS = [
+    (MANAGE_UNIVERSITY, 'admin_dashboard'),
+    (TEACH, 'teacher_dashboard'),
+    (STUDY, 'student_dashboard'),
+    (MANAGE_FEES, 'accountant_dashboard'),
+]
 
 class UMBaseTemplateMixin(LoginRequiredMixin):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-        if user.is_authenticated:
-            if user.role == CustomUser.Role.STUDENT:
-                context['base_template'] = 'student/base_student.html'
-            elif user.role == CustomUser.Role.FACULTY:
-                context['base_template'] = 'teacher/base_teacher.html'
-            elif user.role == CustomUser.Role.ACCOUNTANT:
-                context['base_template'] = 'accountant/base_accountant.html'
-            else:
-                context['base_template'] = 'base.html'
-        else:
-            context['base_template'] = 'base.html'
+        context['base_template'] = get_capabilities(self.request).base_template
         return context
 
 class MainPasswordChangeView(UMBaseTemplateMixin, auth_views.PasswordChangeView):
@@ -46,14 +43,8 @@ def profile(request):
 
 @login_required
 def dashboard_redirect(request):
-    user = request.user
-    if user.role == 'ADMIN' or user.is_superuser:
-        return redirect('admin_dashboard')
-    elif user.role == 'FACULTY':
-        return redirect('teacher_dashboard')
-    elif user.role == 'STUDENT':
-        return redirect('student_dashboard')
-    elif user.role == 'ACCOUNTANT':
-        return redirect('accountant_dashboard')
-    else:
-        return redirect('login') 
+    capabilities = get_capabilities(request)
+    for perm, url_name in DASHBOARDS:
+        if capabilities.can(perm):
+            return redirect(url_name)
+    return redirect('login')
@@ -0,0 +1,22 @@
+from django.contrib import admin
+from .models import ArchivedAttendanceRecord, ArchivedFeePayment, ArchivedResult
+
+
+@admin.register(ArchivedAttendanceRecord)
+class ArchivedAttendanceRecordAdmin(admin.ModelAdmin):
+    list_display = ('id', 'attendance', 'student', 'status')
+    raw_id_fields = ('attendance', 'student')
+
+
+@admin.register(ArchivedResult)
+class ArchivedResultAdmin(admin.ModelAdmin):
+    list_display = ('id', 'exam', 'student', 'marks_obtained')
+    raw_id_fields = ('exam', 'student')
+
+
+@admin.register(ArchivedFeePayment)
+class ArchivedFeePaymentAdmin(admin.ModelAdmin):
+    list_display = ('student', 'amount_paid', 'payment_date', 'term', 'status', 'receipt_no')
+    list_filter = ('term', 'status')
+    search_fields = ('student__enrollment_no', 'receipt_no')
+    raw_id_fields = ('student', 'collected_by')
@@ -0,0 +1,122 @@
+"""
+Read hot and archived rows as one.
+
+    for queryset in querysets(Result, term):
+        results += queryset.filter(student=student).select_related('exam')
+
+    results = rows(Result, term, lambda qs: qs.filter(student=student), key=lambda r: r.exam.date)
+
+``term`` is what ``core.terms.selected_term`` returns: a term label, or
+``None`` for every term.  A range is historical when it reaches into a closed
+academic year (one before the active term's), the only years
+``archive_closed_years`` moves rows out of.  Only then is the archive table
+read as well; pages about the current year never touch it.  Archived rows
+have the fields and lookups of the hot ones (``attendance__course``,
+``exam__date``...), so the same filters apply to both querysets.
+
+Calendar-date ranges (reports by month or year) use ``querysets_since``
+instead, with ``merged_rows`` / ``merged_total``::
+
+    payments = merged_rows(querysets_since(FeePayment, first_day), lambda qs: qs.filter(...))
+"""
+import datetime
+
+from django.conf import settings
+from django.http import Http404
+
+from attendance.models import AttendanceRecord
+from core.terms import active_term
+from examinations.models import Result
+from fees.models import FeePayment
+
+from .models import ArchivedAttendanceRecord, ArchivedFeePayment, ArchivedResult
+
+# hot model -> (archive model, lookup of the row's term)
+ARCHIVES = {
+    AttendanceRecord: (ArchivedAttendanceRecord, 'attendance__term'),
+    Result: (ArchivedResult, 'exam__term'),
+    FeePayment: (ArchivedFeePayment, 'term'),
+}
+
+
+def academic_year(term):
+    """``"2024-2025"`` for ``"2024-2025/2"``."""
+    return term.split('/')[0]
+
+
+def is_historical(term):
+    """Whether ``term`` (``None`` for every term) reaches into a closed academic year."""
+    return term is None or academic_year(term) < academic_year(active_term())
+
+
+def academic_year_start(term):
+    """The first day of ``term``'s academic year."""
+    return datetime.date(int(academic_year(term)[:4]), getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 7), 1)
+
+
+def querysets(model, term):
+    """The querysets holding ``model`` rows of ``term``: hot, then archived for historical ranges."""
+    archive_model, term_lookup = ARCHIVES[model]
+    found = [model.objects.all()]
+    if is_historical(term):
+        found.append(archive_model.objects.all())
+    if term:
+        found = [queryset.filter(**{term_lookup: term}) for queryset in found]
+    return found
+
+
+def querysets_since(model, day):
+    """
+    The querysets holding ``model`` rows dated ``day`` or later: hot, then
+    archived when ``day`` falls before the active academic year.
+    """
+    found = [model.objects.all()]
+    if day < academic_year_start(active_term()):
+        found.append(ARCHIVES[model][0].objects.all())
+    return found
+
+
+def merged_rows(querysets, build, key=None, reverse=False, limit=None):
+    """
+    ``build(queryset)`` evaluated over ``querysets`` and merged, sorted by
+    ``key`` when given.  With ``limit``, ``build`` should order its queryset
+    by the same key: each table then returns at most ``limit`` rows.
+    """
+    merged = []
+    for queryset in querysets:
+        queryset = build(queryset)
+        merged += queryset[:limit] if limit else queryset
+    if key is not None:
+        merged.sort(key=key, reverse=reverse)
+    return merged[:limit] if limit else merged
+
+
+def merged_total(querysets, build):
+    """``build(queryset)`` (an ``aggregate()`` dict of numbers) summed over ``querysets``."""
+    sums = {}
+    for queryset in querysets:
+        for name, value in build(queryset).items():
+            sums[name] = sums.get(name, 0) + (value or 0)
+    return sums
+
+
+def rows(model, term, build, key=None, reverse=False, limit=None):
+    """``merged_rows`` over ``querysets(model, term)``."""
+    return merged_rows(querysets(model, term), build, key, reverse, limit)
+
+
+def total(model, term, build):
+    """``merged_total`` over ``querysets(model, term)``."""
+    return merged_total(querysets(model, term), build)
+
+
+def get_payment(*related, **lookups):
+    """
+    The ``FeePayment`` matching ``lookups``, or its archived copy, with
+    ``related`` selected; ``Http404`` if neither table has it.
+    """
+    for model in (FeePayment, ArchivedFeePayment):
+        payment = model.objects.filter(**lookups).select_related(*related).first()
+        if payment is not None:
+            return payment
+    raise Http404('No payment matches the given query.')
@@ -0,0 +1,92 @@
+"""
+Move attendance records, results and fee payments of closed academic years
+into the archive tables.
+
+    python manage.py archive_closed_years --dry-run
+    python manage.py archive_closed_years
+    python manage.py archive_closed_years --before 2023-2024 --chunk-size 500
+
+A year is closed once the active term (``UniversitySetting``) has moved past
+it; by default every year before the active one is archived, ``--before``
+keeps more of them hot.  Rows move in chunks, each in its own transaction:
+copied into the archive table, then deleted from the hot one.  The command
+can be stopped and run again at any time.
+
+The admin dashboard totals still count archived rows, so the hot rows are
+deleted with raw SQL, which does not fire the signals that would subtract
+them (``core.counters`` adds the archive tables when rebuilding).  Cached
+pages built from the hot tables are invalidated once each table is done.
+"""
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from archive.history import ARCHIVES, academic_year
+from core.cache_versions import bump_generation
+from core.models import validate_academic_year
+from core.terms import active_term
+
+
+def closed_rows(model, before):
+    """The hot ``model`` rows of academic years before ``before``."""
+    term_lookup = ARCHIVES[model][1]
+    # Term labels start with their academic year, so this is a range on the term index
+    return model.objects.filter(**{f'{term_lookup}__lt': before}).exclude(**{term_lookup: ''})
+
+
+def archive_rows(model, before, chunk_size):
+    """Move ``closed_rows(model, before)`` to the archive; returns how many moved."""
+    archive_model = ARCHIVES[model][0]
+    fields = [field.attname for field in archive_model._meta.concrete_fields]
+    closed = closed_rows(model, before)
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(closed.select_for_update(of=('self',)).order_by('pk').values(*fields)[:chunk_size])
+            if not rows:
+                break
+            archive_model.objects.bulk_create([archive_model(**row) for row in rows], ignore_conflicts=True)
+            ids = [row['id'] for row in rows]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {model._meta.db_table} WHERE id IN ({", ".join(["%s"] * len(ids))})', ids
+                )
+        moved += len(rows)
+    if moved:
+        bump_generation(model)
+        bump_generation(archive_model)
+    return moved
+
+
+class Command(BaseCommand):
+    help = 'Move attendance records, results and fee payments of closed academic years to the archive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', default='',
+                            help='Archive academic years before this one (YYYY-YYYY). Default: the active year.')
+        parser.add_argument('--chunk-size', type=int, default=900, help='Rows moved per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would move.')
+
+    def handle(self, *args, **options):
+        current = academic_year(active_term())
+        before = options['before'] or current
+        try:
+            # Compared with term labels as a string: anything else picks the wrong years
+            validate_academic_year(before)
+        except ValidationError:
+            raise CommandError(f'--before must be an academic year written YYYY-YYYY, not "{before}".')
+        if before > current:
+            raise CommandError(f'{before} is not closed yet: the active academic year is {current}.')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        self.stdout.write(f'Archiving academic years before {before}')
+        for model, (archive_model, _) in ARCHIVES.items():
+            name = model._meta.verbose_name_plural
+            if options['dry_run']:
+                self.stdout.write(f'  {name}: {closed_rows(model, before).count()} to move')
+                continue
+            moved = archive_rows(model, before, options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'  {name}: {moved} moved, {archive_model.objects.count()} archived in total'
+            ))
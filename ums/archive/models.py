@@ -0,0 +1,51 @@
+"""
+Rows of closed academic years, moved out of the hot tables by
+``manage.py archive_closed_years``; ``archive.history`` reads them back.
+
+Each archive model has the columns of the model it archives and keeps its
+primary key, but none of its constraints and only one index, per student,
+which is how the historical pages read them.  Attendance sessions and exams
+stay where they are: they are small, and the archived rows point at them.
+"""
+from django.conf import settings
+from django.db import models
+
+from fees.models import FeePayment
+
+
+class ArchivedAttendanceRecord(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    attendance = models.ForeignKey('attendance.Attendance', on_delete=models.CASCADE, db_index=False)
+    student = models.ForeignKey('students.Student', on_delete=models.CASCADE)
+    status = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.student_id} - {self.attendance_id} (archived)"
+
+
+class ArchivedResult(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    exam = models.ForeignKey('examinations.Exam', on_delete=models.CASCADE, db_index=False)
+    student = models.ForeignKey('students.Student', on_delete=models.CASCADE)
+    marks_obtained = models.DecimalField(max_digits=5, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.student_id} - {self.exam_id} (archived)"
+
+
+class ArchivedFeePayment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey('students.Student', on_delete=models.CASCADE)
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_date = models.DateField()
+    term = models.CharField(max_length=20)
+    status = models.CharField(max_length=20, choices=FeePayment.Status.choices)
+    payment_mode = models.CharField(max_length=20, choices=FeePayment.PaymentMode.choices)
+    receipt_no = models.CharField(max_length=50, blank=True, null=True)
+    collected_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        db_index=False, related_name='+',
+    )
+
+    def __str__(self):
+        return f"{self.receipt_no} (archived)"
@@ -0,0 +1,120 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from archive import history
+from archive.models import ArchivedAttendanceRecord, ArchivedFeePayment, ArchivedResult
+from attendance.models import AttendanceRecord
+from core import counters
+from core.tests.regression import SeededUniversity, reset_caches
+from examinations.models import Result
+from fees.models import FeePayment
+
+OLD_TERM = '2001-2002/1'
+
+
+class ArchiveTests(TestCase):
+    """Closed academic years move to the archive tables and are still read back."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.uni = SeededUniversity(departments=1, courses_per_department=2, students_per_department=2)
+        # File the first session, exam and payment under a closed year
+        old_day = datetime.date(2001, 9, 3)
+        cls.uni.attendance.date = old_day
+        cls.uni.attendance.save()
+        cls.uni.exam.date = old_day
+        cls.uni.exam.save()
+        FeePayment.objects.filter(pk=cls.uni.payment.pk).update(payment_date=old_day, term=OLD_TERM)
+        counters.rebuild()
+
+    def setUp(self):
+        reset_caches()
+        self.addCleanup(reset_caches)
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_closed_years', *args, stdout=out)
+        return out.getvalue()
+
+    def test_moves_closed_years_in_chunks_and_keeps_the_counters(self):
+        records = set(AttendanceRecord.objects.filter(attendance=self.uni.attendance).values_list('pk', 'status'))
+        results = set(Result.objects.filter(exam=self.uni.exam).values_list('pk', 'marks_obtained'))
+        before = counters.read()
+
+        self.assertIn('to move', self.archive('--dry-run'))
+        self.assertFalse(ArchivedResult.objects.exists())
+        self.archive('--chunk-size', '1')
+
+        self.assertFalse(AttendanceRecord.objects.filter(attendance=self.uni.attendance).exists())
+        self.assertEqual(set(ArchivedAttendanceRecord.objects.values_list('pk', 'status')), records)
+        self.assertEqual(set(ArchivedResult.objects.values_list('pk', 'marks_obtained')), results)
+        self.assertEqual(list(ArchivedFeePayment.objects.values_list('pk', 'receipt_no')),
+                         [(self.uni.payment.pk, self.uni.payment.receipt_no)])
+        self.assertFalse(FeePayment.objects.filter(pk=self.uni.payment.pk).exists())
+        # Rows of the active year stay hot
+        self.assertTrue(Result.objects.exists())
+        self.assertEqual(counters.read(), before)
+        self.assertEqual(counters.compute(), before)
+
+        # Running it again moves nothing
+        self.assertIn('0 moved', self.archive())
+
+    def test_refuses_years_that_are_not_closed(self):
+        with self.assertRaises(CommandError):
+            self.archive('--before', '2999-3000')
+
+    def test_refuses_malformed_years(self):
+        for before in ('2023', '2023/24', '2023-2025', '2023-2024/1'):
+            with self.subTest(before=before), self.assertRaises(CommandError):
+                self.archive('--before', before)
+        self.assertFalse(ArchivedFeePayment.objects.exists())
+
+    def test_historical_pages_read_the_archive(self):
+        self.archive()
+        self.client.force_login(self.uni.admin)
+        url = reverse('student_detail', args=[self.uni.student.pk])
+
+        with CaptureQueriesContext(connections['default']) as ctx:
+            response = self.client.get(url)
+        self.assertNotIn(self.uni.payment, response.context['payments'])
+        self.assertFalse([q for q in ctx.captured_queries if 'archive_' in q['sql']])
+
+        for query in ({'term': 'all'}, {'term': OLD_TERM}):
+            response = self.client.get(url, query)
+            self.assertIn(self.uni.payment.receipt_no, [p.receipt_no for p in response.context['payments']])
+            self.assertIn(self.uni.exam.pk, [r.exam_id for r in response.context['results']])
+            self.assertTrue(response.context['attendance_records'])
+
+        response = self.client.get(reverse('fee_receipt_download_admin', args=[self.uni.payment.pk]))
+        self.assertEqual(response.status_code, 200)
+
+        self.client.force_login(self.uni.student.user)
+        response = self.client.get(reverse('student_my_results'), {'term': OLD_TERM})
+        self.assertEqual([r.exam_id for r in response.context['results']], [self.uni.exam.pk])
+        self.assertEqual(self.client.get(reverse('download_results_pdf')).status_code, 200)
+
+    def test_reports_include_archived_payments(self):
+        self.archive()
+        self.assertEqual(len(history.querysets_since(FeePayment, datetime.date(2001, 1, 1))), 2)
+        self.assertEqual(len(history.querysets_since(FeePayment, self.uni.today)), 1)
+        self.client.force_login(self.uni.accountant)
+        url = reverse('accountant_reports')
+        monthly = self.client.get(url, {'report_type': 'monthly', 'year': 2001, 'month': 9}).context
+        self.assertEqual([row[2] for row in monthly['report_data']], [self.uni.payment.receipt_no])
+        for report_type in ('annual', 'department'):
+            context = self.client.get(url, {'report_type': report_type, 'year': 2001, 'month': 1}).context
+            self.assertEqual(context['summary']['total_collected'], self.uni.payment.amount_paid)
+
+    def test_deleting_a_student_removes_their_archived_rows(self):
+        self.archive()
+        self.uni.student.delete()
+        self.assertFalse(ArchivedFeePayment.objects.filter(student_id=self.uni.student.pk).exists())
+        self.assertFalse(ArchivedResult.objects.filter(student_id=self.uni.student.pk).exists())
+        self.assertEqual(counters.read(), counters.compute())
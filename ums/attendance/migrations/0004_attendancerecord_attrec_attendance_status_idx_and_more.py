@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+def remove_duplicates(apps, schema_editor):
+    # Keep the latest record of each student per session.  Run
+    # "manage.py rebuild_counters" afterwards if any were removed.
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    duplicates = (
+        AttendanceRecord.objects.values('attendance', 'student')
+        .annotate(n=models.Count('id'), keep=models.Max('id')).filter(n__gt=1)
+    )
+    for row in duplicates:
+        AttendanceRecord.objects.filter(attendance=row['attendance'], student=row['student']).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_initial'),
+        ('students', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(fields=['attendance', 'status'], name='attrec_attendance_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(fields=['student', 'status'], name='attrec_student_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendancerecord',
+            constraint=models.UniqueConstraint(fields=('attendance', 'student'), name='unique_attendance_record'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def term_for_date(day):
+    # core.terms.term_for_date as of this migration, so later changes to it
+    # cannot change what the migration does
+    start_month = getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 7)
+    terms = getattr(settings, 'ACADEMIC_TERMS_PER_YEAR', 2)
+    first_year = day.year if day.month >= start_month else day.year - 1
+    term = (day.month - start_month) % 12 * terms // 12 + 1
+    return f'{first_year}-{first_year + 1}/{term}'
+
+
+def backfill_terms(apps, schema_editor):
+    # One UPDATE per term, over the distinct session dates
+    Attendance = apps.get_model('attendance', 'Attendance')
+    by_term = {}
+    for day in Attendance.objects.values_list('date', flat=True).distinct():
+        by_term.setdefault(term_for_date(day), []).append(day)
+    for term, days in by_term.items():
+        Attendance.objects.filter(date__in=days).update(term=term)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_attendancerecord_attrec_attendance_status_idx_and_more'),
+        ('courses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='term',
+            field=models.CharField(default='', editable=False, max_length=20),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_terms, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['term', 'course', 'date'], name='attendance_term_course_idx'),
+        ),
+    ]
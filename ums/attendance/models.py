@@ -1,18 +1,40 @@
 from django.conf import settings
 from django.db import models
 
+from core.terms import term_for_date
+
 class Attendance(models.Model):
     course = models.ForeignKey('courses.Course', on_delete=models.CASCADE)
     date = models.DateField()
+    # Academic term of ``date`` (core.terms), set on save
+    term = models.CharField(max_length=20, editable=False)
     marked_by = models.ForeignKey('faculty.Faculty', on_delete=models.SET_NULL, null=True)
 
     class Meta:
         unique_together = ('course', 'date')
+        indexes = [
+            # A term's sessions, per course
+            models.Index(fields=['term', 'course', 'date'], name='attendance_term_course_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.term = term_for_date(self.date)
+        super().save(*args, **kwargs)
 
 class AttendanceRecord(models.Model):
     attendance = models.ForeignKey(Attendance, on_delete=models.CASCADE)
     student = models.ForeignKey('students.Student', on_delete=models.CASCADE)
     status = models.BooleanField(default=True)  # True = Present, False = Absent
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['attendance', 'student'], name='unique_attendance_record'),
+        ]
+        indexes = [
+            # Present/absent counts per session and per student
+            models.Index(fields=['attendance', 'status'], name='attrec_attendance_status_idx'),
+            models.Index(fields=['student', 'status'], name='attrec_student_status_idx'),
+        ]
+
     def __str__(self):
         return f"{self.student.enrollment_no} - {self.attendance.date}"
@@ -1,3 +1,48 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from core.tests.regression import QueryCountMixin, SeededUniversity
+from courses.models import Course
+
+
+class AttendanceViewQueryCountTests(QueryCountMixin, TestCase):
+    """Every route in attendance/urls.py runs a flat number of queries."""
+
+    def get_cases(self):
+        uni = self.uni
+        admin, teacher = uni.admin, uni.teacher.user
+        return [
+            (admin, 'attendance_list', None, None, 6),
+            (admin, 'attendance_list', None, {'course': uni.course.pk}, 6),
+            (teacher, 'attendance_list', None, None, 6),
+            (admin, 'attendance_detail', {'pk': uni.attendance.pk}, None, 7),
+            (teacher, 'attendance_detail', {'pk': uni.attendance.pk}, None, 7),
+            (admin, 'attendance_export', None, None, 5),
+            (admin, 'attendance_export', None, {'course': uni.course.pk}, 5),
+            (teacher, 'attendance_export', None, None, 6),
+        ]
+
+
+class AttendanceExportTests(TestCase):
+    """The CSV export holds the sessions the list page shows the user."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.uni = SeededUniversity(departments=1, courses_per_department=2, students_per_department=1)
+
+    def export(self, user, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse('attendance_export'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_teachers_export_their_own_courses_only(self):
+        course = self.uni.course
+        other = Course.objects.exclude(faculty=self.uni.teacher).first()
+        self.assertIn(course.name, self.export(self.uni.teacher.user, course=course.pk))
+        self.assertNotIn(other.name, self.export(self.uni.teacher.user, course=other.pk))
+        self.assertNotIn(other.name, self.export(self.uni.teacher.user, course='None'))
+        self.assertIn(other.name, self.export(self.uni.admin, course=other.pk))
+
+    def test_other_roles_export_nothing(self):
+        self.assertEqual(self.export(self.uni.student.user).strip().splitlines(), ['Date,Course,Marked By'])
@@ -1,34 +1,27 @@
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.db.models import Count, Q
+from django.http import Http404
 from .models import Attendance, AttendanceRecord
+from accounts.permissions import MANAGE_UNIVERSITY, TEACH, get_capabilities
 from courses.models import Course
-from datetime import date
+from core.routers import read_from_replica
+
 
 @login_required
 def attendance_list(request):
-    attendances = Attendance.objects.select_related('course', 'marked_by').order_by('-date')
-    
-    # Determine user role and filter accordingly
-    if hasattr(request.user, 'faculty'):
-        faculty = request.user.faculty
-        attendances = attendances.filter(course__faculty=faculty)
-        courses = Course.objects.filter(faculty=faculty).order_by('name')
-    elif hasattr(request.user, 'student'):
-        # Students should probably use a different view or see their own records
-        # For now, restrict list view to admin/faculty
-        if not request.user.is_superuser:
-             # Basic restriction
-             attendances = attendances.none()
-             courses = Course.objects.none()
-        else:
-            courses = Course.objects.all().order_by('name')
+    attendances = Attendance.objects.select_related('course', 'marked_by', 'marked_by__user').order_by('-date')
+
+    # Admins see every session, teachers those of their own courses
+    capabilities = get_capabilities(request)
+    if capabilities.can(MANAGE_UNIVERSITY):
+        courses = Course.objects.all().order_by('name')
+    elif capabilities.can(TEACH):
+        attendances = attendances.filter(course_id__in=capabilities.course_ids)
+        courses = Course.objects.filter(id__in=capabilities.course_ids).order_by('name')
     else:
-        # Admin or specific staff
-        if not request.user.is_superuser and not request.user.is_staff:
-             attendances = attendances.none()
-             courses = Course.objects.none()
-        else:
-             courses = Course.objects.all().order_by('name')
+        attendances = attendances.none()
+        courses = Course.objects.none()
     
     # Filter
     course_id = request.GET.get('course')
@@ -42,38 +35,31 @@ def attendance_list(request):
     if end_date:
         attendances = attendances.filter(date__lte=end_date)
     
-    # Determine base template
-    base_template = 'base.html'
-    if hasattr(request.user, 'faculty'):
-        base_template = 'teacher/base_teacher.html'
-    elif hasattr(request.user, 'student'):
-        base_template = 'student/base_student.html'
-
     return render(request, 'attendance/attendance_list.html', {
         'attendances': attendances,
         'courses': courses,
         'selected_course': int(course_id) if course_id and course_id.isdigit() else None,
         'start_date': start_date,
         'end_date': end_date,
-        'base_template': base_template,
+        'base_template': capabilities.base_template,
     })
 
 @login_required
 def attendance_detail(request, pk):
-    attendance = get_object_or_404(Attendance, pk=pk)
-    records = AttendanceRecord.objects.filter(attendance=attendance).select_related('student')
+    attendance = get_object_or_404(
+        Attendance.objects.select_related('course', 'marked_by', 'marked_by__user'), pk=pk
+    )
+    capabilities = get_capabilities(request)
+    if not (capabilities.can(MANAGE_UNIVERSITY) or
+            capabilities.can(TEACH) and capabilities.owns_course(attendance.course_id)):
+        raise Http404('No Attendance matches the given query.')
+    records = AttendanceRecord.objects.filter(attendance=attendance).select_related('student', 'student__user')
     
-    total = records.count()
-    present = records.filter(status=True).count()
+    counts = records.aggregate(total=Count('id'), present=Count('id', filter=Q(status=True)))
+    total = counts['total']
+    present = counts['present']
     percentage = (present / total * 100) if total > 0 else 0
 
-    # Determine base template
-    base_template = 'base.html'
-    if hasattr(request.user, 'faculty'):
-        base_template = 'teacher/base_teacher.html'
-    elif hasattr(request.user, 'student'):
-        base_template = 'student/base_student.html'
-
     return render(request, 'attendance/attendance_detail.html', {
         'attendance': attendance,
         'records': records,
@@ -81,22 +67,31 @@ def attendance_detail(request, pk):
         'present': present,
         'absent': total - present,
         'percentage': round(percentage, 2),
-        'base_template': base_template,
+        'base_template': capabilities.base_template,
     })
 
 import csv
 from django.http import HttpResponse
 
 @login_required
+@read_from_replica()
 def attendance_export(request):
-    attendances = Attendance.objects.select_related('course', 'marked_by').order_by('-date')
+    attendances = Attendance.objects.select_related('course', 'marked_by', 'marked_by__user').order_by('-date')
+
+    # The sessions attendance_list shows: all for admins, teachers their own courses
+    capabilities = get_capabilities(request)
+    if capabilities.can(TEACH) and not capabilities.can(MANAGE_UNIVERSITY):
+        attendances = attendances.filter(course_id__in=capabilities.course_ids)
+    elif not capabilities.can(MANAGE_UNIVERSITY):
+        attendances = attendances.none()
     
     # Filter
     course_id = request.GET.get('course')
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
 
-    if course_id:
+    # The list page's Export button sends "None" when no course is selected
+    if course_id and course_id.isdigit():
         attendances = attendances.filter(course_id=course_id)
     if start_date:
         attendances = attendances.filter(date__gte=start_date)
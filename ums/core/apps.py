@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import cache_versions, counters, slow_queries, tracing, university  # noqa: F401 (signal receivers)
+        connection_created.connect(slow_queries.install, dispatch_uid='ums_slow_query_log')
+        connection_created.connect(tracing.install, dispatch_uid='ums_tracing')
+        cache_versions.connect_signals()
+        counters.connect_signals()
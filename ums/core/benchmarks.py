@@ -0,0 +1,126 @@
+"""
+Helpers shared by the benchmark management commands.
+
+Latency samples are collected in seconds and summarised in milliseconds.
+Summaries can be written to a JSON baseline file and later runs compared
+against it, so that a regression shows up as a number rather than a feeling.
+"""
+import json
+import math
+import os
+import platform
+import time
+
+import django
+from django.conf import settings
+from django.test import Client
+from django.utils import timezone
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples`` (``pct`` between 0 and 100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(samples, elapsed=None, errors=0):
+    """
+    Summarise latency ``samples`` (seconds) of one benchmarked endpoint.
+
+    ``elapsed`` is the wall time of the whole run and is used for the
+    throughput figure; it defaults to the sum of the samples (i.e. a run
+    without any concurrency).
+    """
+    if elapsed is None:
+        elapsed = sum(samples)
+    count = len(samples)
+    return {
+        'requests': count,
+        'errors': errors,
+        'p50_ms': round(percentile(samples, 50) * 1000, 2),
+        'p95_ms': round(percentile(samples, 95) * 1000, 2),
+        'p99_ms': round(percentile(samples, 99) * 1000, 2),
+        'mean_ms': round(sum(samples) / count * 1000, 2) if count else 0.0,
+        'max_ms': round(max(samples) * 1000, 2) if count else 0.0,
+        'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def timed(func, repeat):
+    """Call ``func`` ``repeat`` times and return the list of durations."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def logged_in_client(user):
+    """
+    A test client logged in as ``user`` that passes ``ALLOWED_HOSTS``, for
+    driving views in process outside the test runner.
+    """
+    host = next((h for h in settings.ALLOWED_HOSTS if h and not h.startswith('.') and h != '*'), 'localhost')
+    client = Client(HTTP_HOST=host)
+    client.force_login(user)
+    return client
+
+
+# ── Baseline files ──────────────────────────────────────────────────────────
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def load_baseline(path):
+    """Return the stored ``results`` mapping, or ``None`` if there is none yet."""
+    try:
+        with open(path) as fh:
+            return json.load(fh).get('results')
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, results, **meta):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = {
+        'created': timezone.now().isoformat(),
+        'environment': environment(),
+        **meta,
+        'results': results,
+    }
+    with open(path, 'w') as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
+
+
+def compare(results, baseline, tolerance=0.15, metric='p95_ms'):
+    """
+    Compare a run against a baseline.
+
+    Returns one row per benchmark with the baseline and current value of
+    ``metric`` and their relative change.  A row is a regression when the
+    metric got worse by more than ``tolerance`` (0.15 = 15 %).  Metrics
+    ending in ``_rps`` are "higher is better"; everything else is a latency.
+    """
+    higher_is_better = metric.endswith('_rps')
+    rows = []
+    for name, current in results.items():
+        before = (baseline or {}).get(name)
+        row = {'name': name, 'current': current[metric], 'baseline': None,
+               'change': None, 'regression': False}
+        if before and before.get(metric):
+            change = (current[metric] - before[metric]) / before[metric]
+            worse = -change if higher_is_better else change
+            row.update(baseline=before[metric], change=change, regression=worse > tolerance)
+        rows.append(row)
+    return rows
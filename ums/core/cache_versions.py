@@ -0,0 +1,136 @@
+"""
+Generational cache keys.
+
+Every model listed in ``CACHE_VERSIONED_MODELS`` has a generation counter in
+the shared cache, bumped by its ``post_save`` / ``post_delete`` signals (and
+``m2m_changed`` for course enrolment, which changes students' courses).
+Computed data is cached under a key that embeds the generations of the
+models it was built from::
+
+    stats = cached('admin_dashboard_stats', [Student, FeePayment], build_stats)
+
+Once any of those models changes, the key changes with it and the stale
+entry is simply never read again; it ages out of the cache on its own.
+
+Bulk operations (``QuerySet.update``, ``bulk_create``, raw SQL) bypass model
+signals - call ``bump_generation`` after them.  Signals fire before the
+surrounding transaction commits, so a bump made inside one is repeated on
+commit (``bump_generation``).
+
+A bump only reaches the processes sharing the cache.  With a per-process
+cache (``locmem://``, ``CACHE_SHARED`` off) the other workers would keep
+serving entries built before the change, so ``cached`` then builds every
+value afresh instead.
+"""
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .routers import reading_from_replica
+
+KEY_PREFIX = 'ums:gen:'
+
+
+def cache_is_shared():
+    """Whether every worker process reads and bumps the same generations."""
+    return getattr(settings, 'CACHE_SHARED', False)
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def _new_generation():
+    # Start from the clock rather than 1 so that a counter that was evicted
+    # from the cache can never come back with a number that was used before.
+    return int(time.time() * 1000)
+
+
+def get_generations(*models):
+    """``{label: generation}`` for ``models``, creating missing counters."""
+    keys = {KEY_PREFIX + _label(m): _label(m) for m in models}
+    found = cache.get_many(list(keys))
+    generations = {}
+    for key, label in keys.items():
+        value = found.get(key)
+        if value is None:
+            cache.add(key, _new_generation(), timeout=None)
+            value = cache.get(key)
+        generations[label] = value
+    return generations
+
+
+def _incr_generation(model):
+    key = KEY_PREFIX + _label(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_generation(), timeout=None)
+
+
+def bump_generation(model):
+    """
+    Invalidate every cached entry built from ``model``.  Inside a
+    transaction the generation moves on again once it commits: until then
+    other connections still read the old rows, and whatever they cached
+    under the first bump must not be read afterwards.
+    """
+    _incr_generation(model)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _incr_generation(model))
+
+
+def versioned_key(name, models, *parts):
+    """Cache key for ``name`` + ``parts`` at the current generations of ``models``."""
+    generations = get_generations(*models)
+    version = '.'.join(f'{label}={generations[label]}' for label in sorted(generations))
+    suffix = ':'.join(str(p) for p in parts)
+    return f'ums:v:{name}:{suffix}:{version}'
+
+
+def cached(name, models, builder, *parts, timeout=None):
+    """
+    Return ``builder()`` cached under ``versioned_key(name, models, *parts)``.
+    ``timeout`` defaults to ``CACHE_VERSIONED_TIMEOUT``, and is capped at
+    ``REPLICA_CACHE_TIMEOUT`` when ``builder`` reads from the replica.
+    Without a shared cache ``builder()`` is simply called.
+    """
+    if not cache_is_shared():
+        return builder()
+    key = versioned_key(name, models, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        if timeout is None:
+            timeout = getattr(settings, 'CACHE_VERSIONED_TIMEOUT', 3600)
+        if reading_from_replica():
+            # The replica may not have the write that bumped the generation yet
+            timeout = min(timeout, getattr(settings, 'REPLICA_CACHE_TIMEOUT', 60))
+        cache.set(key, value, timeout)
+    return value
+
+
+# ── Signal wiring ───────────────────────────────────────────────────────────
+def _bump_sender(sender, **kwargs):
+    bump_generation(sender)
+
+
+def _bump_enrollment(sender, action, model, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        Student = apps.get_model('students', 'Student')
+        bump_generation(Student)
+
+
+def connect_signals():
+    """Called from ``CoreConfig.ready``."""
+    for label in getattr(settings, 'CACHE_VERSIONED_MODELS', ()):
+        model = apps.get_model(label)
+        post_save.connect(_bump_sender, sender=model, dispatch_uid=f'ums_gen_save_{label}')
+        post_delete.connect(_bump_sender, sender=model, dispatch_uid=f'ums_gen_delete_{label}')
+
+    Course = apps.get_model('courses', 'Course')
+    m2m_changed.connect(_bump_enrollment, sender=Course.students.through, dispatch_uid='ums_gen_enrollment')
@@ -0,0 +1,82 @@
+"""
+Run the independent queries of an async view at the same time.
+
+    data = await fan_out(
+        attendance=lambda: records.aggregate(total=Count('id')),
+        results=lambda: list(Result.objects.filter(student=student)),
+    )
+    data['attendance'], data['results']
+
+Django's async ORM (``aget``, ``acount``...) still runs every query on the
+request's one thread, one after another.  ``fan_out`` instead hands each
+function to a small thread pool, so each runs on its own database connection
+and the queries overlap: the view waits for the slowest one, not for their
+sum.  The functions must return evaluated data (lists, dicts, numbers) -
+never lazy querysets, which would run later, serially, during rendering.
+
+The pool holds ``CONCURRENT_QUERY_WORKERS`` threads, which caps the extra
+database connections each process opens.  Query profiling and tracing follow
+the functions into the pool.  Everything runs serially on the request thread
+instead when ``CONCURRENT_QUERIES_ENABLED`` is off or while a transaction is
+open (other connections cannot see its uncommitted rows - in tests, for
+example).
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from .profiling import get_active_profile
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'CONCURRENT_QUERY_WORKERS', 4),
+                thread_name_prefix='ums-query',
+            )
+        return _executor
+
+
+def _in_transaction():
+    return any(conn.in_atomic_block for conn in connections.all(initialized_only=True))
+
+
+def _run_in_pool(func):
+    # Pool threads keep their connections between calls, like request threads.
+    close_old_connections()
+    profile = get_active_profile()
+    with ExitStack() as stack:
+        if profile is not None:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(profile.query_wrapper))
+        return func()
+
+
+def _run_serially(funcs):
+    return {name: func() for name, func in funcs.items()}
+
+
+async def fan_out(**funcs):
+    """``{name: func()}``, running the functions concurrently when possible."""
+    if not getattr(settings, 'CONCURRENT_QUERIES_ENABLED', True) or await sync_to_async(_in_transaction)():
+        return await sync_to_async(_run_serially)(funcs)
+
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    values = await asyncio.gather(*[
+        # A copy of the context per function carries the active profile and trace.
+        loop.run_in_executor(executor, contextvars.copy_context().run, _run_in_pool, func)
+        for func in funcs.values()
+    ])
+    return dict(zip(funcs, values))
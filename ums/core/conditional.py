@@ -0,0 +1,78 @@
+"""
+Conditional GET for pages that only change when their data does.
+
+    @student_required
+    @versioned_etag(Result, Exam, Course, Student)
+    def student_my_results(request): ...
+
+The ETag is a hash of the generation counters of the listed models (see
+``core.cache_versions``) plus what else ends up on the page for this user:
+their name and avatar, the CSRF cookie used by the logout form, the
+``UniversitySetting`` generation and today's date.  Working it out costs a
+single cache round trip, so a browser revalidating an unchanged page gets a
+304 without the view running at all.
+
+Responses are marked ``Cache-Control: private, no-cache`` so that browsers
+always revalidate and shared caches never store them.  No ETag is sent while
+flash messages are pending, as those are part of the page, nor without a
+cache shared by every worker (``CACHE_SHARED``): a worker that never saw a
+write's generation bump would keep answering 304 for the old page.  Views
+reading from the replica (``core.routers``) get no ETag either: the
+generations are the primary's, and a lagging replica would pair the new
+ETag with an old body that the browser then keeps revalidating.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .cache_versions import cache_is_shared, get_generations
+from .models import UniversitySetting
+from .routers import reading_from_replica
+
+
+def page_etag(request, models):
+    """The ETag for ``request`` over ``models``, or ``None`` to skip it."""
+    if not getattr(settings, 'CONDITIONAL_GET_ENABLED', True) or not cache_is_shared():
+        return None
+    if reading_from_replica():
+        return None
+    if len(messages.get_messages(request)):
+        return None
+
+    user = request.user
+    generations = get_generations(UniversitySetting, *models)
+    parts = [
+        getattr(settings, 'ETAG_SALT', ''),
+        user.pk, user.username, user.get_full_name(), user.profile_image.name or '',
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        timezone.localdate().isoformat(),
+    ]
+    parts += [f'{label}={generations[label]}' for label in sorted(generations)]
+    return hashlib.sha256('|'.join(str(p) for p in parts).encode()).hexdigest()[:32]
+
+
+def conditional_view(view_func, etag_func):
+    """``view_func`` answering ``If-None-Match`` from ``etag_func``, never cached by proxies."""
+    conditional = condition(etag_func=etag_func)(view_func)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = conditional(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return wrapper
+
+
+def versioned_etag(*models):
+    """Answer ``If-None-Match`` from the data versions of ``models``."""
+    def etag_func(request, *args, **kwargs):
+        return page_etag(request, models)
+
+    def decorator(view_func):
+        return conditional_view(view_func, etag_func)
+    return decorator
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .cache_versions import cache_is_shared, get_generations
+from .models import UniversitySetting
+from .university import get_university_settings
+
+
+def university(request):
+    """
+    Expose the cached ``UniversitySetting`` as ``{{ university }}``.  Lazy,
+    so pages that never use it don't even touch the cache.
+    """
+    return {'university': SimpleLazyObject(get_university_settings)}
+
+
+def fragment_cache(request):
+    """
+    Timeout and version for ``{% cache %}`` blocks such as the role sidebars.
+    The version is the ``UniversitySetting`` generation, so saving the
+    settings page invalidates every cached fragment.  A per-process cache
+    only sees its own process' bumps, so there fragments live no longer
+    than the process' copy of the settings.
+    """
+    timeout = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 600)
+    if not cache_is_shared():
+        timeout = min(timeout, getattr(settings, 'UNIVERSITY_SETTINGS_LOCAL_TTL', 30))
+    return {
+        'fragment_cache_timeout': timeout,
+        'fragment_cache_version': SimpleLazyObject(_settings_generation),
+    }
+
+
+def _settings_generation():
+    return str(get_generations(UniversitySetting)[UniversitySetting._meta.label_lower])
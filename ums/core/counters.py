@@ -0,0 +1,193 @@
+"""
+Running totals for the admin dashboard.
+
+Counting students or summing every fee payment on each dashboard load gets
+slower as the tables grow.  Instead each figure lives in a
+``DashboardCounter`` row that is adjusted by the ``post_save`` /
+``post_delete`` signals of the model it counts, with a single ``UPDATE``.
+Inside an ``atomic`` block the adjustment commits or rolls back with the
+change; in autocommit the signal only fires once the change has committed,
+so a crash in between leaves the counter behind.  The counters are
+therefore eventually consistent: ``rebuild_counters --check`` reports any
+drift and ``rebuild_counters`` repairs it.  Reading every counter is one
+query.
+
+Code that writes with ``bulk_create`` / ``update`` / raw SQL bypasses the
+signals and must call ``adjust`` itself (see ``teacher_take_attendance``).
+``manage.py rebuild_counters`` recomputes everything from the source tables;
+run it after imports, or from cron as a reconciler (``--check`` only reports
+drift).  Revenue and attendance include the rows moved to the archive tables
+(``archive_closed_years``), which are counted until they are deleted.
+
+Every write bumps the ``DashboardCounter`` generation (``core.cache_versions``)
+so that whatever is cached from the counters is invalidated with them.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, Sum, When
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .cache_versions import bump_generation
+from .models import DashboardCounter
+
+CENT = Decimal('0.01')
+
+
+def _attendance():
+    from attendance.models import AttendanceRecord
+    return AttendanceRecord
+
+
+def _archives():
+    from archive.models import ArchivedAttendanceRecord, ArchivedFeePayment
+    return ArchivedAttendanceRecord, ArchivedFeePayment
+
+
+def _count(model_path):
+    def compute():
+        from django.apps import apps
+        return apps.get_model(model_path).objects.count()
+    return compute
+
+
+def _revenue():
+    from fees.models import FeePayment
+    return sum(
+        model.objects.aggregate(total=Sum('amount_paid'))['total'] or 0
+        for model in (FeePayment, _archives()[1])
+    )
+
+
+def _attendance_records():
+    return _attendance().objects.count() + _archives()[0].objects.count()
+
+
+def _attendance_present():
+    return sum(model.objects.filter(status=True).count() for model in (_attendance(), _archives()[0]))
+
+
+# name -> function computing the value from the source tables
+COUNTERS = {
+    'students': _count('students.Student'),
+    'teachers': _count('faculty.Faculty'),
+    'courses': _count('courses.Course'),
+    'revenue': _revenue,
+    'attendance_records': _attendance_records,
+    'attendance_present': _attendance_present,
+}
+
+
+def read():
+    """
+    ``{name: Decimal}`` for every counter.  The rows are created by the
+    ``core`` migrations; a missing one reads as zero until
+    ``rebuild_counters`` recreates it, so that a page load never writes.
+    """
+    values = dict(DashboardCounter.objects.values_list('name', 'value'))
+    return {name: values.get(name, Decimal(0)) for name in COUNTERS}
+
+
+def adjust(**deltas):
+    """Add ``deltas`` (``name=amount``) to the counters in one ``UPDATE``."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    DashboardCounter.objects.filter(name__in=deltas).update(value=Case(
+        *[When(name=name, then=F('value') + Decimal(str(delta))) for name, delta in deltas.items()],
+        default=F('value'),
+    ))
+    bump_generation(DashboardCounter)
+
+
+def compute():
+    """Every counter recomputed from the source tables."""
+    # Rounded like the column; SQLite sums decimals as floats.
+    return {name: Decimal(str(func())).quantize(CENT) for name, func in COUNTERS.items()}
+
+
+def rebuild():
+    """
+    Recompute and store every counter.  The counter rows are locked for the
+    duration so that concurrent adjustments wait instead of being lost.
+    """
+    with transaction.atomic():
+        DashboardCounter.objects.bulk_create(
+            [DashboardCounter(name=name) for name in COUNTERS], ignore_conflicts=True
+        )
+        rows = {row.name: row for row in DashboardCounter.objects.select_for_update().filter(name__in=COUNTERS)}
+        values = compute()
+        for name, value in values.items():
+            rows[name].value = value
+        DashboardCounter.objects.bulk_update(rows.values(), ['value'])
+    bump_generation(DashboardCounter)
+    return values
+
+
+# ── Signal wiring ───────────────────────────────────────────────────────────
+def _row_counter(name):
+    def created_or_deleted(sender, instance, created=None, **kwargs):
+        if created is None:  # post_delete
+            adjust(**{name: -1})
+        elif created:
+            adjust(**{name: 1})
+    return created_or_deleted
+
+
+def _remember_old(field):
+    """``pre_save``: keep the stored value of ``field`` for ``post_save``."""
+    def receiver(sender, instance, update_fields=None, **kwargs):
+        instance._counter_old = None
+        if instance._state.adding or (update_fields is not None and field not in update_fields):
+            return
+        instance._counter_old = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    return receiver
+
+
+def _payment_saved(sender, instance, created, **kwargs):
+    old = getattr(instance, '_counter_old', None)
+    if created:
+        adjust(revenue=instance.amount_paid)
+    elif old is not None:
+        adjust(revenue=Decimal(str(instance.amount_paid)) - old)
+
+
+def _payment_deleted(sender, instance, **kwargs):
+    adjust(revenue=-Decimal(str(instance.amount_paid)))
+
+
+def _record_saved(sender, instance, created, **kwargs):
+    old = getattr(instance, '_counter_old', None)
+    if created:
+        adjust(attendance_records=1, attendance_present=int(bool(instance.status)))
+    elif old is not None:
+        adjust(attendance_present=int(bool(instance.status)) - int(bool(old)))
+
+
+def _record_deleted(sender, instance, **kwargs):
+    adjust(attendance_records=-1, attendance_present=-int(bool(instance.status)))
+
+
+def connect_signals():
+    """Called from ``CoreConfig.ready``."""
+    from django.apps import apps
+
+    for name, label in (('students', 'students.Student'), ('teachers', 'faculty.Faculty'),
+                        ('courses', 'courses.Course')):
+        model = apps.get_model(label)
+        receiver = _row_counter(name)
+        post_save.connect(receiver, sender=model, weak=False, dispatch_uid=f'ums_counter_save_{name}')
+        post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=f'ums_counter_delete_{name}')
+
+    FeePayment = apps.get_model('fees', 'FeePayment')
+    AttendanceRecord = _attendance()
+    for model, field, saved, deleted in ((FeePayment, 'amount_paid', _payment_saved, _payment_deleted),
+                                         (AttendanceRecord, 'status', _record_saved, _record_deleted)):
+        pre_save.connect(_remember_old(field), sender=model, weak=False, dispatch_uid=f'ums_counter_old_{model._meta.label_lower}')
+        post_save.connect(saved, sender=model, dispatch_uid=f'ums_counter_save_{model._meta.label_lower}')
+        post_delete.connect(deleted, sender=model, dispatch_uid=f'ums_counter_delete_{model._meta.label_lower}')
+
+    # Archived rows only ever leave with their student, exam or session
+    ArchivedAttendanceRecord, ArchivedFeePayment = _archives()
+    for model, deleted in ((ArchivedFeePayment, _payment_deleted), (ArchivedAttendanceRecord, _record_deleted)):
+        post_delete.connect(deleted, sender=model, dispatch_uid=f'ums_counter_delete_{model._meta.label_lower}')
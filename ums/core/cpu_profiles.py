@@ -0,0 +1,149 @@
+"""
+On-demand cProfile capture of a single request.
+
+A superuser adds ``?_profile=1`` (or the ``X-UMS-Profile: 1`` header) to any
+URL.  ``core.middleware.CProfileMiddleware`` then runs the rest of the request
+under cProfile - view, template rendering and xhtml2pdf included - and saves
+the result as a ``.pstats`` file in ``CPU_PROFILE_DIR``.  The files can be
+downloaded for ``snakeviz`` / ``python -m pstats`` or browsed as a call tree on
+the admin "CPU profiles" page.
+"""
+import os
+import pstats
+import re
+
+from django.conf import settings
+from django.utils import timezone
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-UMS-Profile'
+FILENAME_RE = re.compile(r'^[\w.-]+\.pstats$')
+
+
+def profile_dir():
+    return str(getattr(settings, 'CPU_PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def wants_profile(request):
+    """True if a superuser asked for this request to be profiled."""
+    flag = request.GET.get(PROFILE_PARAM) or request.headers.get(PROFILE_HEADER)
+    if flag in (None, '', '0', 'false'):
+        return False
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_superuser)
+
+
+def profiled_request(get_response, request):
+    """
+    Entry point handed to ``Profile.runcall``.  The middleware chain calls
+    itself recursively, so a dedicated frame is needed as the call tree root.
+    """
+    return get_response(request)
+
+
+def save_profile(profiler, request, status_code):
+    """Dump ``profiler`` to a new ``.pstats`` file and return its name."""
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    match = getattr(request, 'resolver_match', None)
+    label = (match.url_name if match and match.url_name else 'request')
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S-%f')
+    name = f'{stamp}_{label}_{status_code}.pstats'
+    profiler.dump_stats(os.path.join(directory, name))
+    prune_profiles()
+    return name
+
+
+def prune_profiles():
+    """Keep only the newest ``CPU_PROFILE_KEEP`` files."""
+    keep = getattr(settings, 'CPU_PROFILE_KEEP', 50)
+    for name in list_profiles()[keep:]:
+        try:
+            os.remove(os.path.join(profile_dir(), name))
+        except OSError:
+            pass
+
+
+def list_profiles():
+    """Stored profile file names, newest first."""
+    try:
+        names = os.listdir(profile_dir())
+    except FileNotFoundError:
+        return []
+    return sorted((n for n in names if FILENAME_RE.match(n)), reverse=True)
+
+
+def profile_path(name):
+    """Absolute path of a stored profile, or ``None`` for unknown/unsafe names."""
+    if not FILENAME_RE.match(name):
+        return None
+    path = os.path.join(profile_dir(), name)
+    return path if os.path.isfile(path) else None
+
+
+# ── Call tree ───────────────────────────────────────────────────────────────
+def describe(func):
+    filename, line, name = func
+    if filename == '~':
+        return name  # builtins, e.g. "<built-in method time.sleep>"
+    parts = filename.replace('\\', '/').split('/')
+    short = '/'.join(parts[-2:])
+    return f'{name} ({short}:{line})'
+
+
+def load_stats(path):
+    return pstats.Stats(path)
+
+
+def top_functions(stats, sort='cumulative', limit=40):
+    """Rows of the most expensive functions, as shown by ``print_stats``."""
+    rows = []
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        rows.append({
+            'function': describe(func), 'calls': nc, 'primitive_calls': cc,
+            'tottime': tt, 'cumtime': ct,
+        })
+    key = 'cumtime' if sort == 'cumulative' else 'tottime'
+    rows.sort(key=lambda r: r[key], reverse=True)
+    return rows[:limit]
+
+
+def call_tree(stats, min_fraction=0.01, max_depth=40):
+    """
+    Build a nested call tree from profile ``stats``.
+
+    The time of a child node is the cumulative time spent in it *when called
+    from its parent*, so the widths add up the way a flame graph does.
+    Branches cheaper than ``min_fraction`` of the total are dropped.
+    """
+    callees = {}
+    roots = []
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        if not callers:
+            roots.append(func)
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3], edge[1]))
+
+    total = stats.total_tt or sum(stats.stats[f][3] for f in roots) or 1.0
+    cutoff = total * min_fraction
+
+    def node(func, cumtime, calls, path, depth):
+        children = []
+        if depth < max_depth:
+            for child, child_time, child_calls in sorted(callees.get(func, ()), key=lambda c: -c[1]):
+                if child_time < cutoff or child in path:
+                    continue
+                children.append(node(child, child_time, child_calls, path | {child}, depth + 1))
+        return {
+            'function': describe(func),
+            'cumtime': cumtime,
+            'calls': calls,
+            'percent': 100.0 * cumtime / total,
+            'children': children,
+        }
+
+    tree = [node(f, stats.stats[f][3], stats.stats[f][1], {f}, 0) for f in roots
+            if stats.stats[f][3] >= cutoff]
+    tree.sort(key=lambda n: -n['cumtime'])
+    return tree, total
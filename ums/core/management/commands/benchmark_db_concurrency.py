@@ -0,0 +1,230 @@
+"""
+Measure concurrent attendance marking with each database connection mode.
+
+    python manage.py seed_ums
+    python manage.py benchmark_db_concurrency --workers 8 --sessions 20
+
+Each worker thread plays a teacher marking attendance the way
+``teacher_take_attendance`` does.  In one transaction it reads a course's
+roster, creates the attendance session and bulk-inserts its records.  It then
+reads the course's attendance totals, like the attendance pages do, and ends
+the "request" the way Django does: the connection is closed or kept according
+to the mode.  All workers start together, and nothing is retried.
+
+SQLite modes, each run on its own copy of the database file (the journal mode
+is stored in the file, so the real database is never touched):
+
+    default   rollback journal, deferred transactions (SQLite's defaults)
+    tuned     SQLITE_OPTIONS from settings: WAL, pragmas, IMMEDIATE transactions
+
+PostgreSQL modes, run on the configured database.  The sessions they create
+are deleted afterwards:
+
+    unpooled     a new connection per request (CONN_MAX_AGE=0)
+    persistent   one connection per thread, kept open (CONN_MAX_AGE=600)
+    pooled       Django's native pool, DATABASE_POOL_OPTIONS (needs psycopg 3)
+
+The report shows sessions per second, p50/p95 session latency and the
+sessions that failed, such as "database is locked".  Results can be saved
+and compared like ``benchmark_ums``.
+"""
+import datetime
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections, transaction
+
+from attendance.models import Attendance, AttendanceRecord
+from core.benchmarks import compare, load_baseline, percentile, save_baseline
+from courses.models import Course
+
+ALIAS_PREFIX = 'benchmark_'
+# Benchmark sessions are dated before this day, far from real data.
+FIRST_DAY = datetime.date(1999, 12, 31)
+
+
+def sqlite_modes(base):
+    return {
+        # The copy may come from a WAL database: switch it back explicitly.
+        'default': {**base, 'OPTIONS': {'init_command': 'PRAGMA journal_mode=DELETE'}},
+        'tuned': {**base, 'OPTIONS': dict(settings.SQLITE_OPTIONS)},
+    }
+
+
+def postgresql_modes(base):
+    options = {k: v for k, v in base.get('OPTIONS', {}).items() if k != 'pool'}
+    return {
+        'unpooled': {**base, 'CONN_MAX_AGE': 0, 'OPTIONS': options},
+        'persistent': {**base, 'CONN_MAX_AGE': 600, 'OPTIONS': options},
+        'pooled': {**base, 'CONN_MAX_AGE': 0, 'OPTIONS': {**options, 'pool': dict(settings.DATABASE_POOL_OPTIONS)}},
+    }
+
+
+def mark_attendance(alias, course_id, day):
+    """One attendance session, written like ``teacher_take_attendance``."""
+    with transaction.atomic(using=alias):
+        student_ids = list(
+            Course.students.through.objects.using(alias)
+            .filter(course_id=course_id).values_list('student_id', flat=True)
+        )
+        attendance, _ = Attendance.objects.using(alias).get_or_create(course_id=course_id, date=day)
+        AttendanceRecord.objects.using(alias).bulk_create([
+            AttendanceRecord(attendance=attendance, student_id=student_id, status=student_id % 5 != 0)
+            for student_id in student_ids
+        ])
+    return AttendanceRecord.objects.using(alias).filter(attendance__course_id=course_id, status=True).count()
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent attendance marking across SQLite or PostgreSQL connection modes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent teacher threads.')
+        parser.add_argument('--sessions', type=int, default=20, help='Attendance sessions marked per worker.')
+        parser.add_argument('--modes', default='', help='Comma-separated subset of the modes to run.')
+        parser.add_argument('--baseline', default=os.path.join(settings.BASE_DIR, 'benchmarks', 'db_concurrency.json'))
+        parser.add_argument('--save-baseline', action='store_true')
+        parser.add_argument('--tolerance', type=float, default=0.15)
+
+    def handle(self, *args, **options):
+        base = dict(connections['default'].settings_dict)
+        vendor = connections['default'].vendor
+        if vendor == 'sqlite':
+            modes = sqlite_modes(base)
+        elif vendor == 'postgresql':
+            modes = postgresql_modes(base)
+        else:
+            raise CommandError(f'No connection modes to compare on {vendor}.')
+        if options['modes']:
+            wanted = options['modes'].split(',')
+            modes = {name: conf for name, conf in modes.items() if name in wanted}
+
+        course_ids = list(Course.objects.filter(students__isnull=False).distinct().values_list('id', flat=True))
+        if not course_ids:
+            raise CommandError('Need courses with students. Run "python manage.py seed_ums" first.')
+
+        self.stdout.write(
+            f'{vendor}: {options["workers"]} workers x {options["sessions"]} sessions, '
+            f'{len(course_ids)} courses'
+        )
+        results = {}
+        for name, conf in modes.items():
+            results[f'{vendor}:{name}'] = self.run_mode(vendor, name, conf, course_ids, options)
+        self.report(results)
+
+        baseline = load_baseline(options['baseline'])
+        if baseline:
+            self.stdout.write('\nAgainst baseline (sessions/s):')
+            for row in compare(results, baseline, options['tolerance'], metric='throughput_rps'):
+                if row['baseline'] is None:
+                    continue
+                style = self.style.ERROR if row['regression'] else self.style.SUCCESS
+                self.stdout.write(style(
+                    f'  {row["name"]:<24}{row["baseline"]:>9.1f} -> {row["current"]:>9.1f} ({row["change"]:+.0%})'
+                ))
+        if options['save_baseline']:
+            save_baseline(options['baseline'], results, workers=options['workers'], sessions=options['sessions'])
+            self.stdout.write(f'Saved baseline to {options["baseline"]}.')
+
+    def run_mode(self, vendor, name, conf, course_ids, options):
+        alias = ALIAS_PREFIX + name
+        tmpdir = None
+        if vendor == 'sqlite':
+            tmpdir = tempfile.mkdtemp(prefix='ums-dbbench-')
+            conf = {**conf, 'NAME': os.path.join(tmpdir, 'db.sqlite3')}
+            copy_sqlite(connections['default'].settings_dict['NAME'], conf['NAME'])
+        connections.settings[alias] = connections.configure_settings({'default': conf, alias: conf})[alias]
+
+        try:
+            durations, errors, elapsed = self.run_workers(alias, course_ids, options)
+        finally:
+            if vendor == 'postgresql':
+                delete_benchmark_sessions(alias)
+            connections[alias].close()
+            if hasattr(connections[alias], 'close_pool'):
+                connections[alias].close_pool()
+            del connections[alias]
+            del connections.settings[alias]
+            if tmpdir:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+
+        attempted = options['workers'] * options['sessions']
+        return {
+            'throughput_rps': round(len(durations) / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': round(percentile(durations, 50) * 1000, 2) if durations else None,
+            'p95_ms': round(percentile(durations, 95) * 1000, 2) if durations else None,
+            'failed': sum(errors.values()),
+            'failed_pct': round(sum(errors.values()) / attempted * 100, 1),
+            'errors': dict(errors),
+        }
+
+    def run_workers(self, alias, course_ids, options):
+        durations, errors = [], Counter()
+        lock = threading.Lock()
+        start = threading.Barrier(options['workers'] + 1)
+
+        def worker(n):
+            start.wait()
+            for i in range(options['sessions']):
+                course_id = course_ids[(n + i) % len(course_ids)]
+                day = FIRST_DAY - datetime.timedelta(days=n * options['sessions'] + i)
+                began = time.perf_counter()
+                try:
+                    mark_attendance(alias, course_id, day)
+                except DatabaseError as e:
+                    with lock:
+                        errors[str(e).splitlines()[0][:60]] += 1
+                else:
+                    with lock:
+                        durations.append(time.perf_counter() - began)
+                # End of "request": what request_finished does
+                connections[alias].close_if_unusable_or_obsolete()
+            connections[alias].close()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['workers'])]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return durations, errors, time.perf_counter() - began
+
+    def report(self, results):
+        self.stdout.write(f'{"mode":<24}{"sessions/s":>12}{"p50 ms":>10}{"p95 ms":>10}{"failed":>10}')
+        for name, r in results.items():
+            p50 = f'{r["p50_ms"]:.2f}' if r['p50_ms'] is not None else '-'
+            p95 = f'{r["p95_ms"]:.2f}' if r['p95_ms'] is not None else '-'
+            self.stdout.write(
+                f'{name:<24}{r["throughput_rps"]:>12.1f}{p50:>10}{p95:>10}{r["failed"]:>6} ({r["failed_pct"]:g}%)'
+            )
+            for message, count in r['errors'].items():
+                self.stdout.write(f'    {count} x {message}')
+
+
+def copy_sqlite(source, target):
+    """Copy a SQLite database consistently, including pages still in its WAL."""
+    src, dst = sqlite3.connect(source), sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+
+def delete_benchmark_sessions(alias):
+    # Raw SQL: deleting through the ORM would fire the signals that adjust the
+    # dashboard counters for rows they never counted.
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {AttendanceRecord._meta.db_table} WHERE attendance_id IN '
+            f'(SELECT id FROM {Attendance._meta.db_table} WHERE date <= %s)', [FIRST_DAY]
+        )
+        cursor.execute(f'DELETE FROM {Attendance._meta.db_table} WHERE date <= %s', [FIRST_DAY])
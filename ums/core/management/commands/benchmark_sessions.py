@@ -0,0 +1,122 @@
+"""
+Measure what the session engine costs on logged-in role pages.
+
+    python manage.py seed_ums
+    python manage.py benchmark_sessions --requests 100
+
+One user per role is logged in once per engine (``db``, ``cached_db``,
+``signed_cookies``, see ``SESSION_MODE`` in settings) and a light page of
+each role is requested again and again, the engines taking turns so that
+drift affects them equally.  For each engine the report shows p50 latency,
+SQL queries per request and how many of them touched the session table.
+Results can be saved and compared like ``benchmark_ums``.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from core.benchmarks import compare, load_baseline, logged_in_client, percentile, save_baseline
+
+# (role, url name): pages doing little besides authenticating the user, so
+# that the session is a visible share of the work.
+PAGES = [
+    ('admin', 'admin_dashboard'),
+    ('faculty', 'teacher_profile'),
+    ('student', 'student_profile'),
+    ('accountant', 'accountant_profile'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request cost of the db, cached_db and signed_cookies session engines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Measured requests per page and engine.')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--baseline', default=os.path.join(settings.BASE_DIR, 'benchmarks', 'sessions.json'))
+        parser.add_argument('--save-baseline', action='store_true')
+        parser.add_argument('--tolerance', type=float, default=0.15)
+
+    def handle(self, *args, **options):
+        users = self.pick_users()
+        modes = list(settings.SESSION_ENGINES)
+
+        # A client per engine and role; SessionMiddleware picks its engine
+        # when the client's handler is built, on its first request.
+        clients = {}
+        for mode in modes:
+            with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[mode]):
+                for role, url_name in PAGES:
+                    client = logged_in_client(users[role])
+                    client.get(reverse(url_name))
+                    clients[mode, role] = client
+
+        samples = {(mode, url_name): [] for mode in modes for _, url_name in PAGES}
+        queries = {key: [0, 0] for key in samples}  # [all, session table]
+        for i in range(options['warmup'] + options['requests']):
+            for role, url_name in PAGES:
+                for mode in modes:
+                    with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[mode]):
+                        with CaptureQueriesContext(connections['default']) as ctx:
+                            start = time.perf_counter()
+                            response = clients[mode, role].get(reverse(url_name))
+                            elapsed = time.perf_counter() - start
+                    if response.status_code != 200:
+                        raise CommandError(f'{url_name} answered {response.status_code} with {mode} sessions.')
+                    if i >= options['warmup']:
+                        samples[mode, url_name].append(elapsed)
+                        queries[mode, url_name][0] += len(ctx.captured_queries)
+                        queries[mode, url_name][1] += sum('django_session' in q['sql'] for q in ctx.captured_queries)
+
+        results = {}
+        for (mode, url_name), values in samples.items():
+            total, session = queries[mode, url_name]
+            results[f'{url_name}:{mode}'] = {
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p95_ms': round(percentile(values, 95) * 1000, 2),
+                'queries': round(total / len(values), 2),
+                'session_queries': round(session / len(values), 2),
+            }
+        self.report(results, modes)
+
+        baseline = load_baseline(options['baseline'])
+        if baseline:
+            self.stdout.write('\nAgainst baseline (p50):')
+            for row in compare(results, baseline, options['tolerance'], metric='p50_ms'):
+                if row['baseline'] is None:
+                    continue
+                style = self.style.ERROR if row['regression'] else self.style.SUCCESS
+                self.stdout.write(style(
+                    f'  {row["name"]:<38}{row["baseline"]:>9.2f} -> {row["current"]:>9.2f} ms ({row["change"]:+.0%})'
+                ))
+        if options['save_baseline']:
+            save_baseline(options['baseline'], results, requests=options['requests'])
+            self.stdout.write(f'Saved baseline to {options["baseline"]}.')
+
+    def report(self, results, modes):
+        self.stdout.write(f'{"p50 ms (queries, session)":<26}' + ''.join(f'{m:>22}' for m in modes))
+        for _, url_name in PAGES:
+            cells = []
+            for mode in modes:
+                r = results[f'{url_name}:{mode}']
+                cells.append(f'{r["p50_ms"]:>8.2f} ({r["queries"]:g}, {r["session_queries"]:g})')
+            self.stdout.write(f'{url_name:<26}' + ''.join(f'{c:>22}' for c in cells))
+
+    def pick_users(self):
+        admin = (CustomUser.objects.filter(role=CustomUser.Role.ADMIN).order_by('pk').first()
+                 or CustomUser.objects.filter(is_superuser=True).order_by('pk').first())
+        users = {
+            'admin': admin,
+            'faculty': CustomUser.objects.filter(faculty__isnull=False).order_by('pk').first(),
+            'student': CustomUser.objects.filter(student__isnull=False).order_by('pk').first(),
+            'accountant': CustomUser.objects.filter(role=CustomUser.Role.ACCOUNTANT).order_by('pk').first(),
+        }
+        if not all(users.values()):
+            raise CommandError('Need an admin, a teacher, a student and an accountant. Run "python manage.py seed_ums" first.')
+        return users
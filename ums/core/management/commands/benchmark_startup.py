@@ -0,0 +1,115 @@
+"""
+Measure what a fresh worker pays at startup: import time, RSS and modules.
+
+    python manage.py benchmark_startup --repeat 7
+
+Each run starts a new Python process that does what a gunicorn worker does
+before serving its first request (load the WSGI application and import the
+URLconf, and with it every view module).  The "eager" variant additionally
+imports the xhtml2pdf/reportlab stack up front, the way ``core.utils`` used to;
+the difference is the saving per worker from loading it lazily.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import load_baseline, save_baseline
+
+PDF_MODULES = ('xhtml2pdf', 'reportlab', 'pyhanko', 'svglib')
+
+PROBE = r'''
+import json, os, resource, sys, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+if os.environ.get('UMS_PROBE_EAGER') == '1':
+    import xhtml2pdf.pisa
+elapsed = time.perf_counter() - start
+rss_kb = None
+try:
+    with open('/proc/self/statm') as fh:
+        rss_kb = int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+except OSError:
+    pass
+print(json.dumps({
+    'seconds': elapsed,
+    'rss_kb': rss_kb,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': len(sys.modules),
+    'pdf_loaded': sorted(m for m in %r if m in sys.modules),
+}))
+''' % (PDF_MODULES,)
+
+
+def probe(eager=False):
+    """Start a fresh interpreter, import the app like a worker and report."""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'ums.settings'))
+    env['UMS_PROBE_EAGER'] = '1' if eager else '0'
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=str(settings.BASE_DIR), env=env,
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise CommandError(f'Startup probe failed:\n{result.stderr}')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize_runs(runs):
+    rss = [r['rss_kb'] or r['max_rss_kb'] for r in runs]
+    return {
+        'startup_ms': round(statistics.median(r['seconds'] for r in runs) * 1000, 1),
+        'rss_mib': round(statistics.median(rss) / 1024, 1),
+        'modules': int(statistics.median(r['modules'] for r in runs)),
+        'pdf_loaded': runs[-1]['pdf_loaded'],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Measure worker startup time and memory, with the PDF stack loaded lazily vs eagerly.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Fresh processes per variant (median is reported).')
+        parser.add_argument('--baseline', default=os.path.join(settings.BASE_DIR, 'benchmarks', 'startup.json'))
+        parser.add_argument('--save-baseline', action='store_true')
+
+    def handle(self, *args, **options):
+        repeat = max(1, options['repeat'])
+        results = {}
+        for name, eager in (('lazy', False), ('eager', True)):
+            runs = [probe(eager) for _ in range(repeat)]
+            results[name] = summarize_runs(runs)
+
+        lazy, eager = results['lazy'], results['eager']
+        self.stdout.write(f'{"":8}{"startup ms":>12}{"RSS MiB":>10}{"modules":>9}  PDF stack loaded')
+        for name, row in results.items():
+            self.stdout.write(
+                f'{name:<8}{row["startup_ms"]:>12.1f}{row["rss_mib"]:>10.1f}{row["modules"]:>9}  '
+                f'{", ".join(row["pdf_loaded"]) or "no"}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Saving per worker: {eager["startup_ms"] - lazy["startup_ms"]:.1f} ms, '
+            f'{eager["rss_mib"] - lazy["rss_mib"]:.1f} MiB, {eager["modules"] - lazy["modules"]} modules.'
+        ))
+        if lazy['pdf_loaded']:
+            self.stderr.write(self.style.WARNING(
+                f'The PDF stack is imported at startup again ({", ".join(lazy["pdf_loaded"])}).'
+            ))
+
+        baseline = load_baseline(options['baseline'])
+        if baseline and 'lazy' in baseline:
+            before = baseline['lazy']
+            self.stdout.write(
+                f'Baseline lazy startup: {before["startup_ms"]:.1f} ms, {before["rss_mib"]:.1f} MiB '
+                f'(now {lazy["startup_ms"] - before["startup_ms"]:+.1f} ms, '
+                f'{lazy["rss_mib"] - before["rss_mib"]:+.1f} MiB).'
+            )
+        if options['save_baseline']:
+            save_baseline(options['baseline'], results, repeat=repeat)
+            self.stdout.write(f'Saved baseline to {options["baseline"]}.')
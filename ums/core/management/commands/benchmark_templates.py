@@ -0,0 +1,167 @@
+"""
+Measure template rendering on list pages with hundreds of rows, with and
+without the cached template loader and the sidebar fragment cache.
+
+    python manage.py seed_ums
+    python manage.py benchmark_templates --renders 50
+
+Each page is requested once through the test client to capture the context
+its view built (querysets already evaluated).  That context is then rendered
+again and again by three template engines, in turn:
+
+    uncached   templates read and compiled on every render, no fragments
+    loader     cached template loader, no fragments
+    fragments  cached template loader + cached role sidebars (production)
+
+so the figures are pure template time - no SQL, no middleware.  Results can
+be saved and compared like ``benchmark_ums``.
+"""
+import os
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Context, engines
+from django.template.base import Template
+from django.template.engine import Engine
+from django.test.utils import instrumented_test_render
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from core.benchmarks import compare, load_baseline, logged_in_client, percentile, save_baseline
+from courses.models import Course
+from departments.models import Department
+
+# (role, url name, query string).  Query values may be callables taking the
+# picked users, like in ``benchmark_ums``.
+PAGES = [
+    ('admin', 'student_list', {'department': lambda users: users['department'].pk}),
+    ('admin', 'faculty_list', {}),
+    ('admin', 'attendance_list', {'course': lambda users: users['course'].pk}),
+    ('faculty', 'teacher_view_students', {}),
+    ('accountant', 'accountant_payment_history', {}),
+]
+
+BASE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+# (name, loaders, fragment cache timeout)
+VARIANTS = [
+    ('uncached', BASE_LOADERS, 0),
+    ('loader', [('django.template.loaders.cached.Loader', BASE_LOADERS)], 0),
+    ('fragments', [('django.template.loaders.cached.Loader', BASE_LOADERS)], 600),
+]
+
+
+def make_engine(loaders):
+    """An engine configured like the project's, but with ``loaders``."""
+    engine = engines.all()[0].engine
+    return Engine(
+        dirs=engine.dirs, loaders=loaders, libraries=engine.libraries,
+        builtins=['django.template.defaulttags', 'django.template.defaultfilters',
+                  'django.template.loader_tags'],
+        string_if_invalid=engine.string_if_invalid, autoescape=engine.autoescape,
+    )
+
+
+def capture_context(client, url, query):
+    """Request ``url`` and return (template name, flattened context, rows)."""
+    with mock.patch.object(Template, '_render', instrumented_test_render):
+        response = client.get(url, query)
+    if response.status_code != 200:
+        raise CommandError(f'{url} answered {response.status_code}.')
+    # The first context is the one the view passed to render().
+    context = response.context[0] if isinstance(response.context, list) else response.context
+    return response.templates[0].name, context.flatten(), response.content.count(b'<tr')
+
+
+class Command(BaseCommand):
+    help = 'Compare template render time on list pages with and without template/fragment caching.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=30, help='Measured renders per page and variant.')
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--baseline', default=os.path.join(settings.BASE_DIR, 'benchmarks', 'templates.json'))
+        parser.add_argument('--save-baseline', action='store_true')
+        parser.add_argument('--tolerance', type=float, default=0.15)
+
+    def handle(self, *args, **options):
+        users = self.pick_users()
+        engines_by_variant = {name: make_engine(loaders) for name, loaders, _ in VARIANTS}
+        cache.clear()
+
+        results = {}
+        for role, url_name, query in PAGES:
+            query = {k: v(users) if callable(v) else v for k, v in query.items()}
+            template_name, flat, rows = capture_context(logged_in_client(users[role]), reverse(url_name), query)
+
+            samples = {name: [] for name, _, _ in VARIANTS}
+            for i in range(options['warmup'] + options['renders']):
+                # Interleave the variants so that drift affects them equally.
+                for name, _, fragment_timeout in VARIANTS:
+                    context = Context({**flat, 'fragment_cache_timeout': fragment_timeout})
+                    start = time.perf_counter()
+                    engines_by_variant[name].get_template(template_name).render(context)
+                    if i >= options['warmup']:
+                        samples[name].append(time.perf_counter() - start)
+
+            for name, values in samples.items():
+                results[f'{url_name}:{name}'] = {
+                    'rows': rows,
+                    'p50_ms': round(percentile(values, 50) * 1000, 2),
+                    'p95_ms': round(percentile(values, 95) * 1000, 2),
+                }
+
+        self.report(results)
+
+        baseline = load_baseline(options['baseline'])
+        if baseline:
+            self.stdout.write('\nAgainst baseline (p50):')
+            for row in compare(results, baseline, options['tolerance'], metric='p50_ms'):
+                if row['baseline'] is None:
+                    continue
+                style = self.style.ERROR if row['regression'] else self.style.SUCCESS
+                self.stdout.write(style(
+                    f'  {row["name"]:<42}{row["baseline"]:>9.2f} -> {row["current"]:>9.2f} ms ({row["change"]:+.0%})'
+                ))
+        if options['save_baseline']:
+            save_baseline(options['baseline'], results, renders=options['renders'])
+            self.stdout.write(f'Saved baseline to {options["baseline"]}.')
+
+    def report(self, results):
+        names = [name for name, _, _ in VARIANTS]
+        self.stdout.write(f'{"render p50 ms":<30}{"rows":>6}' + ''.join(f'{n:>12}' for n in names) + f'{"saving":>9}')
+        for _, url_name, _ in PAGES:
+            row = [results[f'{url_name}:{name}'] for name in names]
+            first, last = row[0]['p50_ms'], row[-1]['p50_ms']
+            saving = (first - last) / first if first else 0.0
+            self.stdout.write(
+                f'{url_name:<30}{row[0]["rows"]:>6}'
+                + ''.join(f'{r["p50_ms"]:>12.2f}' for r in row)
+                + f'{saving:>9.0%}'
+            )
+
+    def pick_users(self):
+        admin = (CustomUser.objects.filter(role=CustomUser.Role.ADMIN).order_by('pk').first()
+                 or CustomUser.objects.filter(is_superuser=True).order_by('pk').first())
+        course = Course.objects.filter(
+            faculty__isnull=False, students__isnull=False
+        ).select_related('faculty__user').order_by('pk').first()
+        department = Department.objects.filter(student__isnull=False).order_by('pk').first()
+        accountant = CustomUser.objects.filter(role=CustomUser.Role.ACCOUNTANT).order_by('pk').first()
+        if not (admin and course and department and accountant):
+            raise CommandError(
+                'Need an admin, an accountant, a department with students and a course with a teacher '
+                'and students. Run "python manage.py seed_ums" first.'
+            )
+        return {
+            'admin': admin,
+            'faculty': course.faculty.user,
+            'accountant': accountant,
+            'course': course,
+            'department': department,
+        }
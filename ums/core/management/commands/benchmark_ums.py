@@ -0,0 +1,282 @@
+"""
+Load-test the role dashboards and the report / export endpoints.
+
+    python manage.py seed_ums
+    python manage.py benchmark_ums --requests 200 --concurrency 8 --save-baseline
+    python manage.py benchmark_ums --requests 200 --concurrency 8
+
+One user per role (admin, faculty, student, accountant) is picked from the
+database.  By default requests go through the Django test client, in process;
+with ``--base-url`` they are sent over HTTP to a running server (gunicorn,
+uvicorn, runserver), logging in with ``--password``.  p50/p95/p99 latency and
+throughput are stored in a JSON baseline file and every later run is compared
+against it.  To compare the WSGI and ASGI paths, run the same command against
+``gunicorn ums.wsgi:application`` and ``uvicorn ums.asgi:application``.
+"""
+import http.cookiejar
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from core.benchmarks import compare, load_baseline, logged_in_client, save_baseline, summarize
+from courses.models import Course
+from students.models import Student
+
+# (role, url name, query string[, url kwargs]).  Query and kwarg values may be
+# callables taking the picked users, for parameters that depend on the data
+# (e.g. a course id).
+ENDPOINTS = [
+    ('admin', 'admin_dashboard', {}),
+    ('admin', 'student_detail', {}, {'pk': lambda users: users['student_profile'].pk}),
+    ('admin', 'attendance_export', {}),
+    ('faculty', 'teacher_dashboard', {}),
+    ('faculty', 'teacher_student_profile', {}, {'student_id': lambda users: users['course'].students.order_by('pk').first().pk}),
+    ('faculty', 'teacher_reports', {'report_type': 'attendance', 'course': lambda users: users['course'].pk}),
+    ('faculty', 'teacher_reports', {'report_type': 'performance', 'course': lambda users: users['course'].pk}),
+    ('student', 'student_dashboard', {}),
+    ('student', 'download_results_pdf', {}),
+    ('accountant', 'accountant_dashboard', {}),
+    ('accountant', 'accountant_reports', {'report_type': 'monthly'}),
+    ('accountant', 'accountant_reports', {'report_type': 'annual'}),
+    ('accountant', 'accountant_reports', {'report_type': 'department'}),
+    ('accountant', 'accountant_reports_export', {'report_type': 'annual'}),
+]
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+# Seconds the threads wait for each other to log in and warm up
+READY_TIMEOUT = 300
+
+
+def endpoint_key(url_name, query):
+    report_type = query.get('report_type')
+    return f'{url_name}:{report_type}' if report_type else url_name
+
+
+class ClientSession:
+    """Requests through the in-process Django test client."""
+
+    def __init__(self, user):
+        self.client = logged_in_client(user)
+
+    def get(self, url):
+        response = self.client.get(url)
+        # Read streamed bodies too, so that the work is actually done.
+        b''.join(response) if response.streaming else response.content
+        return response.status_code
+
+
+class HttpSession:
+    """Requests over HTTP to a running server, with a real login."""
+
+    def __init__(self, base_url, username, password):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+        self.login(username, password)
+
+    def login(self, username, password):
+        login_url = self.base_url + reverse('login')
+        self.opener.open(login_url).read()
+        token = next((c.value for c in self.cookies if c.name == settings.CSRF_COOKIE_NAME), '')
+        data = urllib.parse.urlencode({
+            'username': username, 'password': password,
+            'csrfmiddlewaretoken': token, 'remember_me': 'on',
+        }).encode()
+        request = urllib.request.Request(login_url, data=data, headers={'Referer': login_url})
+        response = self.opener.open(request)
+        response.read()
+        if response.geturl().rstrip('/') == login_url.rstrip('/'):
+            raise CommandError(f'Could not log in to {self.base_url} as "{username}".')
+
+    def get(self, url):
+        try:
+            with self.opener.open(self.base_url + url) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the role dashboards and report/export endpoints and compare with a stored baseline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Measured requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=3,
+                            help='Unmeasured requests per endpoint before measuring.')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Number of threads issuing requests at the same time.')
+        parser.add_argument('--base-url',
+                            help='Benchmark a running server (e.g. http://127.0.0.1:8000) instead of the test client.')
+        parser.add_argument('--password', default='password123',
+                            help='Password of the benchmark users (only used with --base-url).')
+        parser.add_argument('--only', nargs='+', metavar='URL_NAME',
+                            help='Only benchmark these url names.')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Store this run as the new baseline.')
+        parser.add_argument('--tolerance', type=float, default=0.15,
+                            help='Allowed p95 slowdown before a run counts as a regression (0.15 = 15%%).')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error if any endpoint regressed.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        users = self.pick_users()
+
+        endpoints = [e for e in ENDPOINTS if not options['only'] or e[1] in options['only']]
+        if not endpoints:
+            raise CommandError('No endpoints match --only.')
+
+        target = options['base_url'] or 'test-client'
+        self.stdout.write(
+            f'Benchmarking {len(endpoints)} endpoints against {target}: '
+            f'{options["requests"]} requests each, concurrency {options["concurrency"]}'
+        )
+
+        results = {}
+        for role, url_name, query, *kwargs in endpoints:
+            params = {k: v(users) if callable(v) else v for k, v in query.items()}
+            kwargs = {k: v(users) if callable(v) else v for k, v in (kwargs[0] if kwargs else {}).items()}
+            url = reverse(url_name, kwargs=kwargs)
+            if params:
+                url += '?' + urllib.parse.urlencode(params)
+            key = endpoint_key(url_name, params)
+            results[key] = self.run_endpoint(users[role], url)
+            summary = results[key]
+            self.stdout.write(
+                f'  {key:<38} p50 {summary["p50_ms"]:>8.1f} ms  p95 {summary["p95_ms"]:>8.1f} ms  '
+                f'p99 {summary["p99_ms"]:>8.1f} ms  {summary["throughput_rps"]:>7.1f} req/s'
+                + (self.style.ERROR(f'  {summary["errors"]} errors') if summary['errors'] else '')
+            )
+
+        self.report(results, target)
+
+    # ── Setup ───────────────────────────────────────────────────────────────
+    def pick_users(self):
+        """One representative user per role, preferring ones with data."""
+        admin = (CustomUser.objects.filter(role=CustomUser.Role.ADMIN).order_by('pk').first()
+                 or CustomUser.objects.filter(is_superuser=True).order_by('pk').first())
+        course = Course.objects.filter(
+            faculty__isnull=False, students__isnull=False
+        ).select_related('faculty__user').order_by('pk').first()
+        student = Student.objects.filter(enrolled_courses__isnull=False).select_related('user').order_by('pk').first()
+        accountant = CustomUser.objects.filter(role=CustomUser.Role.ACCOUNTANT).order_by('pk').first()
+
+        if not (admin and course and student and accountant):
+            raise CommandError(
+                'Need an admin, an accountant, a student and a course with a teacher and students. '
+                'Run "python manage.py seed_ums" first.'
+            )
+        return {
+            'admin': admin,
+            'faculty': course.faculty.user,
+            'student': student.user,
+            'student_profile': student,
+            'accountant': accountant,
+            'course': course,
+        }
+
+    def make_session(self, user):
+        if self.options['base_url']:
+            return HttpSession(self.options['base_url'], user.username, self.options['password'])
+        return ClientSession(user)
+
+    # ── Measuring ───────────────────────────────────────────────────────────
+    def run_endpoint(self, user, url):
+        requests = self.options['requests']
+        concurrency = max(1, min(self.options['concurrency'], requests))
+        per_thread = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+        samples, errors, starts, failures = [], [], [], []
+        lock = threading.Lock()
+        ready = threading.Barrier(concurrency, timeout=READY_TIMEOUT)
+
+        def worker(count):
+            try:
+                session = self.make_session(user)
+                for _ in range(self.options['warmup']):
+                    session.get(url)
+                ready.wait()
+                starts.append(time.perf_counter())
+                local, failed = [], 0
+                for _ in range(count):
+                    start = time.perf_counter()
+                    status = session.get(url)
+                    local.append(time.perf_counter() - start)
+                    failed += status >= 400
+                with lock:
+                    samples.extend(local)
+                    errors.append(failed)
+            except Exception as exc:
+                if concurrency == 1:
+                    raise
+                # Release the threads waiting for this one instead of leaving them hanging
+                ready.abort()
+                with lock:
+                    failures.append(exc)
+            finally:
+                if concurrency > 1:
+                    connections.close_all()
+
+        if concurrency == 1:
+            # Stay on this thread (and its database connection).
+            worker(requests)
+        else:
+            threads = [threading.Thread(target=worker, args=(count,)) for count in per_thread]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.raise_failure(url, failures)
+        elapsed = time.perf_counter() - min(starts) if starts else None
+        return summarize(samples, elapsed, sum(errors))
+
+    def raise_failure(self, url, failures):
+        """Report what stopped the threads: the first real error, else the barrier timeout."""
+        if not failures:
+            return
+        exc = next((e for e in failures if not isinstance(e, threading.BrokenBarrierError)), failures[0])
+        if isinstance(exc, CommandError):
+            raise exc
+        if isinstance(exc, threading.BrokenBarrierError):
+            raise CommandError(f'{url}: the threads were not ready within {READY_TIMEOUT} s.') from exc
+        raise CommandError(f'{url}: a benchmark thread failed: {exc!r}') from exc
+
+    # ── Baseline ────────────────────────────────────────────────────────────
+    def report(self, results, target):
+        path = self.options['baseline']
+        baseline = load_baseline(path)
+        regressions = []
+
+        if baseline:
+            self.stdout.write(f'\nCompared with baseline {path} (p95):')
+            for row in compare(results, baseline, self.options['tolerance']):
+                if row['baseline'] is None:
+                    self.stdout.write(f'  {row["name"]:<38} new')
+                    continue
+                line = (f'  {row["name"]:<38} {row["baseline"]:>8.1f} → {row["current"]:>8.1f} ms '
+                        f'({row["change"]:+.0%})')
+                if row['regression']:
+                    regressions.append(row['name'])
+                    line = self.style.ERROR(line + '  REGRESSION')
+                self.stdout.write(line)
+        else:
+            self.stdout.write(f'\nNo baseline at {path}.')
+
+        if self.options['save_baseline']:
+            save_baseline(path, results, target=target, requests=self.options['requests'],
+                          concurrency=self.options['concurrency'])
+            self.stdout.write(self.style.SUCCESS(f'Saved baseline to {path}.'))
+
+        if regressions and self.options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} endpoint(s) regressed: {", ".join(regressions)}')
@@ -0,0 +1,81 @@
+"""
+Print the database's query plan for the hottest filters of the app.
+
+    python manage.py seed_ums
+    python manage.py explain_queries
+    python manage.py explain_queries --only result
+
+Each query below is the shape used by the views (student results, attendance
+reports, fee summaries, term-scoped pages, notice boards), run with ``QuerySet.explain()`` on
+real ids from the current database.  Compare the output before and after
+index migrations to check that a plan uses the intended index instead of a
+scan plus a temporary sort.
+"""
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from attendance.models import Attendance, AttendanceRecord
+from examinations.models import Exam, Result
+from fees.models import FeePayment
+from notices.models import Notice
+from students.models import Student
+
+
+def hot_queries(student, attendance, exam):
+    """``(name, queryset)`` for each hot filter, built around the given rows."""
+    since = timezone.localdate() - datetime.timedelta(days=30)
+    return [
+        ('attendance_record:student+attendance',
+         AttendanceRecord.objects.filter(student=student, attendance=attendance)),
+        ('attendance_record:attendance+status',
+         AttendanceRecord.objects.filter(attendance=attendance, status=True).values('student_id')),
+        ('attendance_record:student+status',
+         AttendanceRecord.objects.filter(student=student, status=True).values('attendance_id')),
+        ('attendance:term+course',
+         Attendance.objects.filter(term=attendance.term, course_id=attendance.course_id).order_by('date')),
+        ('attendance_record:student+term',
+         AttendanceRecord.objects.filter(student=student, attendance__term=attendance.term).values('status')),
+        ('exam:term+course',
+         Exam.objects.filter(term=exam.term, course_id=exam.course_id).order_by('-date')),
+        ('result:exam+student',
+         Result.objects.filter(exam=exam, student=student)),
+        ('result:student+exam_date',
+         Result.objects.filter(student=student).select_related('exam').order_by('-exam__date')),
+        ('fee_payment:status+payment_date',
+         FeePayment.objects.filter(status=FeePayment.Status.PAID, payment_date__gte=since)
+         .values('payment_date', 'amount_paid')),
+        ('fee_payment:student+status',
+         FeePayment.objects.filter(student=student, status=FeePayment.Status.PAID).values('amount_paid')),
+        ('fee_payment:term+status',
+         FeePayment.objects.filter(term=exam.term, status=FeePayment.Status.PAID).values('amount_paid')),
+        ('fee_payment:term+student',
+         FeePayment.objects.filter(term=exam.term, student=student, status=FeePayment.Status.PAID)
+         .values('amount_paid')),
+        ('notice:target_audience+created_at',
+         Notice.objects.filter(target_audience__in=['ALL', 'STUDENT']).order_by('-created_at')[:20]),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Show the query plans of the hot attendance, exam, result, fee payment and notice filters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', default='', help='Only queries whose name contains this text.')
+
+    def handle(self, *args, **options):
+        student = Student.objects.filter(result__isnull=False).order_by('pk').first()
+        attendance = Attendance.objects.filter(attendancerecord__isnull=False).order_by('pk').first()
+        exam = Exam.objects.filter(result__isnull=False).order_by('pk').first()
+        if not (student and attendance and exam):
+            raise CommandError('Need students with results and attendance. Run "python manage.py seed_ums" first.')
+
+        self.stdout.write(f'Database: {connection.vendor}')
+        for name, queryset in hot_queries(student, attendance, exam):
+            if options['only'] not in name:
+                continue
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f'  {line}')
@@ -0,0 +1,92 @@
+"""
+Measure the memory a view needs, using tracemalloc.
+
+    python manage.py profile_memory attendance_export --user seed_admin1
+    python manage.py profile_memory accountant_reports_export --user seed_accountant1 \\
+        --query report_type=annual
+    python manage.py profile_memory download_results_pdf --user seed_student1
+
+The view is requested through the test client (url name or path), after one
+unmeasured warm-up request so that imports and caches do not count.  Peak
+memory and the lines holding the most memory at the end are printed.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import NoReverseMatch, reverse
+
+from accounts.models import CustomUser
+from core.benchmarks import logged_in_client
+from core.memory_profiles import trace_call
+
+
+class Command(BaseCommand):
+    help = 'Run a view under tracemalloc and report peak memory and the top allocation sites.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', help='URL name (e.g. attendance_export) or path (e.g. /attendance/export/).')
+        parser.add_argument('--user', help='Username to request the page as (default: first admin).')
+        parser.add_argument('--query', action='append', default=[], metavar='KEY=VALUE',
+                            help='Query string parameter; may be repeated.')
+        parser.add_argument('--top', type=int, default=15, help='Number of allocation sites to show.')
+        parser.add_argument('--frames', type=int, default=1,
+                            help='Traceback depth stored by tracemalloc (more is slower).')
+        parser.add_argument('--no-warmup', action='store_true')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        url = self.get_url(options['target'])
+        params = {}
+        for item in options['query']:
+            key, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'--query expects KEY=VALUE, got "{item}".')
+            params[key] = value
+
+        client = logged_in_client(user)
+        if not options['no_warmup']:
+            self.fetch(client, url, params)
+
+        response, report = trace_call(
+            url, self.fetch, client, url, params, top=options['top'], frames=options['frames']
+        )
+        if response.status_code >= 300:
+            self.stderr.write(self.style.WARNING(
+                f'{url} answered {response.status_code} for {user.username}; '
+                f'the figures below are for that response.'
+            ))
+
+        self.stdout.write(f'{url} as {user.username}: {response.status_code}, {len(response.content):,} bytes')
+        self.stdout.write(f'  Peak memory:        {report["peak_bytes"] / 1024 / 1024:8.2f} MiB')
+        self.stdout.write(f'  Still allocated:    {report["retained_bytes"] / 1024 / 1024:8.2f} MiB')
+        self.stdout.write('  Top allocation sites:')
+        for site in report['top']:
+            self.stdout.write(f'    {site["size_bytes"] / 1024:10.1f} KiB  {site["count"]:>7} blocks  {site["location"]}')
+            if site['code']:
+                self.stdout.write(f'{"":34}{site["code"]}')
+
+    def get_user(self, username):
+        if username:
+            try:
+                return CustomUser.objects.get(username=username)
+            except CustomUser.DoesNotExist:
+                raise CommandError(f'No user named "{username}".')
+        user = (CustomUser.objects.filter(role=CustomUser.Role.ADMIN).order_by('pk').first()
+                or CustomUser.objects.filter(is_superuser=True).order_by('pk').first())
+        if user is None:
+            raise CommandError('No admin user found; pass --user.')
+        return user
+
+    def get_url(self, target):
+        if target.startswith('/'):
+            return target
+        try:
+            return reverse(target)
+        except NoReverseMatch:
+            raise CommandError(f'"{target}" is neither a path nor a URL name without arguments.')
+
+    @staticmethod
+    def fetch(client, url, params):
+        response = client.get(url, params)
+        if response.streaming:
+            # Consume the stream inside the trace, as a server would.
+            response._consumed = b''.join(response.streaming_content)
+        return response
@@ -0,0 +1,56 @@
+"""
+Delete expired sessions in batches.
+
+    python manage.py purge_sessions
+    python manage.py purge_sessions --batch-size 5000 --pause 0.2
+    python manage.py purge_sessions --dry-run
+
+``clearsessions`` removes every expired row with a single ``DELETE``, which
+on a big session table holds its locks for as long as it runs.  This deletes
+``--batch-size`` rows per statement, each in its own transaction, optionally
+pausing between batches so that logins are never kept waiting.  Run it from
+cron.  With ``SESSION_MODE=cached_db`` the cached copies expire on their own;
+signed-cookie sessions are not stored and there is nothing to purge.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSessionStore
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions from the session table in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per statement.')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the expired sessions.')
+
+    def handle(self, *args, **options):
+        store = import_string(f'{settings.SESSION_ENGINE}.SessionStore')
+        if not issubclass(store, DatabaseSessionStore):
+            self.stdout.write(f'{settings.SESSION_ENGINE} does not store sessions in the database; nothing to purge.')
+            return
+
+        expired = store.get_model_class().objects.filter(expire_date__lt=timezone.now())
+        if options['dry_run']:
+            self.stdout.write(f'{expired.count()} expired session(s).')
+            return
+
+        batch_size = max(1, options['batch_size'])
+        deleted = batches = 0
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)[:batch_size])
+            if not keys:
+                break
+            deleted += expired.filter(session_key__in=keys).delete()[0]
+            batches += 1
+            if len(keys) < batch_size:
+                break
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired session(s) in {batches} batch(es).'))
@@ -0,0 +1,43 @@
+"""
+Recompute the admin dashboard counters from the source tables.
+
+    python manage.py rebuild_counters            # recompute and store
+    python manage.py rebuild_counters --check    # only report drift
+
+The counters are kept up to date by signals (``core.counters``); this is for
+after bulk imports or raw SQL, and can run from cron as a reconciler.
+``--check`` exits with status 1 when a counter has drifted.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core import counters
+from core.models import DashboardCounter
+
+
+class Command(BaseCommand):
+    help = 'Recompute the admin dashboard counters (or, with --check, report drift).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Compare only; do not write.')
+
+    def handle(self, *args, **options):
+        stored = dict(DashboardCounter.objects.values_list('name', 'value'))
+        actual = counters.compute() if options['check'] else counters.rebuild()
+
+        drifted = 0
+        for name, value in actual.items():
+            before = stored.get(name)
+            if before == value:
+                self.stdout.write(f'  {name:<20}{value:>16}')
+                continue
+            drifted += 1
+            self.stdout.write(self.style.WARNING(
+                f'  {name:<20}{value:>16}  (stored: {"missing" if before is None else before})'
+            ))
+
+        if options['check']:
+            if drifted:
+                raise CommandError(f'{drifted} counter(s) out of date; run rebuild_counters.', returncode=1)
+            self.stdout.write(self.style.SUCCESS('All counters are up to date.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(actual)} counters ({drifted} corrected).'))
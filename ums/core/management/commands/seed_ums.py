@@ -0,0 +1,374 @@
+"""
+Fill the database with a synthetic university for benchmarking / load tests.
+
+    python manage.py seed_ums --students 20000 --attendance-days 40
+
+Everything is written with ``bulk_create`` in batches and every user shares a
+single pre-hashed password, so a dataset with a million attendance records
+loads in minutes rather than hours.  All generated usernames start with
+``seed_`` and all department / course codes with ``SD`` / ``SC`` so that the
+data can be told apart from (and removed without touching) real records.
+"""
+import datetime
+import itertools
+import random
+import time
+from decimal import Decimal
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from attendance.models import Attendance, AttendanceRecord
+from core import counters
+from core.cache_versions import bump_generation
+from core.models import UniversitySetting
+from core.terms import term_for_date
+from courses.models import Course
+from departments.models import Department
+from examinations.models import Exam, Result
+from faculty.models import Faculty
+from fees.models import FeeStructure, FeePayment
+from notices.models import Notice
+from students.models import Student
+from timetable.models import Timetable
+
+FIRST_NAMES = [
+    'Aarav', 'Vivaan', 'Aditya', 'Vihaan', 'Arjun', 'Sai', 'Reyansh', 'Ayaan', 'Krishna', 'Ishaan',
+    'Ananya', 'Diya', 'Saanvi', 'Aadhya', 'Pari', 'Anika', 'Navya', 'Myra', 'Sara', 'Kiara',
+    'Rohan', 'Kabir', 'Meera', 'Riya', 'Neha', 'Rahul', 'Priya', 'Amit', 'Sneha', 'Vikram',
+]
+LAST_NAMES = [
+    'Sharma', 'Verma', 'Gupta', 'Singh', 'Kumar', 'Patel', 'Reddy', 'Iyer', 'Nair', 'Das',
+    'Mehta', 'Joshi', 'Chopra', 'Malhotra', 'Bose', 'Kapoor', 'Rao', 'Pillai', 'Saxena', 'Mishra',
+]
+DEPARTMENT_NAMES = [
+    'Computer Science', 'Electronics', 'Mechanical', 'Civil', 'Electrical', 'Chemical',
+    'Biotechnology', 'Mathematics', 'Physics', 'Management', 'Commerce', 'Humanities',
+]
+WEEK_DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+SEMESTERS = range(1, 9)
+
+USERNAME_PREFIX = 'seed_'
+
+
+def batched(iterable, size):
+    """Yield lists of at most ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic university (users, courses, attendance, results, fees) in bulk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--departments', type=int, default=8)
+        parser.add_argument('--faculty-per-department', type=int, default=12)
+        parser.add_argument('--courses-per-semester', type=int, default=2,
+                            help='Courses per department per semester (8 semesters).')
+        parser.add_argument('--students', type=int, default=20000)
+        parser.add_argument('--attendance-days', type=int, default=40,
+                            help='Attendance sessions per course, going back from today.')
+        parser.add_argument('--payments-per-student', type=int, default=3)
+        parser.add_argument('--notices', type=int, default=200)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--password', default='password123',
+                            help='Password shared by every generated user.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducible data.')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete previously seeded data before generating.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.today = timezone.localdate()
+        self.password_hash = make_password(options['password'])
+        self.verbosity = options['verbosity']
+
+        if options['clear']:
+            self.phase('Clearing previously seeded data', self.clear)
+        elif CustomUser.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError('Seeded data already exists. Re-run with --clear to replace it.')
+
+        started = time.perf_counter()
+        self.phase('University settings', self.create_settings)
+        self.phase('Departments & fee structures', self.create_departments, options['departments'])
+        self.phase('Faculty', self.create_faculty, options['faculty_per_department'])
+        self.phase('Courses & timetable', self.create_courses, options['courses_per_semester'])
+        self.phase('Students & enrollment', self.create_students, options['students'])
+        self.phase('Attendance', self.create_attendance, options['attendance_days'])
+        self.phase('Exams & results', self.create_exams)
+        self.phase('Fee payments', self.create_payments, options['payments_per_student'])
+        self.phase('Notices', self.create_notices, options['notices'])
+
+        # bulk_create skips model signals: invalidate cached data and recount by hand.
+        for label in settings.CACHE_VERSIONED_MODELS:
+            bump_generation(apps.get_model(label))
+        counters.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded university in {time.perf_counter() - started:.1f}s. '
+            f'Every user (e.g. {USERNAME_PREFIX}student1) has password "{options["password"]}".'
+        ))
+
+    # ── Helpers ─────────────────────────────────────────────────────────────
+    def phase(self, label, func, *args):
+        start = time.perf_counter()
+        with transaction.atomic():
+            created = func(*args)
+        if self.verbosity:
+            suffix = f' ({created:,} rows)' if created is not None else ''
+            self.stdout.write(f'  {label}{suffix} … {time.perf_counter() - start:.1f}s')
+
+    def bulk_create(self, model, objs):
+        """Insert ``objs`` (any iterable) in batches; returns the row count."""
+        count = 0
+        for batch in batched(objs, self.batch_size):
+            model.objects.bulk_create(batch, batch_size=self.batch_size)
+            count += len(batch)
+        return count
+
+    def make_users(self, prefix, role, count):
+        users = []
+        for n in range(1, count + 1):
+            first = self.rng.choice(FIRST_NAMES)
+            last = self.rng.choice(LAST_NAMES)
+            users.append(CustomUser(
+                username=f'{USERNAME_PREFIX}{prefix}{n}',
+                first_name=first,
+                last_name=last,
+                email=f'{prefix}{n}@seed.example.com',
+                role=role,
+                password=self.password_hash,
+            ))
+        CustomUser.objects.bulk_create(users, batch_size=self.batch_size)
+        return users
+
+    def past_days(self, count):
+        """The most recent ``count`` weekdays (Mon–Sat) before today."""
+        days = []
+        day = self.today
+        while len(days) < count:
+            day -= datetime.timedelta(days=1)
+            if day.weekday() < 6:
+                days.append(day)
+        return days
+
+    # ── Phases ──────────────────────────────────────────────────────────────
+    def clear(self):
+        AttendanceRecord.objects.filter(student__user__username__startswith=USERNAME_PREFIX).delete()
+        Result.objects.filter(student__user__username__startswith=USERNAME_PREFIX).delete()
+        FeePayment.objects.filter(student__user__username__startswith=USERNAME_PREFIX).delete()
+        Notice.objects.filter(posted_by__username__startswith=USERNAME_PREFIX).delete()
+        Course.objects.filter(code__startswith='SC').delete()
+        CustomUser.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        Department.objects.filter(code__startswith='SD').delete()
+
+    def create_settings(self):
+        if not UniversitySetting.objects.exists():
+            # Make the term the seeded data is dated in the active one
+            academic_year, semester = term_for_date(self.today).split('/')
+            UniversitySetting.objects.create(
+                university_name='Synthetic University', academic_year=academic_year, current_semester=int(semester)
+            )
+
+    def create_departments(self, count):
+        departments = []
+        for i in range(count):
+            name = DEPARTMENT_NAMES[i % len(DEPARTMENT_NAMES)]
+            if i >= len(DEPARTMENT_NAMES):
+                name = f'{name} {i // len(DEPARTMENT_NAMES) + 1}'
+            departments.append(Department(name=name, code=f'SD{i + 1:02d}'))
+        self.departments = Department.objects.bulk_create(departments)
+        self.fee_by_dept_sem = {}
+        structures = []
+        for dept in self.departments:
+            for sem in SEMESTERS:
+                amount = Decimal(self.rng.randrange(40000, 90000, 5000))
+                self.fee_by_dept_sem[(dept.pk, sem)] = amount
+                structures.append(FeeStructure(department=dept, semester=sem, amount=amount))
+        FeeStructure.objects.bulk_create(structures)
+        return len(self.departments) + len(structures)
+
+    def create_faculty(self, per_department):
+        users = self.make_users('teacher', CustomUser.Role.FACULTY, per_department * len(self.departments))
+        self.make_users('accountant', CustomUser.Role.ACCOUNTANT, 2)
+        self.make_users('admin', CustomUser.Role.ADMIN, 1)
+
+        designations = ['Professor', 'Associate Professor', 'Assistant Professor', 'Lecturer']
+        faculty = []
+        for i, user in enumerate(users):
+            faculty.append(Faculty(
+                user=user,
+                department=self.departments[i % len(self.departments)],
+                designation=self.rng.choice(designations),
+                joining_date=self.today - datetime.timedelta(days=self.rng.randint(200, 6000)),
+            ))
+        self.faculty = Faculty.objects.bulk_create(faculty, batch_size=self.batch_size)
+
+        self.faculty_by_dept = {}
+        for member in self.faculty:
+            self.faculty_by_dept.setdefault(member.department_id, []).append(member)
+        for dept in self.departments:
+            dept.hod = self.faculty_by_dept[dept.pk][0]
+        Department.objects.bulk_update(self.departments, ['hod'])
+        return len(users) + 3
+
+    def create_courses(self, per_semester):
+        courses = []
+        n = 0
+        for dept in self.departments:
+            teachers = self.faculty_by_dept[dept.pk]
+            for sem in SEMESTERS:
+                for _ in range(per_semester):
+                    n += 1
+                    courses.append(Course(
+                        name=f'{dept.name} {sem}{n:03d}',
+                        code=f'SC{n:05d}',
+                        department=dept,
+                        faculty=teachers[n % len(teachers)],
+                        semester=sem,
+                        credits=self.rng.choice([2, 3, 4]),
+                        capacity=10000,
+                    ))
+        self.courses = Course.objects.bulk_create(courses, batch_size=self.batch_size)
+        self.courses_by_dept_sem = {}
+        for course in self.courses:
+            self.courses_by_dept_sem.setdefault((course.department_id, course.semester), []).append(course)
+
+        slots = []
+        for course in self.courses:
+            for day in self.rng.sample(WEEK_DAYS, 3):
+                hour = self.rng.randint(8, 16)
+                slots.append(Timetable(
+                    course=course, faculty_id=course.faculty_id, day_of_week=day,
+                    start_time=datetime.time(hour, 0), end_time=datetime.time(hour + 1, 0),
+                    room_number=f'{self.rng.choice("ABCDE")}-{self.rng.randint(101, 420)}',
+                ))
+        self.bulk_create(Timetable, slots)
+        return len(self.courses) + len(slots)
+
+    def create_students(self, count):
+        users = self.make_users('student', CustomUser.Role.STUDENT, count)
+        students = []
+        for i, user in enumerate(users, 1):
+            sem = self.rng.choice(SEMESTERS)
+            admitted = self.today - datetime.timedelta(days=(sem - 1) * 182 + self.rng.randint(0, 60))
+            students.append(Student(
+                user=user,
+                enrollment_no=f'S{admitted.year}{i:06d}',
+                department=self.rng.choice(self.departments),
+                semester=sem,
+                admission_date=admitted,
+            ))
+        self.students = Student.objects.bulk_create(students, batch_size=self.batch_size)
+
+        # Every student takes all courses offered to their department / semester
+        self.enrolled = {course.pk: [] for course in self.courses}
+        Enrollment = Course.students.through
+        rows = []
+        for student in self.students:
+            for course in self.courses_by_dept_sem.get((student.department_id, student.semester), []):
+                self.enrolled[course.pk].append(student.pk)
+                rows.append(Enrollment(course_id=course.pk, student_id=student.pk))
+        return len(users) + len(self.students) + self.bulk_create(Enrollment, rows)
+
+    def create_attendance(self, days):
+        dates = self.past_days(days)
+        sessions = [
+            Attendance(course=course, date=day, term=term_for_date(day), marked_by_id=course.faculty_id)
+            for course in self.courses if self.enrolled[course.pk]
+            for day in dates
+        ]
+        self.bulk_create(Attendance, sessions)
+
+        rng = self.rng
+
+        def records():
+            for session in sessions:
+                for student_id in self.enrolled[session.course_id]:
+                    yield AttendanceRecord(
+                        attendance_id=session.pk, student_id=student_id, status=rng.random() < 0.82
+                    )
+
+        return len(sessions) + self.bulk_create(AttendanceRecord, records())
+
+    def create_exams(self):
+        exams = []
+        plan = (('INTERNAL', -60, True), ('MID', -30, True), ('FINAL', 20, False))
+        for course in self.courses:
+            for exam_type, offset, published in plan:
+                day = self.today + datetime.timedelta(days=offset + self.rng.randint(-3, 3))
+                exams.append(Exam(
+                    course=course, exam_type=exam_type, total_marks=100, date=day, term=term_for_date(day),
+                    start_time=datetime.time(10, 0), end_time=datetime.time(13, 0),
+                    room_number=f'Hall {self.rng.randint(1, 12)}', is_published=published,
+                ))
+        self.bulk_create(Exam, exams)
+
+        rng = self.rng
+
+        def results():
+            for exam in exams:
+                if exam.date >= self.today:
+                    continue
+                for student_id in self.enrolled[exam.course_id]:
+                    marks = min(100, max(0, rng.gauss(62, 15)))
+                    yield Result(exam_id=exam.pk, student_id=student_id, marks_obtained=Decimal(f'{marks:.2f}'))
+
+        return len(exams) + self.bulk_create(Result, results())
+
+    def create_payments(self, per_student):
+        accountants = list(CustomUser.objects.filter(
+            username__startswith=USERNAME_PREFIX, role=CustomUser.Role.ACCOUNTANT
+        ))
+        modes = [FeePayment.PaymentMode.CASH, FeePayment.PaymentMode.CHEQUE, FeePayment.PaymentMode.ONLINE]
+        payments = []
+        n = 0
+        for student in self.students:
+            total = self.fee_by_dept_sem[(student.department_id, student.semester)]
+            for i in range(per_student):
+                n += 1
+                paid = self.rng.random() < 0.85
+                payments.append(FeePayment(
+                    student_id=student.pk,
+                    amount_paid=(total / per_student).quantize(Decimal('1.00')),
+                    status=FeePayment.Status.PAID if paid else FeePayment.Status.PENDING,
+                    payment_mode=self.rng.choice(modes),
+                    receipt_no=f'RCP-S{n:07d}',
+                    collected_by=self.rng.choice(accountants) if paid else None,
+                ))
+        count = self.bulk_create(FeePayment, payments)
+
+        # payment_date is auto_now_add, so spread the history out afterwards,
+        # one UPDATE per date rather than one per payment
+        by_date = {}
+        for payment in payments:
+            day = self.today - datetime.timedelta(days=self.rng.randint(0, 720))
+            by_date.setdefault(day, []).append(payment.pk)
+        for day, ids in by_date.items():
+            for batch in batched(ids, 900):
+                FeePayment.objects.filter(pk__in=batch).update(payment_date=day, term=term_for_date(day))
+        return count
+
+    def create_notices(self, count):
+        posters = [f.user for f in self.faculty[:50]]
+        notices = []
+        for n in range(1, count + 1):
+            course = self.rng.choice(self.courses) if self.rng.random() < 0.4 else None
+            notices.append(Notice(
+                title=f'Notice #{n}',
+                description='Synthetic notice generated for load testing.',
+                target_audience='STUDENT' if course else self.rng.choice(['ALL', 'FACULTY', 'STUDENT']),
+                target_course=course,
+                posted_by=self.rng.choice(posters),
+            ))
+        return self.bulk_create(Notice, notices)
@@ -0,0 +1,103 @@
+"""
+tracemalloc-based memory profiling of single requests.
+
+``trace_call`` runs any callable under tracemalloc and reports the peak
+memory it needed and the source lines that allocated the memory still held
+at the end, i.e. typically the response body being built.  It is used by
+
+* the ``profile_memory`` management command, which requests a URL through
+  the test client as a given user, and
+* ``core.middleware.MemoryProfileMiddleware``: a superuser adds
+  ``?_memprofile=1`` (or an ``X-UMS-Memprofile: 1`` header) to a request and
+  the report shows up on the admin "Memory profiles" page of that worker.
+"""
+import collections
+import linecache
+import threading
+import tracemalloc
+
+from django.utils import timezone
+
+MEMORY_PARAM = '_memprofile'
+MEMORY_HEADER = 'X-UMS-Memprofile'
+
+IGNORED_FILES = (tracemalloc.__file__, linecache.__file__, '<frozen importlib._bootstrap>',
+                 '<frozen importlib._bootstrap_external>', '<unknown>')
+
+_recent = collections.deque(maxlen=50)
+_recent_lock = threading.Lock()
+
+
+def wants_memory_profile(request):
+    """True if a superuser asked for this request to be memory-profiled."""
+    flag = request.GET.get(MEMORY_PARAM) or request.headers.get(MEMORY_HEADER)
+    if flag in (None, '', '0', 'false'):
+        return False
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_superuser)
+
+
+def trace_call(label, func, *args, top=15, frames=1, **kwargs):
+    """
+    Call ``func(*args, **kwargs)`` under tracemalloc.
+
+    Returns ``(result, report)``.  ``report['peak_bytes']`` is the highest
+    amount of memory allocated during the call on top of what was in use
+    before it; ``report['top']`` lists the lines holding most of the memory
+    still allocated when the call returned (the result is kept alive while
+    the snapshot is taken, so a response body counts).
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start(frames)
+    before = tracemalloc.take_snapshot() if was_tracing else None
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    try:
+        result = func(*args, **kwargs)
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    filters = [tracemalloc.Filter(False, pattern) for pattern in IGNORED_FILES]
+    snapshot = snapshot.filter_traces(filters)
+    if before is not None:
+        stats = snapshot.compare_to(before.filter_traces(filters), 'lineno')
+        sites = [(s.traceback, s.size_diff, s.count_diff) for s in stats if s.size_diff > 0]
+    else:
+        sites = [(s.traceback, s.size, s.count) for s in snapshot.statistics('lineno')]
+
+    report = {
+        'label': label,
+        'created': timezone.now(),
+        'peak_bytes': peak - baseline,
+        'retained_bytes': current - baseline,
+        'top': [
+            {
+                'location': f'{tb[0].filename}:{tb[0].lineno}',
+                'code': linecache.getline(tb[0].filename, tb[0].lineno).strip(),
+                'size_bytes': size,
+                'count': count,
+            }
+            for tb, size, count in sites[:top]
+        ],
+    }
+    return result, report
+
+
+def remember(report):
+    with _recent_lock:
+        _recent.appendleft(report)
+
+
+def recent_reports():
+    """Reports captured by ``MemoryProfileMiddleware`` in this process, newest first."""
+    with _recent_lock:
+        return list(_recent)
+
+
+def clear_reports():
+    with _recent_lock:
+        _recent.clear()
@@ -0,0 +1,236 @@
+"""
+Prometheus-format application metrics.
+
+Counters and histograms are kept in memory per process.  Under gunicorn every
+worker is its own process, so when ``METRICS_DIR`` is set each worker also
+writes a snapshot of its metrics to ``<METRICS_DIR>/metrics_<pid>_<id>.json``
+and the ``/metrics/`` view adds up the snapshots of all workers.  ``<id>`` is
+random per process, so a new worker that gets the pid of an exited one does
+not overwrite its snapshot.  Snapshots of workers that have exited are kept
+and added in, so counters never go backwards; clear the directory when the
+server (not a single worker) is restarted.
+"""
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    'ums_http_requests_total': (
+        'counter', 'HTTP requests served, by URL name, method and status code.', None),
+    'ums_http_request_duration_seconds': (
+        'histogram', 'Wall time spent serving a request, by URL name.', LATENCY_BUCKETS),
+    'ums_db_queries_per_request': (
+        'histogram', 'SQL queries run while serving a request, by URL name.', QUERY_BUCKETS),
+    'ums_db_query_duration_seconds_total': (
+        'counter', 'Time spent in SQL queries, by URL name.', None),
+    'ums_template_render_seconds_total': (
+        'counter', 'Time spent rendering templates, by URL name.', None),
+    'ums_pdf_render_duration_seconds': (
+        'histogram', 'Duration of core.utils.render_to_pdf calls, by template.', LATENCY_BUCKETS),
+}
+
+
+class Registry:
+    """Thread-safe store of counter values and histogram buckets."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            data = self.histograms.get(key)
+            if data is None:
+                data = self.histograms[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    data['buckets'][i] += 1
+            data['sum'] += value
+            data['count'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [
+                    [name, list(labels), list(data['buckets']), data['sum'], data['count']]
+                    for (name, labels), data in self.histograms.items()
+                ],
+            }
+
+    def merge(self, snapshot):
+        """Add the values of another process' ``snapshot`` to this registry."""
+        with self.lock:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                self.counters[key] = self.counters.get(key, 0) + value
+            for name, labels, buckets, total, count in snapshot['histograms']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                data = self.histograms.get(key)
+                if data is None:
+                    data = self.histograms[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+                data['buckets'] = [a + b for a, b in zip(data['buckets'], buckets)]
+                data['sum'] += total
+                data['count'] += count
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+registry = Registry()
+_last_flush = 0.0
+# (pid, snapshot file name) of this process; a forked worker makes its own
+_snapshot = (None, '')
+
+
+# ── Recording ───────────────────────────────────────────────────────────────
+def metrics_enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def record_request(profile):
+    """Fold a finished ``core.profiling.RequestProfile`` into the metrics."""
+    if not metrics_enabled():
+        return
+    url_name = profile.url_name or 'unresolved'
+    registry.inc('ums_http_requests_total', {
+        'url_name': url_name, 'method': profile.method, 'status': str(profile.status_code),
+    })
+    labels = {'url_name': url_name}
+    registry.observe('ums_http_request_duration_seconds', labels, profile.wall_time)
+    registry.observe('ums_db_queries_per_request', labels, profile.query_count)
+    registry.inc('ums_db_query_duration_seconds_total', labels, profile.db_time)
+    registry.inc('ums_template_render_seconds_total', labels, profile.template_time)
+    maybe_flush()
+
+
+@contextmanager
+def pdf_render_timer(template_name):
+    """Time a PDF render; used by ``core.utils.render_to_pdf``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics_enabled():
+            registry.observe('ums_pdf_render_duration_seconds', {'template': template_name},
+                             time.perf_counter() - start)
+
+
+# ── Multi-process aggregation ───────────────────────────────────────────────
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', '')
+
+
+def snapshot_name():
+    """The file name of this process' snapshot, unique even when a pid is reused."""
+    global _snapshot
+    pid = os.getpid()
+    if _snapshot[0] != pid:
+        _snapshot = (pid, f'metrics_{pid}_{uuid.uuid4().hex[:12]}.json')
+    return _snapshot[1]
+
+
+def flush():
+    """Write this process' snapshot to ``METRICS_DIR`` (no-op when unset)."""
+    global _last_flush
+    directory = metrics_dir()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, snapshot_name())
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(registry.snapshot(), fh)
+    os.replace(tmp, path)
+    _last_flush = time.monotonic()
+
+
+def maybe_flush():
+    """Flush at most once every ``METRICS_FLUSH_INTERVAL`` seconds."""
+    interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+    if metrics_dir() and time.monotonic() - _last_flush >= interval:
+        flush()
+
+
+def collect():
+    """A registry holding the metrics of every process (or just this one)."""
+    directory = metrics_dir()
+    if not directory:
+        return registry
+
+    flush()
+    combined = Registry()
+    for path in glob.glob(os.path.join(directory, 'metrics_*.json')):
+        try:
+            with open(path) as fh:
+                combined.merge(json.load(fh))
+        except (OSError, ValueError):
+            # A worker is replacing its file right now; skip it this scrape.
+            continue
+    return combined
+
+
+# ── Exposition ──────────────────────────────────────────────────────────────
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render(source=None):
+    """Return all metrics in the Prometheus text exposition format."""
+    source = source or collect()
+    with source.lock:
+        counters = sorted(source.counters.items())
+        histograms = sorted(source.histograms.items())
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in counters:
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            continue
+        for (metric, labels), data in histograms:
+            if metric != name:
+                continue
+            for bound, count in zip(buckets, data['buckets']):
+                le = labels + (('le', _format_value(float(bound))),)
+                lines.append(f'{name}_bucket{_format_labels(le)} {count}')
+            le = labels + (('le', '+Inf'),)
+            lines.append(f'{name}_bucket{_format_labels(le)} {data["count"]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(data["sum"])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {data["count"]}')
+    return '\n'.join(lines) + '\n'
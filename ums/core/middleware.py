@@ -0,0 +1,144 @@
+import cProfile
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+
+from . import cpu_profiles, memory_profiles, metrics, tracing
+from .profiling import RequestProfile, record_profile
+
+
+class QueryProfilerMiddleware:
+    """
+    Record view name, SQL query count, DB time, template render time and
+    wall time for every request, and flag views that exceed their query
+    budget (see ``QUERY_BUDGET`` / ``QUERY_BUDGETS`` in settings).  The same
+    figures feed the Prometheus metrics in ``core.metrics``, so requests are
+    measured while either ``QUERY_PROFILER_ENABLED`` or ``METRICS_ENABLED``
+    is on.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profiler_enabled = getattr(settings, 'QUERY_PROFILER_ENABLED', True)
+        if not profiler_enabled and not metrics.metrics_enabled():
+            return self.get_response(request)
+
+        profile = RequestProfile(request.path, request.method)
+        request.profile = profile
+        token = profile.activate()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(profile.query_wrapper))
+                response = self.get_response(request)
+        finally:
+            RequestProfile.deactivate(token)
+
+        profile.finish(response.status_code)
+        if profiler_enabled:
+            record_profile(profile)
+        metrics.record_request(profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(request, 'profile', None)
+        if profile is not None and request.resolver_match is not None:
+            profile.view_name = request.resolver_match._func_path
+            profile.url_name = request.resolver_match.url_name
+        return None
+
+
+class CProfileMiddleware:
+    """
+    Run a single request under cProfile when a superuser asks for it with
+    ``?_profile=1`` or an ``X-UMS-Profile: 1`` header (see ``core.cpu_profiles``).
+    The response carries an ``X-UMS-Profile`` header linking to the call tree.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not cpu_profiles.wants_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        response = profiler.runcall(cpu_profiles.profiled_request, self.get_response, request)
+        name = cpu_profiles.save_profile(profiler, request, response.status_code)
+        response[cpu_profiles.PROFILE_HEADER] = reverse('cpu_profile_detail', args=[name])
+        return response
+
+
+class MemoryProfileMiddleware:
+    """
+    Run a single request under tracemalloc when a superuser asks for it with
+    ``?_memprofile=1`` or an ``X-UMS-Memprofile: 1`` header (see
+    ``core.memory_profiles``).  The peak is returned in an
+    ``X-UMS-Memory-Peak`` header and the full report is kept for the admin
+    "Memory profiles" page.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not memory_profiles.wants_memory_profile(request):
+            return self.get_response(request)
+
+        label = f'{request.method} {request.get_full_path()}'
+        response, report = memory_profiles.trace_call(label, self.get_response, request)
+        report['status'] = response.status_code
+        memory_profiles.remember(report)
+        response['X-UMS-Memory-Peak'] = str(report['peak_bytes'])
+        return response
+
+
+class TracingMiddleware:
+    """
+    Record a trace of spans (view, ORM queries, templates, PDF rendering) for
+    each request and append it to the trace file (see ``core.tracing``).
+
+    ``process_view`` opens the view span and lets Django call the view; the
+    span is closed once the response is back, so it also covers the
+    rendering of a ``TemplateResponse``.  Kept last in ``MIDDLEWARE`` so that
+    the other middleware's ``process_view`` hooks are not counted in it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not tracing.tracing_enabled() or not tracing.should_sample():
+            return self.get_response(request)
+
+        trace = tracing.Trace(request.method, request.path)
+        token = trace.activate()
+        try:
+            with tracing.span(f'{request.method} {request.path}', 'request'):
+                try:
+                    response = self.get_response(request)
+                finally:
+                    view_span = request.__dict__.pop('_trace_view_span', None)
+                    if view_span is not None:
+                        view_span.close()
+        finally:
+            tracing.Trace.deactivate(token)
+
+        trace.finish(response.status_code)
+        tracing.write_trace(trace)
+        response['X-UMS-Trace-Id'] = trace.trace_id
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        trace = tracing.get_active_trace()
+        if trace is None:
+            return None
+        trace.view = request.resolver_match._func_path if request.resolver_match else None
+        view_span = ExitStack()
+        view_span.enter_context(tracing.span(trace.view or view_func.__name__, 'view'))
+        request._trace_view_span = view_span
+        return None
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:38
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def populate_counters(apps, schema_editor):
+    count = lambda label: apps.get_model(label).objects.count()
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    values = {
+        'students': count('students.Student'),
+        'teachers': count('faculty.Faculty'),
+        'courses': count('courses.Course'),
+        'revenue': apps.get_model('fees', 'FeePayment').objects.aggregate(total=Sum('amount_paid'))['total'] or 0,
+        'attendance_records': AttendanceRecord.objects.count(),
+        'attendance_present': AttendanceRecord.objects.filter(status=True).count(),
+    }
+    DashboardCounter = apps.get_model('core', 'DashboardCounter')
+    DashboardCounter.objects.bulk_create([DashboardCounter(name=k, value=v) for k, v in values.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('attendance', '0003_initial'),
+        ('courses', '0005_course_capacity'),
+        ('faculty', '0001_initial'),
+        ('fees', '0004_feepayment_collected_by_feepayment_payment_mode_and_more'),
+        ('students', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:36
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_dashboardcounter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='universitysetting',
+            name='academic_year',
+            field=models.CharField(default='2024-2025', max_length=20, validators=[core.models.validate_academic_year]),
+        ),
+    ]
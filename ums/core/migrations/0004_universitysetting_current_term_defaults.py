@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:45
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_universitysetting_academic_year_format'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='universitysetting',
+            name='academic_year',
+            field=models.CharField(default=core.models.default_academic_year, max_length=20, validators=[core.models.validate_academic_year]),
+        ),
+        migrations.AlterField(
+            model_name='universitysetting',
+            name='current_semester',
+            field=models.IntegerField(default=core.models.default_semester),
+        ),
+    ]
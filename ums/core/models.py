@@ -1,16 +1,60 @@
+import re
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
+
+
+def validate_academic_year(value):
+    """``YYYY-YYYY`` with consecutive years, as term labels start (``core.terms``)."""
+    match = re.fullmatch(r'(\d{4})-(\d{4})', value or '')
+    if match is None or int(match[2]) != int(match[1]) + 1:
+        raise ValidationError('Enter the academic year as YYYY-YYYY, e.g. 2024-2025.', code='invalid')
+
+
+# Defaults of a new UniversitySetting: today's term, not a fixed one that ends
+def default_academic_year():
+    """The academic year today falls in."""
+    from .terms import term_for_date
+    return term_for_date(timezone.localdate()).split('/')[0]
+
+
+def default_semester():
+    """The term of the academic year today falls in."""
+    from .terms import term_for_date
+    return int(term_for_date(timezone.localdate()).split('/')[1])
+
 
 class UniversitySetting(models.Model):
     university_name = models.CharField(max_length=200, default="My University")
     logo = models.ImageField(upload_to='university_logos/', blank=True, null=True)
-    academic_year = models.CharField(max_length=20, default="2024-2025")
-    current_semester = models.IntegerField(default=1)
+    academic_year = models.CharField(max_length=20, default=default_academic_year, validators=[validate_academic_year])
+    current_semester = models.IntegerField(default=default_semester)
+
+    def clean(self):
+        # current_semester names the active term within the academic year
+        terms = getattr(settings, 'ACADEMIC_TERMS_PER_YEAR', 2)
+        if isinstance(self.current_semester, int) and not 1 <= self.current_semester <= terms:
+            raise ValidationError({'current_semester': f'Enter a semester from 1 to {terms}.'})
 
     def save(self, *args, **kwargs):
-        if not self.pk and UniversitySetting.objects.exists():
-            # Enforce singleton behavior
-            self.pk = UniversitySetting.objects.first().pk
+        if not self.pk:
+            # Enforce singleton behavior: reuse the existing row, if any
+            self.pk = UniversitySetting.objects.values_list('pk', flat=True).first()
         super(UniversitySetting, self).save(*args, **kwargs)
 
     def __str__(self):
         return "University Configuration"
+
+
+class DashboardCounter(models.Model):
+    """
+    A running total shown on the admin dashboard (see ``core.counters``).
+    Kept up to date by signals; ``manage.py rebuild_counters`` recomputes it.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
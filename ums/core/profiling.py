@@ -0,0 +1,214 @@
+"""
+Per-request SQL / latency profiling.
+
+The middleware in ``core.middleware`` opens a ``RequestProfile`` for every
+request and stores it in a context variable.  The database execute wrapper
+and the profiling template backend below add to whichever profile is active,
+so nothing in the views has to change to be measured.
+"""
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+from .tracing import span
+
+logger = logging.getLogger('ums.profiler')
+
+_active_profile = ContextVar('ums_active_profile', default=None)
+
+
+def get_active_profile():
+    """Return the ``RequestProfile`` of the request being served, if any."""
+    return _active_profile.get()
+
+
+def get_query_budget(view_name):
+    """Maximum number of SQL queries a view may run before it is flagged."""
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(view_name, getattr(settings, 'QUERY_BUDGET', 50))
+
+
+class RequestProfile:
+    """Timings and counters collected while a single request is served."""
+
+    def __init__(self, path, method='GET'):
+        self.path = path
+        self.method = method
+        self.view_name = None
+        self.url_name = None
+        self.status_code = None
+        self.query_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.wall_time = 0.0
+        self._template_depth = 0
+        self._started = time.perf_counter()
+
+    def activate(self):
+        return _active_profile.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _active_profile.reset(token)
+
+    def query_wrapper(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook counting and timing queries."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.db_time += time.perf_counter() - start
+
+    def finish(self, status_code):
+        self.status_code = status_code
+        self.wall_time = time.perf_counter() - self._started
+
+    @property
+    def budget(self):
+        return get_query_budget(self.view_name)
+
+    @property
+    def over_budget(self):
+        return self.query_count > self.budget
+
+    def as_dict(self):
+        return {
+            'view': self.view_name,
+            'url_name': self.url_name,
+            'method': self.method,
+            'path': self.path,
+            'status': self.status_code,
+            'queries': self.query_count,
+            'query_budget': self.budget,
+            'over_budget': self.over_budget,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'wall_ms': round(self.wall_time * 1000, 2),
+        }
+
+
+# ── Template render timing ──────────────────────────────────────────────────
+class ProfilingTemplate(Template):
+    """
+    Backend template that adds its render time to the active profile and
+    opens a tracing span.
+    """
+
+    def render(self, context=None, request=None):
+        with span(self.template.name or '<string>', 'template'):
+            return self._render(context, request)
+
+    def _render(self, context, request):
+        profile = get_active_profile()
+        if profile is None:
+            return super().render(context, request)
+
+        # Only the outermost render is timed so that nested renders
+        # (e.g. a PDF template rendered from inside a view) don't count twice.
+        profile._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile._template_depth -= 1
+            if profile._template_depth == 0:
+                profile.template_time += time.perf_counter() - start
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """Drop-in replacement for the Django template backend that is timed."""
+
+    def from_string(self, template_code):
+        return ProfilingTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return ProfilingTemplate(template.template, self)
+
+
+# ── Worst-offender statistics (per process) ─────────────────────────────────
+class ViewStats:
+    """Aggregated profiling figures for one view inside this process."""
+
+    def __init__(self, view_name):
+        self.view_name = view_name
+        self.hits = 0
+        self.total_queries = 0
+        self.max_queries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.total_db_ms = 0.0
+        self.total_template_ms = 0.0
+        self.over_budget = 0
+
+    def add(self, profile):
+        wall_ms = profile.wall_time * 1000
+        self.hits += 1
+        self.total_queries += profile.query_count
+        self.max_queries = max(self.max_queries, profile.query_count)
+        self.total_ms += wall_ms
+        self.max_ms = max(self.max_ms, wall_ms)
+        self.total_db_ms += profile.db_time * 1000
+        self.total_template_ms += profile.template_time * 1000
+        if profile.over_budget:
+            self.over_budget += 1
+
+    @property
+    def avg_queries(self):
+        return self.total_queries / self.hits if self.hits else 0
+
+    @property
+    def avg_ms(self):
+        return self.total_ms / self.hits if self.hits else 0
+
+    @property
+    def avg_db_ms(self):
+        return self.total_db_ms / self.hits if self.hits else 0
+
+    @property
+    def avg_template_ms(self):
+        return self.total_template_ms / self.hits if self.hits else 0
+
+    @property
+    def budget(self):
+        return get_query_budget(self.view_name)
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record_profile(profile):
+    """Log a finished profile and fold it into the per-view statistics."""
+    data = profile.as_dict()
+    if profile.over_budget:
+        logger.warning(json.dumps(data))
+    else:
+        logger.info(json.dumps(data))
+
+    if profile.view_name is None:
+        return
+    with _stats_lock:
+        stats = _stats.get(profile.view_name)
+        if stats is None:
+            stats = _stats[profile.view_name] = ViewStats(profile.view_name)
+        stats.add(profile)
+
+
+def worst_offenders(order_by='max_queries', limit=25):
+    """Per-view statistics sorted by the given attribute, worst first."""
+    with _stats_lock:
+        rows = list(_stats.values())
+    rows.sort(key=lambda s: getattr(s, order_by), reverse=True)
+    return rows[:limit]
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
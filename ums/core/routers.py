@@ -0,0 +1,71 @@
+"""
+Send heavy read-only work to a read replica.
+
+    @accountant_required
+    @read_from_replica()
+    def accountant_reports(request): ...
+
+    with read_from_replica():
+        rows = list(FeePayment.objects.filter(...))
+
+With ``REPLICA_DATABASE_URL`` set, settings add a ``replica`` database
+alias and install ``ReplicaRouter``.  Inside ``read_from_replica`` (the
+whole view, template rendering included) every read goes to the replica.
+Writes always go to the primary, and so do reads made inside a transaction
+on the primary.  Everything else, including the session and user lookups of
+every request, stays on the primary.  Flows that read what they just wrote,
+like recording a payment and showing its receipt, therefore never see
+replication lag.  Without a replica, ``read_from_replica`` changes nothing.
+
+The replica may not have received the write that bumped a cache generation
+yet, so ``core.cache_versions.cached`` keeps values built from replica reads
+for at most ``REPLICA_CACHE_TIMEOUT`` seconds.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = 'replica'
+
+_replica_reads = contextvars.ContextVar('ums_replica_reads', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def reading_from_replica():
+    """Whether reads made now go to the replica."""
+    return _replica_reads.get() and replica_configured()
+
+
+@contextmanager
+def read_from_replica():
+    """Context manager / decorator routing the reads made inside it to the replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """Reads to the replica inside ``read_from_replica``, everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if reading_from_replica() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases hold the same rows.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary.
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,136 @@
+"""
+Slow-query log.
+
+Every database connection gets an execute wrapper (installed from
+``CoreConfig.ready`` through the ``connection_created`` signal).  Queries
+slower than ``SLOW_QUERY_THRESHOLD_MS`` are logged as one JSON line on the
+``ums.slow_queries`` logger with their SQL, parameters, duration, the view
+being served, the first stack frame in project code and the database's own
+query plan (``EXPLAIN QUERY PLAN`` on SQLite, ``EXPLAIN`` on PostgreSQL).
+"""
+import json
+import logging
+import time
+import traceback
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import NotSupportedError, transaction
+
+from .profiling import get_active_profile
+
+logger = logging.getLogger('ums.slow_queries')
+
+# Set while the logger runs its own EXPLAIN, so that it is not timed itself.
+_explaining = ContextVar('ums_slow_query_explaining', default=False)
+
+MAX_PARAM_LENGTH = 200
+
+
+def get_threshold():
+    """Duration in seconds above which a query is logged."""
+    return getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 200) / 1000
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook logging queries over the threshold."""
+    if _explaining.get():
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - start
+    if duration >= get_threshold():
+        log_slow_query(context['connection'], sql, params, many, duration)
+    return result
+
+
+def install(sender=None, connection=None, **kwargs):
+    """``connection_created`` receiver adding the wrapper to a new connection."""
+    if not getattr(settings, 'SLOW_QUERY_LOG_ENABLED', True):
+        return
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+# ── Log entry ───────────────────────────────────────────────────────────────
+def log_slow_query(connection, sql, params, many, duration):
+    profile = get_active_profile()
+    entry = {
+        'duration_ms': round(duration * 1000, 2),
+        'alias': connection.alias,
+        'vendor': connection.vendor,
+        'sql': sql,
+        'params': format_params(params, many),
+        'view': profile.view_name if profile else None,
+        'path': profile.path if profile else None,
+        'frame': calling_frame(),
+        'explain': None if many else explain(connection, sql, params),
+    }
+    logger.warning(json.dumps(entry, default=str))
+    return entry
+
+
+def format_params(params, many):
+    if params is None:
+        return None
+    if many:
+        return f'<{len(params)} parameter sets>' if hasattr(params, '__len__') else '<parameter sets>'
+    values = params.values() if isinstance(params, dict) else params
+    return [
+        value if len(text := repr(value)) <= MAX_PARAM_LENGTH else text[:MAX_PARAM_LENGTH] + '…'
+        for value in values
+    ]
+
+
+def calling_frame():
+    """``file:line in function`` of the innermost stack frame in project code."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        filename = frame.filename
+        if (filename.startswith(base_dir) and 'site-packages' not in filename
+                and not filename.endswith(('core/slow_queries.py', 'core/profiling.py'))):
+            return f'{filename[len(base_dir) + 1:]}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def explain(connection, sql, params):
+    """The database's plan for ``sql`` as a list of lines, or ``None``."""
+    if not getattr(settings, 'SLOW_QUERY_EXPLAIN', True):
+        return None
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    try:
+        prefix = connection.ops.explain_query_prefix()
+    except NotSupportedError:
+        return None
+
+    token = _explaining.set(True)
+    try:
+        # Inside a transaction a failing EXPLAIN must not abort the
+        # surrounding work on PostgreSQL, hence the savepoint.  Outside one it
+        # runs in autocommit: opening a transaction would take SQLite's write
+        # lock (transaction_mode IMMEDIATE) just to log a query.
+        if connection.in_atomic_block:
+            guard = transaction.atomic(using=connection.alias)
+        else:
+            guard = nullcontext()
+        with guard:
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                rows = cursor.fetchall()
+    except Exception as exc:
+        return [f'EXPLAIN failed: {exc}']
+    finally:
+        _explaining.reset(token)
+
+    if connection.vendor == 'sqlite':
+        # (id, parent, notused, detail)
+        depth = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append('  ' * depth[node_id] + detail)
+        return lines
+    return [' | '.join(str(col) for col in row) for row in rows]
@@ -0,0 +1,128 @@
+"""
+Academic terms.
+
+``Attendance``, ``Exam`` and ``FeePayment`` rows carry a ``term`` label such as
+``"2024-2025/1"``: the academic year, then the term within it.  It is worked
+out from the row's date when the row is saved (``term_for_date``).  Academic
+years start on the first day of ``ACADEMIC_YEAR_START_MONTH`` and are split
+into ``ACADEMIC_TERMS_PER_YEAR`` terms of equal length.
+
+The active term is the one named by ``UniversitySetting``: its
+``academic_year`` (written ``YYYY-YYYY``) and ``current_semester``.  Until a
+valid pair is saved, today's term is the active one, so a malformed year
+cannot leave every term-scoped page empty.  A saved term that has already
+ended stays active - closing a term is the admin's call - but is logged as
+a warning (``ums.terms``) so that a forgotten setting is noticed.  Student,
+teacher and accountant pages show the active term unless ``?term=`` names
+another one, or ``?term=all`` asks for every term::
+
+    term = selected_term(request)
+    if term:
+        records = records.filter(attendance__term=term)
+
+Reading the active term costs no query (``core.university``).
+"""
+import datetime
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .models import validate_academic_year
+from .university import get_university_settings
+
+logger = logging.getLogger('ums.terms')
+
+ALL_TERMS = 'all'
+# Terms offered by the term pickers: the active one and those before it.
+TERM_CHOICES = 8
+
+
+def _calendar():
+    start_month = getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 7)
+    terms = getattr(settings, 'ACADEMIC_TERMS_PER_YEAR', 2)
+    return start_month, terms
+
+
+def term_label(first_year, term):
+    return f'{first_year}-{first_year + 1}/{term}'
+
+
+def term_for_date(day):
+    """The label of the term ``day`` (a date or an ISO date string) falls in."""
+    if isinstance(day, str):
+        day = datetime.date.fromisoformat(day)
+    start_month, terms = _calendar()
+    first_year = day.year if day.month >= start_month else day.year - 1
+    months_in = (day.month - start_month) % 12
+    return term_label(first_year, months_in * terms // 12 + 1)
+
+
+def is_valid_term(academic_year, term):
+    """Whether ``academic_year`` (``YYYY-YYYY``) and ``term`` name a term of the calendar."""
+    try:
+        validate_academic_year(academic_year)
+    except ValidationError:
+        return False
+    return isinstance(term, int) and 1 <= term <= _calendar()[1]
+
+
+def _term_key(label):
+    year, term = label.split('/')
+    return int(year.split('-')[0]), int(term)
+
+
+# Ended terms already warned about, so the warning is not logged per request
+_warned_ended = set()
+
+
+def active_term():
+    """The term named by ``UniversitySetting``, or today's term until a valid one is saved."""
+    university = get_university_settings()
+    today = term_for_date(timezone.localdate())
+    if university.pk is None or not is_valid_term(university.academic_year, university.current_semester):
+        return today
+    term = f'{university.academic_year}/{university.current_semester}'
+    if _term_key(term) < _term_key(today) and term not in _warned_ended:
+        _warned_ended.add(term)
+        logger.warning('The active term %s has ended (today is in %s); update the university settings.', term, today)
+    return term
+
+
+def previous_term(label):
+    """The term before ``label``, or ``None`` when ``label`` is not ``YYYY-YYYY/n``."""
+    try:
+        first_year, term = _term_key(label)
+    except ValueError:
+        return None
+    if term > 1:
+        return term_label(first_year, term - 1)
+    return term_label(first_year - 1, _calendar()[1])
+
+
+def term_choices():
+    """The active term and the ``TERM_CHOICES - 1`` terms before it, newest first."""
+    choices = [active_term()]
+    while len(choices) < TERM_CHOICES:
+        before = previous_term(choices[-1])
+        if before is None:
+            break
+        choices.append(before)
+    return choices
+
+
+def selected_term(request):
+    """The term a page shows: ``?term=``, the active term by default, ``None`` for all terms."""
+    term = request.GET.get('term', '').strip()
+    if term == ALL_TERMS:
+        return None
+    return term or active_term()
+
+
+def term_context(term):
+    """Template context for ``includes/term_select.html``."""
+    choices = term_choices()
+    if term and term not in choices:
+        choices.append(term)
+    return {'term': term, 'term_choices': choices, 'active_term': choices[0]}
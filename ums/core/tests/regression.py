@@ -0,0 +1,266 @@
+"""
+Test helpers shared by the app test suites.
+
+``SeededUniversity`` builds a small but realistic university (departments,
+faculty, students, courses, timetable, attendance, exams, results, fees and
+notices) and can ``grow()`` it in place.  ``QueryCountMixin`` uses it to
+check that every view runs the same number of SQL queries at two data sizes,
+so N+1 loops fail the suite instead of reaching production.
+"""
+import datetime
+import itertools
+from decimal import Decimal
+
+from django.contrib.admin.models import LogEntry, ADDITION
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from core import counters
+from core.models import UniversitySetting
+from core.terms import term_for_date
+from core.university import invalidate_university_settings
+from attendance.models import Attendance, AttendanceRecord
+from courses.models import Course
+from departments.models import Department
+from examinations.models import Exam, Result
+from faculty.models import Faculty
+from fees.models import FeeStructure, FeePayment
+from notices.models import Notice
+from students.models import Student
+from timetable.models import Timetable
+
+WEEK_DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def reset_caches():
+    """Empty the shared cache and every process-local cache."""
+    cache.clear()
+    invalidate_university_settings()
+
+
+class SeededUniversity:
+    """A seeded university whose first objects stay stable as it grows."""
+
+    def __init__(self, departments=2, courses_per_department=2, students_per_department=4,
+                 attendance_sessions=3):
+        self._seq = itertools.count(1)
+        self.today = timezone.localdate()
+        self.attendance_sessions = 0
+
+        academic_year, semester = term_for_date(self.today).split('/')
+        UniversitySetting.objects.create(
+            university_name='Test University', academic_year=academic_year, current_semester=int(semester)
+        )
+        self.admin = self._user('admin', CustomUser.Role.ADMIN, is_superuser=True, is_staff=True)
+        self.accountant = self._user('accountant', CustomUser.Role.ACCOUNTANT)
+
+        self.departments = []
+        self.faculty = []
+        self.courses = []
+        self.students = []
+        self.exams = []
+        for _ in range(departments):
+            self.add_department(courses_per_department)
+
+        self.add_students(students_per_department)
+        self.add_attendance(attendance_sessions)
+
+        # Stable handles used to build URLs
+        self.student = self.students[0]
+        self.teacher = self.faculty[0]
+        self.course = self.courses[0]
+        self.department = self.departments[0]
+        self.exam = self.exams[0]
+        self.attendance = Attendance.objects.filter(course=self.course).first()
+        self.payment = FeePayment.objects.filter(student=self.student).first()
+        self.notice = Notice.objects.first()
+        self.timetable = Timetable.objects.filter(course=self.course).first()
+        self.fee_structure = FeeStructure.objects.filter(department=self.department).first()
+
+    def _next(self):
+        return next(self._seq)
+
+    def _user(self, prefix, role, **extra):
+        n = self._next()
+        return CustomUser.objects.create(
+            username=f'{prefix}{n}', first_name=prefix.title(), last_name=f'User{n}',
+            email=f'{prefix}{n}@example.com', role=role, password='!', **extra
+        )
+
+    def add_department(self, courses=2):
+        """Add a department with two teachers, its fee structure and courses."""
+        n = self._next()
+        dept = Department.objects.create(name=f'Department {n}', code=f'D{n}')
+        self.departments.append(dept)
+        FeeStructure.objects.create(department=dept, semester=1, amount=Decimal('50000'))
+
+        for _ in range(2):
+            self.faculty.append(Faculty.objects.create(
+                user=self._user('teacher', CustomUser.Role.FACULTY),
+                department=dept, designation='Professor', joining_date=datetime.date(2020, 1, 1)
+            ))
+        dept.hod = self.faculty[-2]
+        dept.save()
+
+        for _ in range(courses):
+            self.add_course(dept)
+
+        for audience in ('ALL', 'FACULTY', 'STUDENT'):
+            Notice.objects.create(
+                title=f'{audience} notice {n}', description='General notice',
+                target_audience=audience, posted_by=self.admin
+            )
+        return dept
+
+    def add_course(self, dept):
+        """Add a course taught by one of the department's teachers.
+
+        Students already in the department are enrolled, and graded for the
+        course's past exam.
+        """
+        teachers = [f for f in self.faculty if f.department_id == dept.pk]
+        index = len([c for c in self.courses if c.department_id == dept.pk])
+        n = self._next()
+        course = Course.objects.create(
+            name=f'Course {n}', code=f'C{n}', department=dept,
+            faculty=teachers[index % len(teachers)], semester=1, credits=4
+        )
+        self.courses.append(course)
+
+        for day_offset, room in ((0, 'R1'), (1, 'R2')):
+            Timetable.objects.create(
+                course=course, faculty=course.faculty,
+                day_of_week=WEEK_DAYS[(self.today.weekday() + day_offset) % 7],
+                start_time=datetime.time(8 + index, 0), end_time=datetime.time(9 + index, 0), room_number=room
+            )
+        for exam_type, offset, published in (('MID', -10, True), ('FINAL', 10, False)):
+            self.exams.append(Exam.objects.create(
+                course=course, exam_type=exam_type, total_marks=100,
+                date=self.today + datetime.timedelta(days=offset), is_published=published
+            ))
+        Notice.objects.create(
+            title=f'Notice for {course.code}', description='Course notice',
+            target_audience='STUDENT', target_course=course, posted_by=course.faculty.user
+        )
+
+        dept_students = [s for s in self.students if s.department_id == dept.pk]
+        course.students.add(*dept_students)
+        for student in dept_students:
+            self._grade(student, [course])
+        return course
+
+    def _grade(self, student, courses):
+        for exam in self.exams:
+            if exam.course in courses and exam.date < self.today:
+                Result.objects.create(exam=exam, student=student, marks_obtained=Decimal(30 + student.pk % 60))
+
+    def add_students(self, per_department):
+        """Enroll new students in every course of their department."""
+        for dept in self.departments:
+            dept_courses = [c for c in self.courses if c.department_id == dept.pk]
+            for _ in range(per_department):
+                n = self._next()
+                student = Student.objects.create(
+                    user=self._user('student', CustomUser.Role.STUDENT),
+                    enrollment_no=f'ENR{n:05d}', department=dept, semester=1,
+                    admission_date=datetime.date(2023, 7, 1)
+                )
+                self.students.append(student)
+                for course in dept_courses:
+                    course.students.add(student)
+                self._grade(student, dept_courses)
+
+                FeePayment.objects.create(
+                    student=student, amount_paid=Decimal('10000'), status='PAID',
+                    payment_mode='CASH', collected_by=self.accountant
+                )
+                FeePayment.objects.create(
+                    student=student, amount_paid=Decimal('5000'), status='PENDING', payment_mode='ONLINE'
+                )
+                LogEntry.objects.log_action(
+                    user_id=self.admin.pk, content_type_id=ContentType.objects.get_for_model(student).pk,
+                    object_id=student.pk, object_repr=str(student), action_flag=ADDITION
+                )
+
+    def add_attendance(self, sessions):
+        """Add attendance sessions (one per course per day) for enrolled students."""
+        for _ in range(sessions):
+            self.attendance_sessions += 1
+            day = self.today - datetime.timedelta(days=self.attendance_sessions)
+            for course in self.courses:
+                att = Attendance.objects.create(course=course, date=day, marked_by=course.faculty)
+                records = AttendanceRecord.objects.bulk_create([
+                    AttendanceRecord(attendance=att, student=s, status=(s.pk + day.day) % 4 != 0)
+                    for s in course.students.all()
+                ])
+                # bulk_create skips the signals that keep the counters
+                counters.adjust(attendance_records=len(records),
+                                attendance_present=sum(r.status for r in records))
+
+    def grow(self, factor=3):
+        """Make the university several times larger without touching the stable handles.
+
+        Departments, courses per department, students and attendance sessions
+        all grow, so loops over any of them show up as extra queries.
+        """
+        per_department = len(self.students) // len(self.departments)
+        courses_per_department = len(self.courses) // len(self.departments)
+        for dept in list(self.departments):
+            for _ in range(courses_per_department * (factor - 1)):
+                self.add_course(dept)
+        for _ in range(factor - 1):
+            self.add_department(courses_per_department * factor)
+        self.add_students(per_department * (factor - 1))
+        self.add_attendance(self.attendance_sessions * (factor - 1))
+
+
+class QueryCountMixin:
+    """
+    Mixin for ``TestCase`` classes checking per-view query budgets.
+
+    Subclasses implement ``get_cases()`` returning ``(user, url_name, kwargs,
+    query_params, budget)`` tuples.  Each case is requested on a small seeded
+    university and again after it has grown; the query count must stay within
+    budget and must not change with the data size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.uni = SeededUniversity()
+
+    def get_cases(self):
+        raise NotImplementedError
+
+    def count_queries(self, user, url_name, kwargs=None, query_params=None):
+        # Count with cold caches so that cached reads cannot hide an N+1.
+        reset_caches()
+        self.client.force_login(user)
+        url = reverse(url_name, kwargs=kwargs)
+        with CaptureQueriesContext(connections['default']) as ctx:
+            response = self.client.get(url, query_params or {})
+        self.assertLess(response.status_code, 400, f'{url_name} returned {response.status_code}')
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_flat_and_within_budget(self):
+        cases = self.get_cases()
+        small = {}
+        for user, url_name, kwargs, query_params, budget in cases:
+            key = (url_name, repr(kwargs), repr(query_params), user.pk)
+            small[key] = self.count_queries(user, url_name, kwargs, query_params)
+
+        self.uni.grow()
+
+        for user, url_name, kwargs, query_params, budget in cases:
+            key = (url_name, repr(kwargs), repr(query_params), user.pk)
+            with self.subTest(url_name=url_name, query_params=query_params):
+                large = self.count_queries(user, url_name, kwargs, query_params)
+                self.assertLessEqual(large, budget, f'{url_name} ran {large} queries (budget {budget})')
+                self.assertEqual(
+                    large, small[key],
+                    f'{url_name} ran {small[key]} queries on the small dataset but {large} on the large one'
+                )
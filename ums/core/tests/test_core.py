@@ -0,0 +1,1014 @@
+import datetime
+import importlib
+import json
+import os
+import tempfile
+import threading
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.models import Attendance, AttendanceRecord
+from core import counters, cpu_profiles, memory_profiles, metrics, slow_queries, terms, tracing
+from core.concurrent import fan_out
+from core.conditional import page_etag
+from core.routers import ReplicaRouter, read_from_replica, reading_from_replica
+from core.terms import active_term, previous_term, term_choices, term_for_date
+from core.benchmarks import compare, load_baseline, percentile, summarize
+from core.cache_versions import bump_generation, cached, get_generations, versioned_key
+from core.models import DashboardCounter, UniversitySetting
+from core.tests.regression import QueryCountMixin, SeededUniversity, reset_caches
+from core.university import get_university_settings
+from core.utils import render_to_pdf
+from courses.models import Course
+from examinations.models import Exam, Result
+from fees.models import FeePayment
+from students.models import Student
+
+
+class CoreViewQueryCountTests(QueryCountMixin, TestCase):
+    """Every route in core/urls.py runs a flat number of queries."""
+
+    def get_cases(self):
+        uni = self.uni
+        admin, student, teacher = uni.admin, uni.student.user, uni.teacher.user
+        return [
+            (admin, 'home', None, None, 2),
+            (admin, 'admin_dashboard', None, None, 2),
+            (admin, 'admin_dashboard_widget', {'name': 'stats'}, None, 3),
+            (admin, 'admin_dashboard_widget', {'name': 'recent_activity'}, None, 3),
+            (admin, 'settings', None, None, 5),
+            (admin, 'profiler_summary', None, None, 4),
+            (admin, 'metrics', None, None, 4),
+            (admin, 'cpu_profile_list', None, None, 4),
+            (admin, 'memory_profile_list', None, None, 4),
+            (admin, 'trace_list', None, None, 4),
+            (admin, 'about_university', None, None, 10),
+            (admin, 'contact_page', None, None, 5),
+            (admin, 'public_profile', {'username': student.username}, None, 9),
+            (admin, 'public_profile', {'username': teacher.username}, None, 9),
+            (admin, 'global_search', None, {'q': 'e'}, 7),
+            (student, 'global_search', None, {'q': 'Course'}, 7),
+            (teacher, 'global_search', None, {'q': 'Student'}, 7),
+        ]
+
+
+class SeedCommandTests(TestCase):
+    """seed_ums builds a consistent dataset and refuses to seed twice."""
+
+    def seed(self, **options):
+        call_command(
+            'seed_ums', departments=2, faculty_per_department=2, courses_per_semester=1,
+            students=16, attendance_days=2, payments_per_student=2, notices=3,
+            batch_size=7, stdout=StringIO(), **options,
+        )
+
+    def test_seed_counts(self):
+        self.seed()
+        self.assertEqual(Student.objects.count(), 16)
+        self.assertEqual(Course.objects.count(), 2 * 8)
+        taught = Course.objects.filter(students__isnull=False).distinct().count()
+        self.assertEqual(Attendance.objects.count(), taught * 2)
+        self.assertEqual(FeePayment.objects.count(), 16 * 2)
+        self.assertTrue(AttendanceRecord.objects.exists())
+        self.assertTrue(Result.objects.exists())
+        self.assertEqual(len(set(FeePayment.objects.values_list('receipt_no', flat=True))), 32)
+
+    def test_reseed_requires_clear(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed(clear=True)
+        self.assertEqual(Student.objects.count(), 16)
+
+
+class BenchmarkTests(TestCase):
+    """Latency summaries, baseline comparison and the benchmark command."""
+
+    def test_percentile_and_summary(self):
+        samples = [i / 1000 for i in range(1, 101)]
+        self.assertEqual(percentile(samples, 50), 0.05)
+        self.assertEqual(percentile(samples, 99), 0.099)
+        summary = summarize(samples, elapsed=2.0, errors=1)
+        self.assertEqual(summary['requests'], 100)
+        self.assertEqual(summary['p95_ms'], 95.0)
+        self.assertEqual(summary['throughput_rps'], 50.0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'a': {'p95_ms': 100.0}, 'b': {'p95_ms': 100.0}}
+        rows = compare({'a': {'p95_ms': 110.0}, 'b': {'p95_ms': 130.0}, 'c': {'p95_ms': 5.0}},
+                       baseline, tolerance=0.15)
+        flags = {row['name']: row['regression'] for row in rows}
+        self.assertEqual(flags, {'a': False, 'b': True, 'c': False})
+
+    def test_command_writes_and_compares_baseline(self):
+        SeededUniversity()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            options = dict(requests=2, warmup=0, baseline=path,
+                           only=['admin_dashboard', 'student_dashboard', 'accountant_reports'])
+            call_command('benchmark_ums', save_baseline=True, stdout=StringIO(), **options)
+            baseline = load_baseline(path)
+            self.assertEqual(set(baseline), {
+                'admin_dashboard', 'student_dashboard', 'accountant_reports:monthly',
+                'accountant_reports:annual', 'accountant_reports:department',
+            })
+            self.assertTrue(all(row['errors'] == 0 for row in baseline.values()))
+
+            out = StringIO()
+            call_command('benchmark_ums', stdout=out, tolerance=1000, fail_on_regression=True, **options)
+            self.assertIn('Compared with baseline', out.getvalue())
+
+
+    def test_failing_thread_releases_the_others(self):
+        SeededUniversity()
+
+        class Session:
+            def get(self, url):
+                return 200
+
+        # The first thread cannot log in; the second must not wait for it forever
+        sessions = mock.Mock(side_effect=[RuntimeError('login failed'), Session()])
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch('core.management.commands.benchmark_ums.Command.make_session', sessions):
+            with self.assertRaisesMessage(CommandError, 'login failed'):
+                call_command('benchmark_ums', requests=2, warmup=0, concurrency=2, only=['admin_dashboard'],
+                             baseline=os.path.join(tmp, 'baseline.json'), stdout=StringIO())
+
+
+class MetricsTests(TestCase):
+    """Prometheus exposition, multi-worker aggregation and access control."""
+
+    def setUp(self):
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+
+    def test_requests_and_pdf_renders_are_exposed(self):
+        uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=1)
+        self.client.force_login(uni.student.user)
+        self.client.get(reverse('student_dashboard'))
+        render_to_pdf('student/id_card_pdf.html', {'student': uni.student})
+
+        text = metrics.render()
+        self.assertIn('ums_http_requests_total{method="GET",status="200",url_name="student_dashboard"} 1', text)
+        self.assertIn('ums_http_request_duration_seconds_bucket{url_name="student_dashboard",le="+Inf"} 1', text)
+        self.assertIn('ums_db_queries_per_request_count{url_name="student_dashboard"} 1', text)
+        self.assertIn('ums_pdf_render_duration_seconds_count{template="student/id_card_pdf.html"} 1', text)
+
+    def test_requests_are_counted_with_the_profiler_off(self):
+        uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=1)
+        self.client.force_login(uni.student.user)
+        with override_settings(QUERY_PROFILER_ENABLED=False):
+            self.client.get(reverse('student_dashboard'))
+        self.assertIn('ums_http_requests_total{method="GET",status="200",url_name="student_dashboard"} 1',
+                      metrics.render())
+
+    def test_worker_snapshots_are_aggregated(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(METRICS_DIR=tmp):
+            other = metrics.Registry()
+            other.inc('ums_http_requests_total', {'url_name': 'home', 'method': 'GET', 'status': '302'}, 2)
+            other.observe('ums_pdf_render_duration_seconds', {'template': 'x.html'}, 0.3)
+            with open(os.path.join(tmp, 'metrics_999999_0123456789ab.json'), 'w') as fh:
+                json.dump(other.snapshot(), fh)
+
+            metrics.registry.inc('ums_http_requests_total', {'url_name': 'home', 'method': 'GET', 'status': '302'})
+            text = metrics.render()
+
+        self.assertIn('ums_http_requests_total{method="GET",status="302",url_name="home"} 3', text)
+        self.assertIn('ums_pdf_render_duration_seconds_bucket{template="x.html",le="0.25"} 0', text)
+        self.assertIn('ums_pdf_render_duration_seconds_bucket{template="x.html",le="0.5"} 1', text)
+
+    def test_worker_with_a_reused_pid_keeps_the_old_snapshot(self):
+        self.addCleanup(setattr, metrics, '_snapshot', metrics._snapshot)
+        labels = {'url_name': 'home', 'method': 'GET', 'status': '302'}
+        with tempfile.TemporaryDirectory() as tmp, override_settings(METRICS_DIR=tmp):
+            metrics.registry.inc('ums_http_requests_total', labels, 2)
+            metrics.flush()
+            # A new worker gets the same pid and starts from zero
+            metrics._snapshot = (None, '')
+            metrics.registry.clear()
+            metrics.registry.inc('ums_http_requests_total', labels)
+            text = metrics.render()
+            self.assertEqual(len(os.listdir(tmp)), 2)
+
+        self.assertIn('ums_http_requests_total{method="GET",status="302",url_name="home"} 3', text)
+
+    def test_access_requires_admin_or_token(self):
+        uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=1)
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(uni.student.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(uni.admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE ums_http_requests_total counter', response.content)
+
+        self.client.logout()
+        with override_settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer nope').status_code, 302)
+
+
+class CpuProfileTests(TestCase):
+    """?_profile=1 captures a cProfile run for superusers only."""
+
+    def setUp(self):
+        self.uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=1)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(CPU_PROFILE_DIR=tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_superuser_capture_is_stored_and_browsable(self):
+        self.client.force_login(self.uni.admin)
+        response = self.client.get(reverse('admin_dashboard'), {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+
+        detail_url = response['X-UMS-Profile']
+        name = cpu_profiles.list_profiles()[0]
+        self.assertIn('_admin_dashboard_200.pstats', name)
+        self.assertEqual(detail_url, reverse('cpu_profile_detail', args=[name]))
+
+        page = self.client.get(detail_url)
+        self.assertContains(page, 'admin_dashboard')
+        self.assertContains(page, 'Call tree')
+        download = self.client.get(detail_url, {'download': '1'})
+        self.assertEqual(download['Content-Disposition'], f'attachment; filename="{name}"')
+
+        self.assertEqual(self.client.get(reverse('cpu_profile_detail', args=['missing.pstats'])).status_code, 404)
+
+    def test_other_users_are_not_profiled(self):
+        self.client.force_login(self.uni.student.user)
+        response = self.client.get(reverse('student_dashboard'), HTTP_X_UMS_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-UMS-Profile', response)
+        self.assertEqual(cpu_profiles.list_profiles(), [])
+
+
+class SlowQueryLogTests(TestCase):
+    """Queries over the threshold are logged with their plan and origin."""
+
+    def test_slow_query_is_logged_with_explain(self):
+        uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=1)
+        self.client.force_login(uni.admin)
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0), self.assertLogs('ums.slow_queries') as logs:
+            self.client.get(reverse('global_search'), {'q': 'Student'})
+
+        entries = [json.loads(record.getMessage()) for record in logs.records]
+        search = next(e for e in entries if 'LIKE' in e['sql'] and 'students_student' in e['sql'])
+        self.assertEqual(search['view'], 'core.views.global_search')
+        self.assertIn('%Student%', search['params'])
+        self.assertTrue(search['frame'].startswith('core/views.py:'))
+        self.assertTrue(search['explain'])
+        self.assertFalse(any(e['sql'].startswith('EXPLAIN') for e in entries))
+
+    def test_fast_queries_are_not_logged(self):
+        with self.assertNoLogs('ums.slow_queries'):
+            Student.objects.count()
+
+    def test_explain_outside_a_transaction_opens_none(self):
+        sql = 'SELECT COUNT(*) FROM students_student'
+        with mock.patch.object(connection, 'in_atomic_block', False), \
+                mock.patch('core.slow_queries.transaction.atomic') as atomic:
+            plan = slow_queries.explain(connection, sql, ())
+        self.assertTrue(plan)
+        atomic.assert_not_called()
+
+
+class MemoryProfileTests(TestCase):
+    """tracemalloc reports from the command and the ?_memprofile=1 hook."""
+
+    def setUp(self):
+        memory_profiles.clear_reports()
+        self.addCleanup(memory_profiles.clear_reports)
+
+    def test_trace_call_reports_peak_and_sites(self):
+        def allocate():
+            chunks = [bytearray(1024 * 1024) for _ in range(4)]
+            return len(chunks)
+
+        result, report = memory_profiles.trace_call('allocate', allocate)
+        self.assertEqual(result, 4)
+        self.assertGreaterEqual(report['peak_bytes'], 4 * 1024 * 1024)
+        self.assertLess(report['retained_bytes'], 1024 * 1024)
+
+    def test_superuser_hook_records_report(self):
+        uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=2)
+        self.client.force_login(uni.admin)
+        response = self.client.get(reverse('attendance_export'), {'_memprofile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response['X-UMS-Memory-Peak']), 0)
+
+        report = memory_profiles.recent_reports()[0]
+        self.assertEqual(report['label'], 'GET /attendance/export/?_memprofile=1')
+        self.assertTrue(report['top'])
+        self.assertContains(self.client.get(reverse('memory_profile_list')), '/attendance/export/')
+
+        self.client.force_login(uni.student.user)
+        response = self.client.get(reverse('student_dashboard'), {'_memprofile': '1'})
+        self.assertNotIn('X-UMS-Memory-Peak', response)
+
+    def test_command_prints_peak(self):
+        uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=1)
+        out = StringIO()
+        call_command('profile_memory', 'accountant_reports_export', user=uni.accountant.username,
+                     query=['report_type=annual'], top=3, stdout=out)
+        self.assertIn('/fees/reports/export/ as accountant', out.getvalue())
+        self.assertIn('Peak memory:', out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('profile_memory', 'no_such_view', stdout=StringIO())
+
+
+class TracingTests(TestCase):
+    """Each request's spans are written to the JSONL trace file."""
+
+    def setUp(self):
+        self.uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=2)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(TRACING_ENABLED=True, TRACING_SAMPLE_RATE=1.0,
+                                     TRACE_FILE=os.path.join(tmp.name, 'traces.jsonl'))
+        override.enable()
+        self.addCleanup(override.disable)
+        # The test connection was opened while tracing was off
+        tracing.install(connection=connection)
+
+    def test_request_spans_nest_under_the_view(self):
+        self.client.force_login(self.uni.admin)
+        response = self.client.get(reverse('student_detail', args=[self.uni.student.pk]))
+        trace = tracing.find_trace(response['X-UMS-Trace-Id'])
+
+        self.assertEqual(trace['view'], 'students.views.student_detail')
+        self.assertEqual(trace['status'], 200)
+        spans = {s['id']: s for s in trace['spans']}
+        kinds = {s['kind'] for s in spans.values()}
+        self.assertTrue({'request', 'view', 'db', 'template'} <= kinds)
+
+        view = next(s for s in spans.values() if s['kind'] == 'view')
+        for query in (s for s in spans.values() if s['kind'] == 'db'):
+            self.assertIn('sql', query['attrs'])
+            ancestors = []
+            parent = query['parent']
+            while parent is not None:
+                ancestors.append(parent)
+                parent = spans[parent]['parent']
+            self.assertIn(view['id'], ancestors)
+
+        page = self.client.get(reverse('trace_detail', args=[trace['trace_id']]))
+        self.assertContains(page, 'students.views.student_detail')
+        self.assertContains(self.client.get(reverse('trace_list'), {'path': '/students/'}), trace['trace_id'])
+
+    def test_view_span_covers_template_response_rendering(self):
+        self.client.force_login(self.uni.admin)
+        response = self.client.get(reverse('timetable_list'))
+        trace = tracing.find_trace(response['X-UMS-Trace-Id'])
+        view = next(s for s in trace['spans'] if s['kind'] == 'view')
+        template = next(s for s in trace['spans'] if s['kind'] == 'template')
+        self.assertEqual(template['parent'], view['id'])
+
+    def test_pdf_span_wraps_its_template(self):
+        self.client.force_login(self.uni.student.user)
+        response = self.client.get(reverse('download_results_pdf'))
+        trace = tracing.find_trace(response['X-UMS-Trace-Id'])
+        pdf = next(s for s in trace['spans'] if s['kind'] == 'pdf')
+        self.assertEqual(pdf['attrs']['template'], 'student/my_results_pdf.html')
+        self.assertTrue(any(s['kind'] == 'template' and s['parent'] == pdf['id'] for s in trace['spans']))
+
+    def test_file_rotates_and_old_traces_stay_readable(self):
+        self.client.force_login(self.uni.admin)
+        with override_settings(TRACE_FILE_MAX_BYTES=1500, TRACE_FILE_BACKUPS=5):
+            ids = [self.client.get(reverse('admin_dashboard'))['X-UMS-Trace-Id'] for _ in range(6)]
+            self.assertTrue(os.path.exists(tracing.trace_file() + '.1'))
+            self.assertEqual([t['trace_id'] for t in tracing.recent_traces(limit=6)], ids[::-1])
+
+    def test_each_process_writes_its_own_file(self):
+        self.client.force_login(self.uni.admin)
+        mine = self.client.get(reverse('admin_dashboard'))['X-UMS-Trace-Id']
+        self.assertEqual(os.path.basename(tracing.trace_file()), f'traces.{os.getpid()}.jsonl')
+
+        other = {'trace_id': 'f' * 32, 'started_at': '2999-01-01T00:00:00+00:00', 'method': 'GET',
+                 'path': '/', 'view': None, 'status': 200, 'duration_ms': 1.0, 'dropped_spans': 0, 'spans': []}
+        with open(os.path.join(os.path.dirname(tracing.trace_file()), 'traces.1.jsonl'), 'w') as fh:
+            fh.write(json.dumps(other) + '\n')
+
+        self.assertEqual([t['trace_id'] for t in tracing.recent_traces(limit=2)], [other['trace_id'], mine])
+        self.assertEqual(tracing.find_trace(other['trace_id'])['path'], '/')
+
+
+class LazyPdfImportTests(TestCase):
+    """Workers start without the xhtml2pdf/reportlab stack."""
+
+    def test_startup_does_not_import_pdf_stack(self):
+        from core.management.commands.benchmark_startup import probe
+
+        result = probe(eager=False)
+        self.assertEqual(result['pdf_loaded'], [])
+
+
+class TemplateFragmentCacheTests(TestCase):
+    """Role sidebars are cached per role, page and settings generation."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=1)
+
+    def setUp(self):
+        reset_caches()
+        self.addCleanup(reset_caches)
+        self.client.force_login(self.uni.student.user)
+
+    def sidebar_key(self, url_name):
+        version = get_generations(UniversitySetting)['core.universitysetting']
+        return make_template_fragment_key('student_sidebar', ['STUDENT', url_name, version])
+
+    def test_sidebar_cached_per_page_and_settings_version(self):
+        self.client.get(reverse('student_dashboard'))
+        self.assertIsNotNone(cache.get(self.sidebar_key('student_dashboard')))
+        self.assertIsNone(cache.get(self.sidebar_key('student_my_courses')))
+
+        response = self.client.get(reverse('student_my_courses'))
+        self.assertIn('active', cache.get(self.sidebar_key('student_my_courses')).split('My Courses')[0][-400:])
+        self.assertContains(response, self.uni.student.user.get_full_name())
+
+        old_key = self.sidebar_key('student_dashboard')
+        setting = UniversitySetting.objects.get()
+        setting.university_name = 'Renamed'
+        setting.save()
+        self.assertNotEqual(self.sidebar_key('student_dashboard'), old_key)
+        self.assertIsNone(cache.get(self.sidebar_key('student_dashboard')))
+
+    def test_fragment_cache_can_be_disabled(self):
+        with override_settings(FRAGMENT_CACHE_TIMEOUT=0):
+            self.client.get(reverse('student_dashboard'))
+        self.assertIsNone(cache.get(self.sidebar_key('student_dashboard')))
+
+    def test_benchmark_command_reports_every_variant(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'templates.json')
+            call_command('benchmark_templates', renders=1, warmup=0, baseline=path,
+                         save_baseline=True, stdout=StringIO())
+            baseline = load_baseline(path)
+        self.assertIn('student_list:uncached', baseline)
+        self.assertIn('accountant_payment_history:fragments', baseline)
+
+
+class DashboardCounterTests(TestCase):
+    """Counters follow every change and the dashboard reads them in one query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=3)
+
+    def assertCountersExact(self):
+        self.assertEqual(counters.read(), counters.compute())
+
+    def test_signals_keep_counters_exact(self):
+        self.assertCountersExact()
+        payment = FeePayment.objects.create(student=self.uni.student, amount_paid=Decimal('1200.50'))
+        payment.amount_paid = Decimal('1000')
+        payment.save()
+        record = AttendanceRecord.objects.filter(status=True).first()
+        record.status = False
+        record.save()
+        self.assertCountersExact()
+
+        record.delete()
+        payment.delete()
+        self.uni.add_course(self.uni.department)
+        self.uni.add_students(1)
+        self.assertCountersExact()
+
+        self.uni.students[-1].user.delete()  # cascades to the student and their records
+        self.assertCountersExact()
+
+    def test_take_attendance_updates_in_bulk(self):
+        course = self.uni.course
+        students = list(course.students.order_by('pk'))
+        self.client.force_login(course.faculty.user)
+        url = reverse('teacher_take_attendance')
+        data = {'course_id': course.pk, 'date': '2030-01-01', f'present_{students[0].pk}': 'on'}
+
+        self.client.post(url, data)
+        self.assertCountersExact()
+        self.assertEqual(AttendanceRecord.objects.filter(attendance__date='2030-01-01').count(), len(students))
+
+        data[f'present_{students[1].pk}'] = 'on'
+        del data[f'present_{students[0].pk}']
+        self.client.post(url, data)
+        self.assertCountersExact()
+        present = AttendanceRecord.objects.filter(attendance__date='2030-01-01', status=True)
+        self.assertEqual(list(present.values_list('student_id', flat=True)), [students[1].pk])
+
+    def test_dashboard_reads_counters(self):
+        counts = counters.read()
+        self.client.force_login(self.uni.admin)
+        with self.assertNumQueries(3):  # session, user, counters
+            response = self.client.get(reverse('admin_dashboard_widget', args=['stats']))
+        self.assertEqual(response.context['total_students'], int(counts['students']))
+        self.assertEqual(response.context['total_revenue'], counts['revenue'])
+
+    def test_missing_rows_read_as_zero_without_writing(self):
+        DashboardCounter.objects.filter(name='students').delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(counters.read()['students'], 0)
+        self.assertFalse(DashboardCounter.objects.filter(name='students').exists())
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertCountersExact()
+
+    def test_rebuild_command_fixes_drift(self):
+        DashboardCounter.objects.filter(name='students').update(value=999)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_counters', check=True, stdout=StringIO())
+        out = StringIO()
+        call_command('rebuild_counters', stdout=out)
+        self.assertIn('(1 corrected)', out.getvalue())
+        self.assertCountersExact()
+        call_command('rebuild_counters', check=True, stdout=StringIO())
+
+
+class UniversitySettingCacheTests(TestCase):
+    """The settings singleton is read once and invalidated on save/delete."""
+
+    def setUp(self):
+        reset_caches()
+        self.addCleanup(reset_caches)
+
+    def test_cached_until_saved(self):
+        UniversitySetting.objects.create(university_name='Old Name')
+        self.assertEqual(get_university_settings().university_name, 'Old Name')
+        with self.assertNumQueries(0):
+            get_university_settings()
+
+        setting = UniversitySetting.objects.get()
+        setting.university_name = 'New Name'
+        setting.save()
+        self.assertEqual(get_university_settings().university_name, 'New Name')
+
+        setting.delete()
+        self.assertIsNone(get_university_settings().pk)
+        self.assertEqual(get_university_settings().university_name, 'My University')
+
+    def test_cache_entry_expires_with_the_local_copy(self):
+        # Other workers never see this process' delete on a per-process cache
+        UniversitySetting.objects.create(university_name='Old Name')
+        with override_settings(UNIVERSITY_SETTINGS_LOCAL_TTL=7), mock.patch('core.university.cache.set') as cache_set:
+            get_university_settings()
+        self.assertEqual(cache_set.call_args.kwargs['timeout'], 7)
+
+    def test_singleton_guard_reuses_existing_row_in_one_query(self):
+        first = UniversitySetting.objects.create(university_name='First')
+        second = UniversitySetting(university_name='Second')
+        with self.assertNumQueries(2):  # pk lookup + UPDATE
+            second.save()
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(UniversitySetting.objects.get().university_name, 'Second')
+
+    def test_public_pages_and_context_processor_use_cache(self):
+        UniversitySetting.objects.create(university_name='Cached University')
+        get_university_settings()
+        response = self.client.get(reverse('contact_page'))
+        self.assertContains(response, 'Cached University')
+        self.assertEqual(response.context['university'].university_name, 'Cached University')
+
+    def test_settings_view_saves_a_private_copy(self):
+        uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=1)
+        cached = get_university_settings()
+        self.client.force_login(uni.admin)
+        self.client.post(reverse('settings'), {'university_name': 'Renamed', 'academic_year': '2025-2026'})
+        self.assertEqual(cached.university_name, 'Test University')
+        self.assertEqual(get_university_settings().university_name, 'Renamed')
+        self.assertEqual(UniversitySetting.objects.count(), 1)
+
+
+@override_settings(CACHE_SHARED=True)
+class VersionedCacheTests(TestCase):
+    """Cached data is keyed by model generations that signals bump."""
+
+    def setUp(self):
+        reset_caches()
+        self.addCleanup(reset_caches)
+        self.uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=2)
+
+    def test_builder_runs_again_only_after_a_change(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return Student.objects.count()
+
+        self.assertEqual(cached('count', [Student], build), 2)
+        self.assertEqual(cached('count', [Student], build), 2)
+        self.assertEqual(len(calls), 1)
+
+        FeePayment.objects.filter(pk=self.uni.payment.pk).get().save()
+        cached('count', [Student], build)
+        self.assertEqual(len(calls), 1, 'an unrelated model must not invalidate')
+
+        self.uni.add_students(1)
+        self.assertEqual(cached('count', [Student], build), 3)
+        self.assertEqual(len(calls), 2)
+
+    def test_generation_moves_on_again_when_the_transaction_commits(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return Student.objects.count()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.uni.add_students(1)
+            # Another connection would still count 2 here and cache it
+            cached('count', [Student], build)
+            during = get_generations(Student)['students.student']
+        self.assertTrue(callbacks)
+        for callback in callbacks:
+            callback()
+
+        self.assertGreater(get_generations(Student)['students.student'], during)
+        cached('count', [Student], build)
+        self.assertEqual(len(calls), 2)
+
+    def test_nothing_is_cached_without_a_shared_cache(self):
+        # Other workers would never see this process' generation bumps
+        calls = []
+
+        def build():
+            calls.append(1)
+            return Student.objects.count()
+
+        with override_settings(CACHE_SHARED=False):
+            cached('count', [Student], build)
+            cached('count', [Student], build)
+        self.assertEqual(len(calls), 2)
+
+    def test_signals_bump_generations(self):
+        before = get_generations(Student, AttendanceRecord, Result)
+        key = versioned_key('x', [Student], 'a')
+
+        self.uni.course.students.remove(self.uni.student)
+        record = AttendanceRecord.objects.first()
+        record.delete()
+        after = get_generations(Student, AttendanceRecord, Result)
+
+        self.assertGreater(after['students.student'], before['students.student'])
+        self.assertGreater(after['attendance.attendancerecord'], before['attendance.attendancerecord'])
+        self.assertEqual(after['examinations.result'], before['examinations.result'])
+        self.assertNotEqual(versioned_key('x', [Student], 'a'), key)
+
+        bump_generation(Result)
+        self.assertGreater(get_generations(Result)['examinations.result'], after['examinations.result'])
+
+    def test_dashboards_reflect_new_payments(self):
+        self.client.force_login(self.uni.accountant)
+        url = reverse('accountant_dashboard_widget', args=['totals'])
+        before = self.client.get(url).context['total_collected']
+        FeePayment.objects.create(
+            student=self.uni.student, amount_paid=Decimal('1234'), payment_mode='CASH', status='PAID',
+        )
+        self.assertEqual(self.client.get(url).context['total_collected'], before + Decimal('1234'))
+
+        self.client.force_login(self.uni.admin)
+        url = reverse('admin_dashboard_widget', args=['stats'])
+        self.client.get(url)
+        self.uni.add_students(1)
+        self.assertEqual(self.client.get(url).context['total_students'], 3)
+
+
+@override_settings(CACHE_SHARED=True)
+class DashboardWidgetTests(TestCase):
+    """Dashboards are shells; each widget is its own cached, revalidatable page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=2)
+
+    def setUp(self):
+        reset_caches()
+        self.addCleanup(reset_caches)
+
+    def test_shell_links_every_widget(self):
+        from students.views import STUDENT_WIDGETS
+
+        self.client.force_login(self.uni.student.user)
+        response = self.client.get(reverse('student_dashboard'))
+        for name in STUDENT_WIDGETS:
+            self.assertContains(response, f'data-widget-url="{reverse("student_dashboard_widget", args=[name])}"')
+
+    def test_widget_is_cached_until_its_data_changes(self):
+        self.client.force_login(self.uni.student.user)
+        url = reverse('student_dashboard_widget', args=['recent_results'])
+        first = self.client.get(url)
+        self.assertContains(first, 'Recent Results')
+        self.assertNotContains(first, '<html')
+        with self.assertNumQueries(2):  # session, user
+            self.assertEqual(self.client.get(url).content, first.content)
+
+        result = Result.objects.get(student=self.uni.student, exam=self.uni.exam)
+        result.marks_obtained = 12
+        result.save()
+        self.assertContains(self.client.get(url), '<strong>12.00</strong>')
+
+    def test_widget_answers_304(self):
+        self.client.force_login(self.uni.student.user)
+        self.client.get(reverse('student_profile'))  # CSRF cookie, as after login
+        url = reverse('student_dashboard_widget', args=['attendance'])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+        AttendanceRecord.objects.filter(student=self.uni.student).update(status=False)
+        bump_generation(AttendanceRecord)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_shared_widget_renders_once_for_all_accountants(self):
+        self.client.force_login(self.uni.accountant)
+        url = reverse('accountant_dashboard_widget', args=['totals'])
+        self.client.get(url)
+        self.client.force_login(self.uni.admin)  # accountant_required lets admins in
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_unknown_widget_and_wrong_role(self):
+        self.client.force_login(self.uni.student.user)
+        self.assertEqual(self.client.get(reverse('student_dashboard_widget', args=['nope'])).status_code, 404)
+        self.assertRedirects(
+            self.client.get(reverse('teacher_dashboard_widget', args=['courses'])),
+            reverse('login'), fetch_redirect_response=False,
+        )
+
+
+class ConcurrentQueryTests(TransactionTestCase):
+    """Async views spread their queries over the pool, except inside transactions."""
+
+    def setUp(self):
+        self.uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=2)
+
+    def fan_out_threads(self):
+        return async_to_sync(fan_out)(
+            a=lambda: (threading.current_thread().name, Student.objects.count()),
+            b=lambda: (threading.current_thread().name, Course.objects.count()),
+        )
+
+    def test_queries_run_on_the_pool(self):
+        data = self.fan_out_threads()
+        self.assertTrue(all(name.startswith('ums-query') for name, _ in data.values()))
+        self.assertEqual([count for _, count in data.values()], [2, 1])
+
+    def test_serial_inside_a_transaction_or_when_disabled(self):
+        from django.db import transaction
+
+        with transaction.atomic():
+            data = self.fan_out_threads()
+        self.assertFalse(any(name.startswith('ums-query') for name, _ in data.values()))
+        with override_settings(CONCURRENT_QUERIES_ENABLED=False):
+            data = self.fan_out_threads()
+        self.assertFalse(any(name.startswith('ums-query') for name, _ in data.values()))
+
+    def test_detail_pages_match_serial_rendering(self):
+        self.client.force_login(self.uni.admin)
+        url = reverse('student_detail', args=[self.uni.student.pk])
+        concurrent = self.client.get(url)
+        with override_settings(CONCURRENT_QUERIES_ENABLED=False):
+            serial = self.client.get(url)
+        self.assertEqual(concurrent.status_code, 200)
+        for name in ('total_attendance', 'present_attendance', 'total_payable', 'total_paid', 'pending_dues'):
+            self.assertEqual(concurrent.context[name], serial.context[name], name)
+        self.assertEqual(concurrent.context['results'], serial.context['results'])
+
+
+class DatabaseTuningTests(TestCase):
+    """SQLite connections open with the tuning pragmas; the benchmark modes match the settings."""
+
+    def test_sqlite_connections_apply_the_pragmas(self):
+        if connection.vendor != 'sqlite' or not settings.SQLITE_TUNING:
+            self.skipTest('SQLite tuning is off')
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+        with connection.cursor() as cursor:
+            for pragma in ('busy_timeout', 'cache_size', 'temp_store'):
+                cursor.execute(f'PRAGMA {pragma}')
+                value = cursor.fetchone()[0]
+                expected = {'temp_store': 2}.get(pragma, settings.SQLITE_PRAGMAS[pragma])  # 2 = MEMORY
+                self.assertEqual(value, expected, pragma)
+
+    def test_benchmark_modes(self):
+        from core.management.commands.benchmark_db_concurrency import postgresql_modes, sqlite_modes
+
+        base = {'ENGINE': 'django.db.backends.postgresql', 'NAME': 'ums', 'CONN_MAX_AGE': 600,
+                'OPTIONS': {'pool': {'max_size': 1}, 'sslmode': 'require'}}
+        modes = postgresql_modes(base)
+        self.assertEqual(modes['unpooled']['CONN_MAX_AGE'], 0)
+        self.assertEqual(modes['persistent']['OPTIONS'], {'sslmode': 'require'})
+        self.assertEqual(modes['pooled']['CONN_MAX_AGE'], 0)
+        self.assertEqual(modes['pooled']['OPTIONS']['pool'], settings.DATABASE_POOL_OPTIONS)
+
+        modes = sqlite_modes({'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'db.sqlite3'})
+        self.assertIn('journal_mode=DELETE', modes['default']['OPTIONS']['init_command'])
+        self.assertEqual(modes['tuned']['OPTIONS'], settings.SQLITE_OPTIONS)
+
+
+class ReplicaRouterTests(TestCase):
+    """Reads inside read_from_replica go to the replica, if configured; writes never do."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.uni = SeededUniversity(departments=1, students_per_department=2, attendance_sessions=1)
+
+    def test_routing(self):
+        router = ReplicaRouter()
+        with read_from_replica():
+            # No replica configured: everything stays on the primary.
+            self.assertEqual(FeePayment.objects.all().db, 'default')
+        with mock.patch('core.routers.replica_configured', return_value=True):
+            self.assertEqual(router.db_for_read(FeePayment), 'default')
+            with read_from_replica(), mock.patch.object(connection, 'in_atomic_block', False):
+                self.assertEqual(FeePayment.objects.all().db, 'replica')
+                self.assertEqual(router.db_for_write(FeePayment), 'default')
+            with read_from_replica():
+                # Inside a transaction (as in every TestCase) reads stay on the primary
+                self.assertEqual(router.db_for_read(FeePayment), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'fees'))
+
+    @override_settings(CACHE_SHARED=True)
+    def test_replica_reads_are_cached_briefly(self):
+        with mock.patch('core.routers.replica_configured', return_value=True), \
+                mock.patch.object(cache, 'set') as cache_set, read_from_replica():
+            cached('replica_test', [FeePayment], lambda: 1)
+        self.assertEqual(cache_set.call_args.args[2], settings.REPLICA_CACHE_TIMEOUT)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_replica_reads_get_no_etag(self):
+        request = RequestFactory().get('/')
+        request.user = self.uni.admin
+        self.assertTrue(page_etag(request, [Student]))
+        with mock.patch('core.routers.replica_configured', return_value=True), read_from_replica():
+            self.assertIsNone(page_etag(request, [Student]))
+
+    def test_reports_are_pinned_and_payments_are_not(self):
+        seen = []
+
+        def spy(router, model, **hints):
+            seen.append(reading_from_replica())
+            return 'default'
+
+        cases = [
+            (self.uni.accountant, 'accountant_reports_export', None, True),
+            (self.uni.admin, 'attendance_export', None, True),
+            (self.uni.admin, 'admin_dashboard_widget', {'name': 'recent_activity'}, True),
+            (self.uni.teacher.user, 'teacher_reports', None, True),
+            (self.uni.accountant, 'accountant_collect_fees', None, False),
+            (self.uni.accountant, 'accountant_receipt', {'payment_id': self.uni.payment.pk}, False),
+        ]
+        with mock.patch('core.routers.replica_configured', return_value=True), \
+                mock.patch.object(ReplicaRouter, 'db_for_read', spy):
+            for user, url_name, kwargs, pinned in cases:
+                reset_caches()
+                self.client.force_login(user)
+                seen.clear()
+                query = {'course': self.uni.course.pk} if url_name == 'teacher_reports' else {}
+                self.assertEqual(self.client.get(reverse(url_name, kwargs=kwargs), query).status_code, 200)
+                self.assertEqual(any(seen), pinned, url_name)
+
+
+class AcademicTermTests(TestCase):
+    """Rows are filed under their term; pages show the active term by default."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=2)
+
+    def setUp(self):
+        reset_caches()
+        self.addCleanup(reset_caches)
+
+    def set_active_term(self, term):
+        academic_year, semester = term.split('/')
+        setting = UniversitySetting.objects.get()
+        setting.academic_year, setting.current_semester = academic_year, int(semester)
+        setting.save()
+
+    def test_term_for_date(self):
+        self.assertEqual(term_for_date(datetime.date(2025, 7, 1)), '2025-2026/1')
+        self.assertEqual(term_for_date(datetime.date(2025, 12, 31)), '2025-2026/1')
+        self.assertEqual(term_for_date(datetime.date(2026, 1, 1)), '2025-2026/2')
+        self.assertEqual(term_for_date('2026-06-30'), '2025-2026/2')
+        with override_settings(ACADEMIC_YEAR_START_MONTH=9, ACADEMIC_TERMS_PER_YEAR=3):
+            self.assertEqual(term_for_date(datetime.date(2025, 8, 31)), '2024-2025/3')
+            self.assertEqual(term_for_date(datetime.date(2026, 1, 15)), '2025-2026/2')
+
+    def test_previous_terms_and_choices(self):
+        self.assertEqual(previous_term('2025-2026/2'), '2025-2026/1')
+        self.assertEqual(previous_term('2025-2026/1'), '2024-2025/2')
+        self.assertIsNone(previous_term('Spring 2025'))
+        self.set_active_term('2025-2026/1')
+        self.assertEqual(active_term(), '2025-2026/1')
+        self.assertEqual(term_choices()[:3], ['2025-2026/1', '2024-2025/2', '2024-2025/1'])
+
+    def test_malformed_settings_fall_back_to_todays_term(self):
+        UniversitySetting.objects.update(academic_year='2025/26')
+        reset_caches()
+        self.assertEqual(active_term(), term_for_date(timezone.localdate()))
+        UniversitySetting.objects.update(academic_year='2025-2026', current_semester=5)
+        reset_caches()
+        self.assertEqual(active_term(), term_for_date(timezone.localdate()))
+
+    def test_new_settings_default_to_todays_term(self):
+        UniversitySetting.objects.all().delete()
+        setting = UniversitySetting.objects.create()
+        setting.full_clean()
+        self.assertEqual(f'{setting.academic_year}/{setting.current_semester}', term_for_date(timezone.localdate()))
+
+    def test_ended_term_stays_active_with_a_warning(self):
+        self.addCleanup(terms._warned_ended.clear)
+        self.set_active_term('2020-2021/1')
+        with self.assertLogs('ums.terms', 'WARNING') as logs:
+            self.assertEqual(active_term(), '2020-2021/1')
+            active_term()
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('2020-2021/1 has ended', logs.output[0])
+
+    def test_settings_view_rejects_malformed_terms(self):
+        self.client.force_login(self.uni.admin)
+        before = active_term()
+        for data in ({'academic_year': '2025'}, {'academic_year': '2025-2027'}, {'current_semester': '3'}):
+            with self.subTest(data=data):
+                response = self.client.post(reverse('settings'), data)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(list(response.context['messages']))
+                self.assertEqual(active_term(), before)
+        self.client.post(reverse('settings'), {'academic_year': '2030-2031', 'current_semester': '2'})
+        self.assertEqual(active_term(), '2030-2031/2')
+
+    def test_fee_collection_counts_the_active_term(self):
+        self.client.force_login(self.uni.accountant)
+        url = reverse('accountant_collect_fees')
+        params = {'student_id': self.uni.student.pk}
+        self.assertEqual(self.client.get(url, params).context['fee_info']['total_paid'], Decimal('10000'))
+        # Today's payment belongs to another term than the active one
+        self.set_active_term('2001-2002/1')
+        self.assertEqual(self.client.get(url, params).context['fee_info']['total_paid'], 0)
+
+    def test_saving_files_rows_under_their_dates_term(self):
+        self.assertEqual(self.uni.attendance.term, term_for_date(self.uni.attendance.date))
+        self.assertEqual(self.uni.payment.term, term_for_date(timezone.localdate()))
+        exam = self.uni.exams[0]
+        exam.date = datetime.date(2023, 2, 1)
+        exam.save()
+        self.assertEqual(Exam.objects.get(pk=exam.pk).term, '2022-2023/2')
+
+    def test_migrations_backfill_terms(self):
+        Attendance.objects.update(term='')
+        Exam.objects.update(term='')
+        FeePayment.objects.update(term='')
+        for module in ('attendance.migrations.0005_attendance_term', 'examinations.migrations.0006_exam_term',
+                       'fees.migrations.0006_feepayment_term'):
+            importlib.import_module(module).backfill_terms(apps, None)
+        for attendance in Attendance.objects.all():
+            self.assertEqual(attendance.term, term_for_date(attendance.date))
+        for exam in Exam.objects.all():
+            self.assertEqual(exam.term, term_for_date(exam.date))
+        for payment in FeePayment.objects.all():
+            self.assertEqual(payment.term, term_for_date(payment.payment_date))
+
+    def test_pages_default_to_the_active_term(self):
+        student = self.uni.student
+        self.client.force_login(student.user)
+        response = self.client.get(reverse('student_fee_status'))
+        self.assertEqual(response.context['term'], active_term())
+        self.assertEqual(response.context['total_paid'], Decimal('10000'))
+        self.assertTrue(self.client.get(reverse('student_my_attendance')).context['records'])
+
+        # A payment from an earlier term no longer counts against this term's dues
+        FeePayment.objects.filter(student=student).update(term='2000-2001/1')
+        reset_caches()
+        self.assertEqual(self.client.get(reverse('student_fee_status')).context['total_paid'], 0)
+        response = self.client.get(reverse('student_fee_status'), {'term': 'all'})
+        self.assertIsNone(response.context['term'])
+        self.assertEqual(response.context['total_paid'], Decimal('10000'))
+        response = self.client.get(reverse('student_fee_status'), {'term': '2000-2001/1'})
+        self.assertEqual(response.context['total_paid'], Decimal('10000'))
+        self.assertIn('2000-2001/1', response.context['term_choices'])
+
+        # Switching the active term moves every default, dashboards included
+        self.set_active_term('2000-2001/1')
+        self.assertFalse(self.client.get(reverse('student_my_attendance')).context['records'])
+        self.assertContains(self.client.get(reverse('student_dashboard_widget', args=['attendance'])), '>0%<')
+        self.client.force_login(self.uni.accountant)
+        response = self.client.get(reverse('accountant_payment_history'))
+        self.assertEqual({p.term for p in response.context['payments']}, {'2000-2001/1'})
@@ -0,0 +1,250 @@
+"""
+Lightweight request tracing.
+
+``core.middleware.TracingMiddleware`` opens a trace for each request.  Spans
+are opened for the view, every ORM query (through a connection execute
+wrapper), every template render and every ``render_to_pdf`` call.  When the
+request finishes its trace is appended as one JSON line to the process' own
+trace file, ``TRACE_FILE`` with the process id before the extension
+(``traces.4242.jsonl``), which rotates at ``TRACE_FILE_MAX_BYTES``; worker
+processes never write to or rotate each other's files.  No collector or
+agent is needed: the admin "Traces" page reads every process' files back and
+draws each trace as a waterfall.
+
+Tracing is off unless ``TRACING_ENABLED`` is set, and then samples
+``TRACING_SAMPLE_RATE`` of the requests.
+"""
+import glob
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.utils import timezone
+
+_active_trace = ContextVar('ums_active_trace', default=None)
+_current_span = ContextVar('ums_current_span', default=None)
+
+MAX_SQL_LENGTH = 300
+
+
+def tracing_enabled():
+    return getattr(settings, 'TRACING_ENABLED', False)
+
+
+def should_sample():
+    rate = getattr(settings, 'TRACING_SAMPLE_RATE', 0.01)
+    return rate >= 1 or random.random() < rate
+
+
+def get_active_trace():
+    return _active_trace.get()
+
+
+class Trace:
+    """The spans recorded while one request is served."""
+
+    def __init__(self, method, path):
+        self.trace_id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.view = None
+        self.status = None
+        self.started_at = timezone.now()
+        self.t0 = time.perf_counter()
+        self.duration = 0.0
+        self.spans = []
+        self.dropped = 0
+        self.max_spans = getattr(settings, 'TRACE_MAX_SPANS', 2000)
+        self._ids = 0
+
+    def next_id(self):
+        self._ids += 1
+        return self._ids
+
+    def add(self, span_id, parent, name, kind, start, end, attrs):
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return
+        self.spans.append({
+            'id': span_id,
+            'parent': parent,
+            'name': name,
+            'kind': kind,
+            'start_ms': round((start - self.t0) * 1000, 3),
+            'duration_ms': round((end - start) * 1000, 3),
+            'attrs': attrs,
+        })
+
+    def activate(self):
+        return _active_trace.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _active_trace.reset(token)
+
+    def finish(self, status):
+        self.status = status
+        self.duration = time.perf_counter() - self.t0
+
+    def as_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'started_at': self.started_at.isoformat(),
+            'method': self.method,
+            'path': self.path,
+            'view': self.view,
+            'status': self.status,
+            'duration_ms': round(self.duration * 1000, 3),
+            'dropped_spans': self.dropped,
+            'spans': sorted(self.spans, key=lambda s: (s['start_ms'], s['id'])),
+        }
+
+
+@contextmanager
+def span(name, kind, **attrs):
+    """Record a span under the current one; does nothing outside a trace."""
+    trace = _active_trace.get()
+    if trace is None:
+        yield
+        return
+    parent = _current_span.get()
+    span_id = trace.next_id()
+    token = _current_span.set(span_id)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        _current_span.reset(token)
+        trace.add(span_id, parent, name, kind, start, end, attrs)
+
+
+# ── ORM queries ─────────────────────────────────────────────────────────────
+def query_wrapper(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook opening a span per query."""
+    if _active_trace.get() is None:
+        return execute(sql, params, many, context)
+    verb = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else 'SQL'
+    with span(verb, 'db', sql=sql[:MAX_SQL_LENGTH], alias=context['connection'].alias, many=many):
+        return execute(sql, params, many, context)
+
+
+def install(sender=None, connection=None, **kwargs):
+    """``connection_created`` receiver adding the span wrapper to a connection."""
+    if tracing_enabled() and query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+# ── JSONL file ──────────────────────────────────────────────────────────────
+_handler = None
+_handler_lock = threading.Lock()
+
+
+def _base_file():
+    return str(getattr(settings, 'TRACE_FILE', settings.BASE_DIR / 'traces' / 'traces.jsonl'))
+
+
+def trace_file():
+    """The file this process appends its traces to."""
+    root, ext = os.path.splitext(_base_file())
+    return f'{root}.{os.getpid()}{ext}'
+
+
+def _get_handler():
+    global _handler
+    with _handler_lock:
+        path = trace_file()
+        if _handler is None or _handler.baseFilename != os.path.abspath(path):
+            if _handler is not None:
+                _handler.close()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _handler = RotatingFileHandler(
+                path,
+                maxBytes=getattr(settings, 'TRACE_FILE_MAX_BYTES', 10 * 1024 * 1024),
+                backupCount=getattr(settings, 'TRACE_FILE_BACKUPS', 3),
+                encoding='utf-8',
+            )
+            _handler.setFormatter(logging.Formatter('%(message)s'))
+        return _handler
+
+
+def write_trace(trace):
+    record = logging.makeLogRecord({'msg': json.dumps(trace.as_dict(), default=str)})
+    _get_handler().handle(record)
+
+
+def _trace_files():
+    """Every process' trace files, each followed by its rotated backups."""
+    root, ext = os.path.splitext(_base_file())
+    backups = getattr(settings, 'TRACE_FILE_BACKUPS', 3)
+    files = []
+    for path in sorted(glob.glob(f'{glob.escape(root)}.*{ext}')):
+        files += [path] + [f'{path}.{n}' for n in range(1, backups + 1)]
+    return [f for f in files if os.path.exists(f)]
+
+
+def _read_lines(path, max_bytes):
+    with open(path, 'rb') as fh:
+        fh.seek(0, os.SEEK_END)
+        size = fh.tell()
+        fh.seek(max(0, size - max_bytes))
+        data = fh.read()
+    lines = data.split(b'\n')
+    if size > max_bytes:
+        lines = lines[1:]  # first line is probably cut in half
+    return [line for line in lines if line.strip()]
+
+
+def recent_traces(limit=100, max_bytes=4 * 1024 * 1024):
+    """Summaries (no spans) of the newest traces of every process, newest first."""
+    summaries = []
+    for path in _trace_files():
+        found = 0
+        for line in reversed(_read_lines(path, max_bytes)):
+            try:
+                data = json.loads(line)
+            except ValueError:
+                continue
+            data['span_count'] = len(data.pop('spans', []))
+            summaries.append(data)
+            found += 1
+            if found >= limit:
+                break
+    summaries.sort(key=lambda data: data['started_at'], reverse=True)
+    return summaries[:limit]
+
+
+def find_trace(trace_id):
+    """The full trace with ``trace_id`` from the trace files, or ``None``."""
+    needle = f'"trace_id": "{trace_id}"'.encode()
+    for path in _trace_files():
+        with open(path, 'rb') as fh:
+            for line in fh:
+                if needle in line:
+                    return json.loads(line)
+    return None
+
+
+def waterfall(trace):
+    """Spans with their depth and left/width percentages for the waterfall."""
+    total = trace['duration_ms'] or 1.0
+    depth = {}
+    rows = []
+    for s in trace['spans']:
+        depth[s['id']] = depth.get(s['parent'], -1) + 1
+        rows.append({
+            **s,
+            'depth': depth[s['id']],
+            'indent': depth[s['id']] * 12,
+            'left': min(100.0, 100.0 * s['start_ms'] / total),
+            'width': max(0.2, min(100.0, 100.0 * s['duration_ms'] / total)),
+        })
+    return rows
@@ -0,0 +1,64 @@
+"""
+Cached access to the ``UniversitySetting`` singleton.
+
+The row changes a few times a year but is read on every public page, so it is
+kept in two tiers: a process-local copy that lives for
+``UNIVERSITY_SETTINGS_LOCAL_TTL`` seconds, backed by the shared Django cache.
+Saving or deleting the row clears both (``post_save`` / ``post_delete``) in
+the process that made the change.  The cache entry expires after the same
+TTL, so other worker processes pick the change up within
+``UNIVERSITY_SETTINGS_LOCAL_TTL`` seconds even when the Django cache is
+per-process (``locmem://``) and the delete never reached theirs.
+
+The returned instance is shared between requests - treat it as read-only and
+``copy.copy`` it before changing anything.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import UniversitySetting
+
+CACHE_KEY = 'ums:university_settings'
+
+_local = {'value': None, 'expires': 0.0}
+_local_lock = threading.Lock()
+
+
+def get_university_settings():
+    """
+    The current ``UniversitySetting``.  When none has been saved yet an
+    unsaved instance carrying the model defaults is returned.
+    """
+    now = time.monotonic()
+    with _local_lock:
+        if _local['value'] is not None and now < _local['expires']:
+            return _local['value']
+
+    ttl = getattr(settings, 'UNIVERSITY_SETTINGS_LOCAL_TTL', 30)
+    value = cache.get(CACHE_KEY)
+    if value is None:
+        value = UniversitySetting.objects.first() or UniversitySetting()
+        cache.set(CACHE_KEY, value, timeout=ttl)
+
+    with _local_lock:
+        _local['value'] = value
+        _local['expires'] = now + ttl
+    return value
+
+
+def invalidate_university_settings():
+    with _local_lock:
+        _local['value'] = None
+        _local['expires'] = 0.0
+    cache.delete(CACHE_KEY)
+
+
+@receiver(post_save, sender=UniversitySetting, dispatch_uid='ums_university_settings_saved')
+@receiver(post_delete, sender=UniversitySetting, dispatch_uid='ums_university_settings_deleted')
+def _university_settings_changed(sender, **kwargs):
+    invalidate_university_settings()
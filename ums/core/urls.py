@@ -14,7 +14,15 @@ urlpatterns = [
 
     # Admin dashboard & settings
     path('dashboard/admin/', views.admin_dashboard, name='admin_dashboard'),
+    path('dashboard/admin/widgets/<slug:name>/', views.admin_dashboard_widget, name='admin_dashboard_widget'),
     path('settings/', views.settings_view, name='settings'),
+    path('profiler/', views.profiler_summary, name='profiler_summary'),
+    path('profiler/cpu/', views.cpu_profile_list, name='cpu_profile_list'),
+    path('profiler/cpu/<str:name>/', views.cpu_profile_detail, name='cpu_profile_detail'),
+    path('profiler/memory/', views.memory_profile_list, name='memory_profile_list'),
+    path('profiler/traces/', views.trace_list, name='trace_list'),
+    path('profiler/traces/<str:trace_id>/', views.trace_detail, name='trace_detail'),
+    path('metrics/', views.metrics_view, name='metrics'),
 
     # Common / Public pages
     path('about/', views.about_university, name='about_university'),
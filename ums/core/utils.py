@@ -1,22 +1,30 @@
 from io import BytesIO
 from django.http import HttpResponse
 from django.template.loader import get_template
-from xhtml2pdf import pisa
 from django.contrib.admin.models import LogEntry, ADDITION, CHANGE, DELETION
 from django.contrib.contenttypes.models import ContentType
 
+from .metrics import pdf_render_timer
+from .tracing import span
+
 def render_to_pdf(template_src, context_dict={}):
     """
     Render a Django template to PDF and return it as an HttpResponse.
     """
-    template = get_template(template_src)
-    html  = template.render(context_dict)
-    
-    result = BytesIO()
-    
-    # Generate PDF
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
-    
+    # Imported here rather than at module level: xhtml2pdf pulls in reportlab,
+    # pyHanko, svglib, ... which every worker would otherwise load at startup
+    # although only a few views render PDFs.
+    from xhtml2pdf import pisa
+
+    with pdf_render_timer(template_src), span('render_to_pdf', 'pdf', template=template_src):
+        template = get_template(template_src)
+        html  = template.render(context_dict)
+
+        result = BytesIO()
+
+        # Generate PDF
+        pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
+
     if not pdf.err:
         return HttpResponse(result.getvalue(), content_type='application/pdf')
     return None
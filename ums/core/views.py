@@ -1,6 +1,12 @@
+import copy
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.utils.crypto import constant_time_compare
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Q  # Added Q
+from django.db.models import Q
 from django.contrib import messages
 from django.utils import timezone
 
@@ -8,62 +14,59 @@ from students.models import Student
 from faculty.models import Faculty
 from courses.models import Course
 from departments.models import Department
-from fees.models import FeePayment
 from accounts.models import CustomUser
+from accounts.permissions import admin_required
 from django.contrib.admin.models import LogEntry
 from notices.models import Notice
-from .models import UniversitySetting
-
-
-# ── Helper ───────────────────────────────────────────────────────────────────
-def admin_required(view_func):
-    """Decorator: user must be logged-in AND have ADMIN role or be superuser."""
-    @login_required
-    def wrapper(request, *args, **kwargs):
-        if request.user.role != 'ADMIN' and not request.user.is_superuser:
-            messages.error(request, 'Access denied. Admin account required.')
-            return redirect('login')
-        return view_func(request, *args, **kwargs)
-    wrapper.__name__ = view_func.__name__
-    wrapper.__doc__ = view_func.__doc__
-    return wrapper
-
+from . import counters
+from .models import DashboardCounter
+from .routers import read_from_replica
+from .widgets import Widget, widget_view
+from .university import get_university_settings
 
-from attendance.models import AttendanceRecord
 
 # ── Admin Dashboard ─────────────────────────────────────────────────────────
 @admin_required
 def admin_dashboard(request):
-    total_students = Student.objects.count()
-    total_teachers = Faculty.objects.count()
-    total_courses = Course.objects.count()
-    total_revenue_agg = FeePayment.objects.aggregate(Sum('amount_paid'))
-    total_revenue = total_revenue_agg['amount_paid__sum'] or 0
+    # The figures and lists are widgets loaded by the page (ADMIN_WIDGETS)
+    return render(request, 'core/admin_dashboard.html')
 
-    # Calculate Attendance Percentage
-    total_records = AttendanceRecord.objects.count()
-    presented_records = AttendanceRecord.objects.filter(status=True).count()
-    attendance_percentage = (presented_records / total_records * 100) if total_records > 0 else 0
 
-    recent_activities = LogEntry.objects.select_related('content_type', 'user').order_by('-action_time')[:5]
-
-    context = {
-        'total_students': total_students,
-        'total_teachers': total_teachers,
-        'total_courses': total_courses,
-        'total_revenue': total_revenue,
+def _stats_widget(request):
+    # Running totals kept by core.counters: one query, whatever the data size
+    counts = counters.read()
+    total_records = counts['attendance_records']
+    attendance_percentage = (counts['attendance_present'] / total_records * 100) if total_records > 0 else 0
+    return {
+        'total_students': int(counts['students']),
+        'total_teachers': int(counts['teachers']),
+        'total_courses': int(counts['courses']),
+        'total_revenue': counts['revenue'],
         'attendance_percentage': round(attendance_percentage, 1),
-        'recent_activities': recent_activities,
     }
-    return render(request, 'core/admin_dashboard.html', context)
+
+
+def _recent_activity_widget(request):
+    recent_activities = LogEntry.objects.select_related('content_type', 'user').order_by('-action_time')[:5]
+    return {'recent_activities': recent_activities}
+
+
+ADMIN_WIDGETS = {
+    'stats': Widget('core/widgets/stats.html', _stats_widget, models=[DashboardCounter], shared=True),
+    # The admin log is not versioned: keep it for a minute only.
+    'recent_activity': Widget('core/widgets/recent_activity.html', _recent_activity_widget, shared=True, timeout=60),
+}
+
+# The dashboard's figures and lists are read from the replica, if any, and
+# then sent without an ETag (core.conditional).
+admin_dashboard_widget = admin_required(read_from_replica()(widget_view(ADMIN_WIDGETS)))
 
 
 # ── Settings ────────────────────────────────────────────────────────────────
 @admin_required
 def settings_view(request):
-    settings_obj = UniversitySetting.objects.first()
-    if not settings_obj:
-        settings_obj = UniversitySetting.objects.create()
+    # A private copy: the cached instance is shared by every request.
+    settings_obj = copy.copy(get_university_settings())
 
     if request.method == 'POST':
         university_name = request.POST.get('university_name')
@@ -81,6 +84,13 @@ def settings_view(request):
         if 'logo' in request.FILES:
             settings_obj.logo = request.FILES['logo']
 
+        # A malformed year or semester would leave every term-scoped page empty
+        try:
+            settings_obj.full_clean()
+        except ValidationError as e:
+            messages.error(request, ' '.join(e.messages))
+            return render(request, 'core/settings.html', {'settings': settings_obj})
+
         settings_obj.save()
         messages.success(request, "Settings updated successfully.")
         return redirect('settings')
@@ -88,18 +98,138 @@ def settings_view(request):
     return render(request, 'core/settings.html', {'settings': settings_obj})
 
 
+# ── Query Profiler Summary ──────────────────────────────────────────────────
+@admin_required
+def profiler_summary(request):
+    """Worst offending views by SQL query count / latency in this worker."""
+    from .profiling import worst_offenders, reset_stats
+
+    if request.method == 'POST':
+        reset_stats()
+        messages.success(request, "Profiler statistics cleared.")
+        return redirect('profiler_summary')
+
+    order_by = request.GET.get('order', 'max_queries')
+    if order_by not in ('max_queries', 'avg_queries', 'max_ms', 'avg_ms', 'avg_db_ms', 'over_budget'):
+        order_by = 'max_queries'
+
+    return render(request, 'core/profiler_summary.html', {
+        'rows': worst_offenders(order_by=order_by),
+        'order_by': order_by,
+    })
+
+
+# ── CPU Profiles (cProfile captures) ────────────────────────────────────────
+@admin_required
+def cpu_profile_list(request):
+    """Stored ``?_profile=1`` captures, newest first."""
+    from . import cpu_profiles
+
+    return render(request, 'core/cpu_profile_list.html', {
+        'profiles': cpu_profiles.list_profiles(),
+        'param': cpu_profiles.PROFILE_PARAM,
+    })
+
+
+@admin_required
+def cpu_profile_detail(request, name):
+    """Call tree and most expensive functions of one capture."""
+    from . import cpu_profiles
+
+    path = cpu_profiles.profile_path(name)
+    if path is None:
+        raise Http404("No such profile.")
+    if request.GET.get('download'):
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
+
+    sort = 'tottime' if request.GET.get('sort') == 'tottime' else 'cumulative'
+    stats = cpu_profiles.load_stats(path)
+    tree, total = cpu_profiles.call_tree(stats)
+    return render(request, 'core/cpu_profile_detail.html', {
+        'name': name,
+        'tree': tree,
+        'total': total,
+        'top': cpu_profiles.top_functions(stats, sort=sort),
+        'sort': sort,
+    })
+
+
+# ── Memory Profiles (tracemalloc captures) ──────────────────────────────────
+@admin_required
+def memory_profile_list(request):
+    """Recent ``?_memprofile=1`` reports captured by this worker."""
+    from . import memory_profiles
+
+    if request.method == 'POST':
+        memory_profiles.clear_reports()
+        messages.success(request, "Memory profiles cleared.")
+        return redirect('memory_profile_list')
+
+    return render(request, 'core/memory_profile_list.html', {
+        'reports': memory_profiles.recent_reports(),
+        'param': memory_profiles.MEMORY_PARAM,
+    })
+
+
+# ── Request Traces ──────────────────────────────────────────────────────────
+@admin_required
+def trace_list(request):
+    """Newest traces from the trace file, optionally filtered by path."""
+    from .tracing import recent_traces
+
+    path = request.GET.get('path', '').strip()
+    traces = recent_traces(limit=500 if path else 100)
+    if path:
+        traces = [t for t in traces if path in t['path']][:100]
+    return render(request, 'core/trace_list.html', {'traces': traces, 'path': path})
+
+
+@admin_required
+def trace_detail(request, trace_id):
+    """Waterfall of one trace."""
+    from .tracing import find_trace, waterfall
+
+    trace = find_trace(trace_id)
+    if trace is None:
+        raise Http404("Trace not found (it may have been rotated out).")
+    spans = waterfall(trace)
+    return render(request, 'core/trace_detail.html', {
+        'trace': trace,
+        'spans': spans,
+        'query_count': sum(1 for s in spans if s['kind'] == 'db'),
+        'query_ms': sum(s['duration_ms'] for s in spans if s['kind'] == 'db'),
+    })
+
+
+# ── Prometheus Metrics ──────────────────────────────────────────────────────
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint.  Admins can open it in the browser; a
+    scraper authenticates with ``Authorization: Bearer <METRICS_TOKEN>``.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return _metrics_response(request)
+    return admin_required(_metrics_response)(request)
+
+
+def _metrics_response(request):
+    from .metrics import render as render_metrics
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 #  COMMON / PUBLIC PAGES
 # ═══════════════════════════════════════════════════════════════════════════
 
 def _get_university_context():
     """Shared context for public-facing pages."""
-    settings_obj = UniversitySetting.objects.first()
+    settings_obj = get_university_settings()
     return {
         'settings_obj': settings_obj,
-        'university_name': settings_obj.university_name if settings_obj else 'My University',
-        'academic_year': settings_obj.academic_year if settings_obj else '2024-2025',
-        'current_semester': settings_obj.current_semester if settings_obj else 1,
+        'university_name': settings_obj.university_name,
+        'academic_year': settings_obj.academic_year,
+        'current_semester': settings_obj.current_semester,
         'current_year': timezone.localdate().year,
     }
 
@@ -182,10 +312,6 @@ def global_search(request):
     
     if query:
         # Search Students (Name, Enrollment No)
-        from students.models import Student
-        from faculty.models import Faculty
-        from courses.models import Course
-        from django.db.models import Q
 
         results['students'] = Student.objects.filter(
             Q(user__first_name__icontains=query) | 
@@ -207,15 +333,12 @@ def global_search(request):
             Q(code__icontains=query)
         ).select_related('department')[:10]
 
-    # Determine base template
+    # Determine base template (the profile was loaded with the user)
     base_template = 'base.html'
-    if request.user.is_authenticated:
-        # Check role safely (assuming role attribute exists on user model)
-        role = getattr(request.user, 'role', 'ADMIN') 
-        if role == 'STUDENT':
-            base_template = 'student/base_student.html'
-        elif role == 'FACULTY':
-            base_template = 'teacher/base_teacher.html'
+    if isinstance(request.role_profile, Student):
+        base_template = 'student/base_student.html'
+    elif isinstance(request.role_profile, Faculty):
+        base_template = 'teacher/base_teacher.html'
 
     return render(request, 'core/search_results.html', {
         'query': query, 
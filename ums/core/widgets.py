@@ -0,0 +1,68 @@
+"""
+Dashboard widgets served from their own endpoints.
+
+A dashboard view renders only a shell: the page layout with a placeholder
+per widget (``includes/widget_slot.html``).  ``includes/widget_loader.html``
+then fetches every widget in parallel, so the first paint never waits for
+the slowest aggregate and a slow widget only delays itself.
+
+Each widget is a ``Widget``: a template, a function building its context and
+the models its data comes from.  The rendered HTML is cached under the
+generations of those models (``core.cache_versions``), per user unless the
+widget shows the same thing to everyone, and the endpoint answers
+conditional GETs with a 304 (``core.conditional``).
+
+    STUDENT_WIDGETS = {
+        'attendance': Widget('student/widgets/attendance.html', _attendance,
+                             models=[AttendanceRecord]),
+    }
+    student_dashboard_widget = student_required(widget_view(STUDENT_WIDGETS))
+"""
+from django.http import Http404, HttpResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .cache_versions import cached
+from .conditional import conditional_view, page_etag
+
+
+class Widget:
+    """
+    ``build(request)`` returns the context for ``template``.  ``shared``
+    widgets show every user the same data and share one cache entry.
+    Widgets whose data is not versioned (``models`` empty) are cached for
+    ``timeout`` seconds only.
+    """
+
+    def __init__(self, template, build, models=(), shared=False, timeout=None):
+        self.template = template
+        self.build = build
+        self.models = list(models)
+        self.shared = shared
+        self.timeout = timeout
+
+    def render(self, request, name):
+        scope = 'all' if self.shared else request.user.pk
+        return cached(
+            f'widget:{name}', self.models,
+            lambda: render_to_string(self.template, self.build(request), request=request),
+            scope, timezone.localdate(), timeout=self.timeout,
+        )
+
+
+def widget_view(widgets):
+    """A view ``(request, name)`` serving the widgets in ``widgets``."""
+    def view(request, name):
+        widget = widgets.get(name)
+        if widget is None:
+            raise Http404(f'No widget named "{name}".')
+        return HttpResponse(widget.render(request, name))
+
+    def etag_func(request, name):
+        widget = widgets.get(name)
+        # Unversioned widgets can change at any time: always send them.
+        if widget is None or not widget.models:
+            return None
+        return page_etag(request, widget.models)
+
+    return conditional_view(view, etag_func)
@@ -1,18 +1,17 @@
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
-from django.contrib.auth.mixins import LoginRequiredMixin
+from accounts.permissions import CapabilityRequiredMixin, admin_required
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
 from django.urls import reverse_lazy
 from django.contrib import messages
 from .models import Course
 from students.models import Student
 
-class CourseListView(LoginRequiredMixin, ListView):
+class CourseListView(CapabilityRequiredMixin, ListView):
     model = Course
     template_name = 'courses/course_list.html'
     context_object_name = 'courses'
 
-class CourseCreateView(LoginRequiredMixin, CreateView):
+class CourseCreateView(CapabilityRequiredMixin, CreateView):
     model = Course
     fields = ['name', 'code', 'department', 'faculty', 'semester', 'credits', 'capacity']
     template_name = 'courses/course_form.html'
@@ -22,7 +21,7 @@ class CourseCreateView(LoginRequiredMixin, CreateView):
         messages.success(self.request, "Course created successfully.")
         return super().form_valid(form)
 
-class CourseUpdateView(LoginRequiredMixin, UpdateView):
+class CourseUpdateView(CapabilityRequiredMixin, UpdateView):
     model = Course
     fields = ['name', 'code', 'department', 'faculty', 'semester', 'credits', 'capacity']
     template_name = 'courses/course_form.html'
@@ -32,7 +31,7 @@ class CourseUpdateView(LoginRequiredMixin, UpdateView):
         messages.success(self.request, "Course updated successfully.")
         return super().form_valid(form)
 
-class CourseDeleteView(LoginRequiredMixin, DeleteView):
+class CourseDeleteView(CapabilityRequiredMixin, DeleteView):
     model = Course
     template_name = 'courses/course_confirm_delete.html'
     success_url = reverse_lazy('course_list')
@@ -42,7 +41,7 @@ class CourseDeleteView(LoginRequiredMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
-@login_required
+@admin_required
 def enroll_students(request, pk):
     course = get_object_or_404(Course, pk=pk)
 
@@ -1,15 +1,15 @@
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
-from django.contrib.auth.mixins import LoginRequiredMixin
+from accounts.permissions import CapabilityRequiredMixin
 from django.urls import reverse_lazy
 from .models import Department
 from django.contrib import messages
 
-class DepartmentListView(LoginRequiredMixin, ListView):
+class DepartmentListView(CapabilityRequiredMixin, ListView):
     model = Department
     template_name = 'departments/department_list.html'
     context_object_name = 'departments'
 
-class DepartmentCreateView(LoginRequiredMixin, CreateView):
+class DepartmentCreateView(CapabilityRequiredMixin, CreateView):
     model = Department
     fields = ['name', 'code', 'hod']
     template_name = 'departments/department_form.html'
@@ -19,7 +19,7 @@ class DepartmentCreateView(LoginRequiredMixin, CreateView):
         messages.success(self.request, "Department created successfully.")
         return super().form_valid(form)
 
-class DepartmentUpdateView(LoginRequiredMixin, UpdateView):
+class DepartmentUpdateView(CapabilityRequiredMixin, UpdateView):
     model = Department
     fields = ['name', 'code', 'hod']
     template_name = 'departments/department_form.html'
@@ -29,7 +29,7 @@ class DepartmentUpdateView(LoginRequiredMixin, UpdateView):
         messages.success(self.request, "Department updated successfully.")
         return super().form_valid(form)
 
-class DepartmentDeleteView(LoginRequiredMixin, DeleteView):
+class DepartmentDeleteView(CapabilityRequiredMixin, DeleteView):
     model = Department
     template_name = 'departments/department_confirm_delete.html'
     success_url = reverse_lazy('department_list')
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+def remove_duplicates(apps, schema_editor):
+    # Keep the latest marks entered for each (exam, student).
+    Result = apps.get_model('examinations', 'Result')
+    duplicates = (
+        Result.objects.values('exam', 'student')
+        .annotate(n=models.Count('id'), keep=models.Max('id')).filter(n__gt=1)
+    )
+    for row in duplicates:
+        Result.objects.filter(exam=row['exam'], student=row['student']).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examinations', '0004_exam_end_time_exam_is_published_exam_room_number_and_more'),
+        ('students', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['student', 'exam'], name='result_student_exam_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='result',
+            constraint=models.UniqueConstraint(fields=('exam', 'student'), name='unique_exam_result'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.conf import settings
 from django.db import models
 
+from core.cache_versions import bump_generation
+from core.terms import term_for_date
+
 class Exam(models.Model):
     class ExamType(models.TextChoices):
         MID = "MID", "Mid Term"
@@ -11,11 +14,23 @@ class Exam(models.Model):
     exam_type = models.CharField(max_length=20, choices=ExamType.choices)
     total_marks = models.IntegerField()
     date = models.DateField()
+    # Academic term of ``date`` (core.terms), set on save
+    term = models.CharField(max_length=20, editable=False)
     start_time = models.TimeField(blank=True, null=True)
     end_time = models.TimeField(blank=True, null=True)
     room_number = models.CharField(max_length=50, blank=True, null=True)
     is_published = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # A term's exams, per course
+            models.Index(fields=['term', 'course', 'date'], name='exam_term_course_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.term = term_for_date(self.date)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.course.name} - {self.exam_type}"
 
@@ -24,5 +39,29 @@ class Result(models.Model):
     student = models.ForeignKey('students.Student', on_delete=models.CASCADE)
     marks_obtained = models.DecimalField(max_digits=5, decimal_places=2)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['exam', 'student'], name='unique_exam_result'),
+        ]
+        indexes = [
+            # A student's results, joined to their exams
+            models.Index(fields=['student', 'exam'], name='result_student_exam_idx'),
+        ]
+
     def __str__(self):
         return f"{self.student.enrollment_no} - {self.exam}"
+
+
+def save_marks(exam, marks):
+    """
+    Insert or update the results of ``exam`` from ``{student_id: marks}`` in
+    one statement, relying on the ``unique_exam_result`` constraint.
+    """
+    if not marks:
+        return
+    Result.objects.bulk_create(
+        [Result(exam=exam, student_id=student_id, marks_obtained=value) for student_id, value in marks.items()],
+        update_conflicts=True, unique_fields=['exam', 'student'], update_fields=['marks_obtained'],
+    )
+    # bulk_create skips the signals that bump the generation
+    bump_generation(Result)
@@ -1,3 +1,57 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, connections, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.tests.regression import QueryCountMixin, SeededUniversity
+from examinations.models import Result
+
+
+class ExaminationViewQueryCountTests(QueryCountMixin, TestCase):
+    """Every route in examinations/urls.py runs a flat number of queries."""
+
+    def get_cases(self):
+        uni = self.uni
+        admin = uni.admin
+        return [
+            (admin, 'exam_list', None, None, 5),
+            (admin, 'exam_add', None, None, 5),
+            (admin, 'exam_edit', {'pk': uni.exam.pk}, None, 6),
+            (admin, 'exam_delete', {'pk': uni.exam.pk}, None, 6),
+            (admin, 'result_entry', {'pk': uni.exams[1].pk}, None, 8),
+            (admin, 'result_sheet', {'pk': uni.exam.pk}, None, 8),
+            (admin, 'exam_publish', {'pk': uni.exams[-1].pk}, None, 6),
+        ]
+
+
+class ResultUniquenessTests(TestCase):
+    """One result per (exam, student); marks are saved with a single upsert."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.uni = SeededUniversity(departments=1, students_per_department=3, attendance_sessions=1)
+
+    def post_marks(self, exam, value):
+        students = list(exam.course.students.all())
+        self.client.force_login(exam.course.faculty.user)
+        with CaptureQueriesContext(connections['default']) as ctx:
+            self.client.post(reverse('teacher_enter_marks', args=[exam.pk]),
+                             {f'marks_{s.pk}': value for s in students})
+        return students, [q for q in ctx.captured_queries if 'examinations_result' in q['sql']]
+
+    def test_marks_are_upserted_in_one_statement(self):
+        exam = self.uni.exams[1]
+        students, writes = self.post_marks(exam, '55')
+        self.assertEqual(len(writes), 1)
+        students, writes = self.post_marks(exam, '72.5')
+        self.assertEqual(len(writes), 1)
+        results = Result.objects.filter(exam=exam)
+        self.assertEqual(results.count(), len(students))
+        self.assertEqual(set(results.values_list('marks_obtained', flat=True)), {Decimal('72.5')})
 
-# Create your tests here.
+    def test_duplicate_result_is_rejected(self):
+        result = Result.objects.filter(exam=self.uni.exam).first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Result.objects.create(exam=result.exam, student=result.student, marks_obtained=Decimal('10'))
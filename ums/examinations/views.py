@@ -1,21 +1,22 @@
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
-from django.contrib.auth.mixins import LoginRequiredMixin
+from accounts.permissions import CapabilityRequiredMixin, admin_required
 from django.urls import reverse_lazy
 from django.contrib import messages
-from .models import Exam, Result
+from .models import Exam, Result, save_marks
 from .forms import ExamForm
 from students.models import Student
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
 from django.forms import modelformset_factory
+from decimal import Decimal
 
-class ExamListView(LoginRequiredMixin, ListView):
+class ExamListView(CapabilityRequiredMixin, ListView):
     model = Exam
+    queryset = Exam.objects.select_related('course')
     template_name = 'examinations/exam_list.html'
     context_object_name = 'exams'
     ordering = ['-date']
 
-class ExamCreateView(LoginRequiredMixin, CreateView):
+class ExamCreateView(CapabilityRequiredMixin, CreateView):
     model = Exam
     form_class = ExamForm
     template_name = 'examinations/exam_form.html'
@@ -25,7 +26,7 @@ class ExamCreateView(LoginRequiredMixin, CreateView):
         messages.success(self.request, "Exam scheduled successfully.")
         return super().form_valid(form)
 
-class ExamUpdateView(LoginRequiredMixin, UpdateView):
+class ExamUpdateView(CapabilityRequiredMixin, UpdateView):
     model = Exam
     form_class = ExamForm
     template_name = 'examinations/exam_form.html'
@@ -35,7 +36,7 @@ class ExamUpdateView(LoginRequiredMixin, UpdateView):
         messages.success(self.request, "Exam updated successfully.")
         return super().form_valid(form)
 
-class ExamDeleteView(LoginRequiredMixin, DeleteView):
+class ExamDeleteView(CapabilityRequiredMixin, DeleteView):
     model = Exam
     template_name = 'examinations/exam_confirm_delete.html'
     success_url = reverse_lazy('exam_list')
@@ -44,7 +45,7 @@ class ExamDeleteView(LoginRequiredMixin, DeleteView):
         messages.success(self.request, "Exam deleted successfully.")
         return super().delete(request, *args, **kwargs)
 
-@login_required
+@admin_required
 def result_entry(request, pk):
     exam = get_object_or_404(Exam, pk=pk)
     
@@ -52,26 +53,23 @@ def result_entry(request, pk):
         messages.error(request, "Results are published and locked. You cannot modify them.")
         return redirect('exam_list')
 
-    students = exam.course.students.all()
+    students = exam.course.students.select_related('user')
     
     if request.method == 'POST':
         try:
+            marks = {}
             for student in students:
-                marks = request.POST.get(f'marks_{student.id}')
-                if marks:
-                    Result.objects.update_or_create(
-                        exam=exam,
-                        student=student,
-                        defaults={'marks_obtained': marks}
-                    )
+                value = request.POST.get(f'marks_{student.id}')
+                if value:
+                    marks[student.id] = Decimal(value)
+            save_marks(exam, marks)
             messages.success(request, "Results updated successfully.")
             return redirect('exam_list')
         except Exception as e:
             messages.error(request, f"Error updating results: {e}")
 
     # Fetch existing results
-    results = Result.objects.filter(exam=exam)
-    result_map = {res.student.id: res.marks_obtained for res in results}
+    result_map = dict(Result.objects.filter(exam=exam).values_list('student_id', 'marks_obtained'))
 
     student_data = []
     for student in students:
@@ -85,7 +83,7 @@ def result_entry(request, pk):
         'student_data': student_data
     })
 
-@login_required
+@admin_required
 def result_sheet(request, pk):
     exam = get_object_or_404(Exam, pk=pk)
     results = Result.objects.filter(exam=exam).select_related('student', 'student__user').order_by('student__enrollment_no')
@@ -95,7 +93,7 @@ def result_sheet(request, pk):
         'results': results
     })
 
-@login_required
+@admin_required
 def publish_exam(request, pk):
     """
     Toggle the publication status of an exam result.
@@ -1,3 +1,46 @@
 from django.test import TestCase
 
-# Create your tests here.
+from core.tests.regression import QueryCountMixin
+
+
+class FacultyViewQueryCountTests(QueryCountMixin, TestCase):
+    """Every route in faculty/urls.py runs a flat number of queries."""
+
+    def get_cases(self):
+        uni = self.uni
+        admin, teacher = uni.admin, uni.teacher.user
+        return [
+            # Admin-facing
+            (admin, 'faculty_list', None, None, 6),
+            (admin, 'faculty_list', None, {'department': uni.department.pk, 'q': 'Teacher'}, 6),
+            (admin, 'add_faculty', None, None, 5),
+            (admin, 'faculty_detail', {'pk': uni.teacher.pk}, None, 6),
+            (admin, 'edit_faculty', {'pk': uni.teacher.pk}, None, 7),
+            (admin, 'delete_faculty', {'pk': uni.teacher.pk}, None, 6),
+            # Teacher panel
+            (teacher, 'teacher_dashboard', None, None, 2),
+            (teacher, 'teacher_dashboard_widget', {'name': 'courses_count'}, None, 3),
+            (teacher, 'teacher_dashboard_widget', {'name': 'students_count'}, None, 3),
+            # Reads the active term (UniversitySetting) on a cold cache
+            (teacher, 'teacher_dashboard_widget', {'name': 'pending_grading'}, None, 4),
+            (teacher, 'teacher_dashboard_widget', {'name': 'notices_count'}, None, 3),
+            (teacher, 'teacher_dashboard_widget', {'name': 'schedule'}, None, 3),
+            (teacher, 'teacher_dashboard_widget', {'name': 'courses'}, None, 3),
+            (teacher, 'teacher_my_courses', None, None, 5),
+            (teacher, 'teacher_course_students', {'course_id': uni.course.pk}, None, 6),
+            (teacher, 'teacher_take_attendance', None, None, 5),
+            (teacher, 'teacher_take_attendance', None, {'course': uni.course.pk, 'date': str(uni.attendance.date)}, 8),
+            (teacher, 'teacher_upload_marks', None, None, 5),
+            (teacher, 'teacher_upload_marks', None, {'exam': uni.exam.pk}, 8),
+            (teacher, 'teacher_enter_marks', {'exam_id': uni.exam.pk}, None, 5),
+            (teacher, 'teacher_notices', None, None, 5),
+            (teacher, 'teacher_post_notice', None, None, 5),
+            (teacher, 'teacher_view_students', None, None, 6),
+            (teacher, 'teacher_view_students', None, {'course': uni.course.pk}, 7),
+            # Counted with cold caches: loads the teacher's course set and the active term
+            (teacher, 'teacher_student_profile', {'student_id': uni.student.pk}, None, 8),
+            (teacher, 'teacher_reports', None, {'course': uni.course.pk}, 7),
+            (teacher, 'teacher_reports', None, {'course': uni.course.pk, 'report_type': 'attendance'}, 8),
+            (teacher, 'teacher_profile', None, None, 4),
+            (teacher, 'teacher_timetable', None, None, 5),
+        ]
@@ -12,6 +12,7 @@ urlpatterns = [
     # ── Teacher Panel (8 pages) ────────────────────────
     # 1. Dashboard
     path('dashboard/', views.teacher_dashboard, name='teacher_dashboard'),
+    path('dashboard/widgets/<slug:name>/', views.teacher_dashboard_widget, name='teacher_dashboard_widget'),
 
     # 2. My Courses
     path('courses/', views.teacher_my_courses, name='teacher_my_courses'),
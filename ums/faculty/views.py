@@ -1,42 +1,43 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
 from django.urls import reverse
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Avg, Max, Min, Count, Q
+from django.db.models import Avg, Max, Min, Count, Q, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db import transaction
 from decimal import Decimal
 import calendar
 
 from .models import Faculty
 from departments.models import Department
 from accounts.models import CustomUser
+from accounts.permissions import admin_required, get_capabilities, faculty_required
 from courses.models import Course
 from students.models import Student
 from attendance.models import Attendance, AttendanceRecord
-from examinations.models import Exam, Result
+from examinations.models import Exam, Result, save_marks
 from notices.models import Notice
 from timetable.models import Timetable
+from core import counters
+from core.cache_versions import bump_generation
+from core.concurrent import fan_out
+from core.models import UniversitySetting
+from core.routers import read_from_replica
+from core.terms import active_term, selected_term, term_context
+from core.widgets import Widget, widget_view
 from django.contrib.auth.hashers import make_password
 import random
 import string
 
 
-# ── Helper ───────────────────────────────────────────────────────────────────
-def faculty_required(view_func):
-    """Decorator: user must be logged-in AND be a Faculty member."""
-    @login_required
-    def wrapper(request, *args, **kwargs):
-        if not hasattr(request.user, 'faculty'):
-            messages.error(request, 'Access denied. Faculty account required.')
-            return redirect('login')
-        return view_func(request, *args, **kwargs)
-    wrapper.__name__ = view_func.__name__
-    wrapper.__doc__ = view_func.__doc__
-    return wrapper
+def _pick(objects, pk):
+    """The object in ``objects`` whose id is ``pk`` (as sent by a form), or ``None``."""
+    return next((obj for obj in objects if str(obj.id) == str(pk)), None)
 
 
 # ── Admin-facing views (unchanged) ──────────────────────────────────────────
-@login_required
+@admin_required
 def faculty_list(request):
     dept_id = request.GET.get('department')
     search_query = request.GET.get('q')
@@ -62,7 +63,7 @@ def faculty_list(request):
     })
 
 
-@login_required
+@admin_required
 def add_faculty(request):
     if request.method == 'POST':
         first_name = request.POST.get('first_name')
@@ -115,11 +116,11 @@ def add_faculty(request):
     return render(request, 'faculty/add_faculty.html', {'departments': departments})
 
 
-@login_required
+@admin_required
 def faculty_detail(request, pk):
-    faculty = get_object_or_404(Faculty, pk=pk)
+    faculty = get_object_or_404(Faculty.objects.select_related('user', 'department'), pk=pk)
     # Get courses assigned to this faculty
-    courses = Course.objects.filter(faculty=faculty)
+    courses = Course.objects.filter(faculty=faculty).annotate(num_students=Count('students'))
     
     context = {
         'faculty': faculty,
@@ -128,7 +129,7 @@ def faculty_detail(request, pk):
     return render(request, 'faculty/faculty_detail.html', context)
 
 
-@login_required
+@admin_required
 def edit_faculty(request, pk):
     faculty = get_object_or_404(Faculty, pk=pk)
     user = faculty.user
@@ -155,7 +156,7 @@ def edit_faculty(request, pk):
     return render(request, 'faculty/edit_faculty.html', {'faculty': faculty, 'departments': departments})
 
 
-@login_required
+@admin_required
 def delete_faculty(request, pk):
     faculty = get_object_or_404(Faculty, pk=pk)
     if request.method == 'POST':
@@ -171,45 +172,71 @@ def delete_faculty(request, pk):
 # ═══════════════════════════════════════════════════════════════════════════
 @faculty_required
 def teacher_dashboard(request):
-    faculty = request.user.faculty
-    courses = Course.objects.filter(faculty=faculty)
-    total_courses = courses.count()
+    # The figures and lists are widgets loaded by the page (TEACHER_WIDGETS)
+    return render(request, 'teacher/dashboard.html')
+
+
+def _teacher_courses(faculty):
+    return list(Course.objects.filter(faculty=faculty).annotate(num_students=Count('students')))
 
+
+def _courses_count_widget(request):
+    return {'total_courses': len(get_capabilities(request).course_ids)}
+
+
+def _students_count_widget(request):
     # Total students across all courses
-    total_students = 0
-    for c in courses:
-        total_students += c.students.count()
+    return {'total_students': sum(c.num_students for c in _teacher_courses(request.role_profile))}
 
-    # Pending grading = exams whose results are not yet complete
-    pending_grading = 0
-    exams = Exam.objects.filter(course__in=courses)
-    for exam in exams:
-        enrolled = exam.course.students.count()
-        graded = Result.objects.filter(exam=exam).count()
-        if graded < enrolled:
-            pending_grading += 1
 
+def _pending_grading_widget(request):
+    # Pending grading = exams whose results are not yet complete
+    enrolled_count = Course.students.through.objects.filter(
+        course_id=OuterRef('course_id')
+    ).values('course_id').annotate(n=Count('id')).values('n')
+    graded_count = Result.objects.filter(
+        exam_id=OuterRef('pk')
+    ).values('exam_id').annotate(n=Count('id')).values('n')
+    pending_grading = Exam.objects.filter(term=active_term(), course__faculty=request.role_profile).annotate(
+        enrolled=Coalesce(Subquery(enrolled_count), 0),
+        graded=Coalesce(Subquery(graded_count), 0),
+    ).filter(graded__lt=F('enrolled')).count()
+    return {'pending_grading': pending_grading}
+
+
+def _notices_count_widget(request):
     # Notices posted by this teacher
-    notices_count = Notice.objects.filter(posted_by=request.user).count()
+    return {'notices_count': Notice.objects.filter(posted_by=request.user).count()}
 
+
+def _schedule_widget(request):
     # Today's schedule from Timetable
     today = timezone.localdate()
     day_name = calendar.day_name[today.weekday()]
     todays_schedule = Timetable.objects.filter(
-        faculty=faculty,
+        faculty=request.role_profile,
         day_of_week__iexact=day_name
     ).select_related('course').order_by('start_time')
+    return {'todays_schedule': todays_schedule, 'today_display': today.strftime('%A, %d %b %Y')}
 
-    context = {
-        'total_courses': total_courses,
-        'total_students': total_students,
-        'pending_grading': pending_grading,
-        'notices_count': notices_count,
-        'courses': courses,
-        'todays_schedule': todays_schedule,
-        'today_display': today.strftime('%A, %d %b %Y'),
-    }
-    return render(request, 'teacher/dashboard.html', context)
+
+def _courses_widget(request):
+    return {'courses': _teacher_courses(request.role_profile)}
+
+
+# Enrolment changes bump the Student generation (core.cache_versions), and
+# switching the active term the UniversitySetting one.
+TEACHER_WIDGETS = {
+    'courses_count': Widget('teacher/widgets/courses_count.html', _courses_count_widget, models=[Course]),
+    'students_count': Widget('teacher/widgets/students_count.html', _students_count_widget, models=[Course, Student]),
+    'pending_grading': Widget('teacher/widgets/pending_grading.html', _pending_grading_widget,
+                              models=[Course, Student, Exam, Result, UniversitySetting]),
+    'notices_count': Widget('teacher/widgets/notices_count.html', _notices_count_widget, models=[Notice]),
+    'schedule': Widget('teacher/widgets/schedule.html', _schedule_widget, models=[Timetable, Course]),
+    'courses': Widget('teacher/widgets/courses.html', _courses_widget, models=[Course, Student]),
+}
+
+teacher_dashboard_widget = faculty_required(widget_view(TEACHER_WIDGETS))
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -218,7 +245,9 @@ def teacher_dashboard(request):
 @faculty_required
 def teacher_my_courses(request):
     faculty = request.user.faculty
-    courses = Course.objects.filter(faculty=faculty).select_related('department')
+    courses = Course.objects.filter(faculty=faculty).select_related('department').annotate(
+        num_students=Count('students')
+    )
     return render(request, 'teacher/my_courses.html', {'courses': courses})
 
 
@@ -254,7 +283,7 @@ def teacher_timetable(request):
 @faculty_required
 def teacher_take_attendance(request):
     faculty = request.user.faculty
-    courses = Course.objects.filter(faculty=faculty)
+    courses = list(Course.objects.filter(faculty=faculty))
 
     selected_course = None
     selected_date = timezone.localdate()
@@ -264,10 +293,7 @@ def teacher_take_attendance(request):
 
     # GET – load students
     if request.GET.get('course'):
-        try:
-            selected_course = Course.objects.get(id=request.GET['course'], faculty=faculty)
-        except Course.DoesNotExist:
-            selected_course = None
+        selected_course = _pick(courses, request.GET['course'])
 
         if request.GET.get('date'):
             try:
@@ -294,28 +320,44 @@ def teacher_take_attendance(request):
         try:
             from datetime import datetime as dt
             att_date = dt.strptime(date_str, '%Y-%m-%d').date()
-            course = Course.objects.get(id=course_id, faculty=faculty)
+            course = _pick(courses, course_id)
+            if course is None:
+                raise Course.DoesNotExist
         except Exception:
             messages.error(request, 'Invalid course or date.')
             return redirect('teacher_take_attendance')
 
-        # Create or get attendance session
-        attendance_obj, created = Attendance.objects.get_or_create(
-            course=course, date=att_date,
-            defaults={'marked_by': faculty}
-        )
-        if not created:
-            # Update: remove old records
-            AttendanceRecord.objects.filter(attendance=attendance_obj).delete()
-
-        enrolled_students = course.students.all()
-        for student in enrolled_students:
-            is_present = request.POST.get(f'present_{student.id}') == 'on'
-            AttendanceRecord.objects.create(
-                attendance=attendance_obj,
-                student=student,
-                status=is_present
+        with transaction.atomic():
+            # Create or get attendance session
+            attendance_obj, created = Attendance.objects.get_or_create(
+                course=course, date=att_date,
+                defaults={'marked_by': faculty}
             )
+            # Update existing records in place and add the missing ones, in
+            # bulk.  Bulk writes skip model signals, hence the explicit
+            # counter / cache-generation updates below.
+            existing = {r.student_id: r for r in AttendanceRecord.objects.filter(attendance=attendance_obj)}
+            to_create, to_update = [], []
+            present_delta = 0
+            for student_id in course.students.values_list('id', flat=True):
+                is_present = request.POST.get(f'present_{student_id}') == 'on'
+                record = existing.pop(student_id, None)
+                if record is None:
+                    to_create.append(AttendanceRecord(attendance=attendance_obj, student_id=student_id, status=is_present))
+                    present_delta += is_present
+                elif record.status != is_present:
+                    present_delta += is_present - record.status
+                    record.status = is_present
+                    to_update.append(record)
+
+            AttendanceRecord.objects.bulk_create(to_create)
+            AttendanceRecord.objects.bulk_update(to_update, ['status'])
+            if existing:
+                # Students no longer enrolled (signals adjust the counters)
+                AttendanceRecord.objects.filter(pk__in=[r.pk for r in existing.values()]).delete()
+            counters.adjust(attendance_records=len(to_create), attendance_present=present_delta)
+            if to_create or to_update:
+                bump_generation(AttendanceRecord)
 
         messages.success(request, f'Attendance saved for {course.name} on {att_date.strftime("%d %b %Y")}.')
         return redirect('teacher_take_attendance')
@@ -339,32 +381,34 @@ def teacher_take_attendance(request):
 # ═══════════════════════════════════════════════════════════════════════════
 @faculty_required
 def teacher_upload_marks(request):
-    faculty = request.user.faculty
-    courses = Course.objects.filter(faculty=faculty)
-    exams = Exam.objects.filter(course__in=courses).select_related('course').order_by('-date')
+    term = selected_term(request)
+    exams = Exam.objects.filter(course_id__in=get_capabilities(request).course_ids)
+    if term:
+        exams = exams.filter(term=term)
+    exams = list(exams.select_related('course').order_by('-date'))
 
     selected_exam = None
     student_marks = []
 
     if request.GET.get('exam'):
-        try:
-            selected_exam = Exam.objects.get(id=request.GET['exam'], course__faculty=faculty)
-        except Exam.DoesNotExist:
-            selected_exam = None
+        selected_exam = _pick(exams, request.GET['exam'])
 
         if selected_exam:
             enrolled = selected_exam.course.students.select_related('user').all()
+            marks_by_student = dict(
+                Result.objects.filter(exam=selected_exam).values_list('student_id', 'marks_obtained')
+            )
             for student in enrolled:
-                result = Result.objects.filter(exam=selected_exam, student=student).first()
                 student_marks.append({
                     'student': student,
-                    'marks': result.marks_obtained if result else None,
+                    'marks': marks_by_student.get(student.id),
                 })
 
     context = {
         'exams': exams,
         'selected_exam': selected_exam,
         'student_marks': student_marks,
+        **term_context(term),
     }
     return render(request, 'teacher/upload_marks.html', context)
 
@@ -376,27 +420,21 @@ def teacher_enter_marks(request, exam_id):
 
     if exam.is_published:
         messages.error(request, 'Results for this exam are published and locked. You cannot modify them.')
-        return redirect(f"{reverse('teacher_upload_marks')}?exam={exam.id}")
+        return redirect(f"{reverse('teacher_upload_marks')}?term={exam.term}&exam={exam.id}")
 
     if request.method == 'POST':
-        enrolled = exam.course.students.all()
-        for student in enrolled:
-            marks_val = request.POST.get(f'marks_{student.id}')
+        marks = {}
+        for student_id in exam.course.students.values_list('id', flat=True):
+            marks_val = request.POST.get(f'marks_{student_id}')
             if marks_val is not None and marks_val.strip() != '':
                 try:
-                    marks = Decimal(marks_val)
+                    marks[student_id] = Decimal(marks_val)
                 except Exception:
                     continue
-                result, created = Result.objects.get_or_create(
-                    exam=exam, student=student,
-                    defaults={'marks_obtained': marks}
-                )
-                if not created:
-                    result.marks_obtained = marks
-                    result.save()
+        save_marks(exam, marks)
 
         messages.success(request, f'Marks saved for {exam.course.name} – {exam.get_exam_type_display()}.')
-    return redirect(f"{reverse('teacher_upload_marks')}?exam={exam.id}")
+    return redirect(f"{reverse('teacher_upload_marks')}?term={exam.term}&exam={exam.id}")
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -408,7 +446,7 @@ def teacher_notices(request):
         Q(posted_by=request.user) | 
         Q(target_audience='ALL') | 
         Q(target_audience='FACULTY')
-    ).order_by('-created_at')
+    ).select_related('target_course').order_by('-created_at')
     return render(request, 'teacher/notices.html', {'notices': notices})
 
 
@@ -416,6 +454,7 @@ def teacher_notices(request):
 def teacher_post_notice(request):
     faculty = request.user.faculty
     courses = Course.objects.filter(faculty=faculty)
+    capabilities = get_capabilities(request)
 
     if request.method == 'POST':
         title = request.POST.get('title')
@@ -430,11 +469,8 @@ def teacher_post_notice(request):
             target_audience=target_audience,
             posted_by=request.user,
         )
-        if target_course_id:
-            try:
-                notice.target_course = Course.objects.get(id=target_course_id, faculty=faculty)
-            except Course.DoesNotExist:
-                pass
+        if capabilities.owns_course(target_course_id):
+            notice.target_course_id = int(target_course_id)
         if attachment:
             notice.attachment = attachment
         notice.save()
@@ -452,22 +488,18 @@ def teacher_post_notice(request):
 def teacher_view_students(request):
     faculty = request.user.faculty
     courses = Course.objects.filter(faculty=faculty)
+    capabilities = get_capabilities(request)
 
     selected_course_id = request.GET.get('course')
-    if selected_course_id:
-        try:
-            selected_course_id = int(selected_course_id)
-            course = Course.objects.get(id=selected_course_id, faculty=faculty)
-            students = course.students.select_related('user', 'department').all()
-        except (ValueError, Course.DoesNotExist):
-            selected_course_id = None
-            students = Student.objects.filter(
-                enrolled_courses__faculty=faculty
-            ).select_related('user', 'department').distinct()
+    if capabilities.owns_course(selected_course_id):
+        selected_course_id = int(selected_course_id)
+        students = Student.objects.filter(
+            enrolled_courses=selected_course_id
+        ).select_related('user', 'department')
     else:
         selected_course_id = None
         students = Student.objects.filter(
-            enrolled_courses__faculty=faculty
+            enrolled_courses__in=capabilities.course_ids
         ).select_related('user', 'department').distinct()
 
     context = {
@@ -479,76 +511,79 @@ def teacher_view_students(request):
 
 
 @faculty_required
-def teacher_student_profile(request, student_id):
-    faculty = request.user.faculty
-    student = get_object_or_404(Student, id=student_id)
-
-    # Attendance for courses taught by this faculty
-    faculty_courses = Course.objects.filter(faculty=faculty)
-    attendance_records = AttendanceRecord.objects.filter(
-        student=student,
-        attendance__course__in=faculty_courses
+async def teacher_student_profile(request, student_id):
+    student = await aget_object_or_404(Student.objects.select_related('user', 'department'), id=student_id)
+
+    # Attendance and results for courses taught by this faculty, run concurrently (core.concurrent)
+    faculty_courses = await sync_to_async(lambda: get_capabilities(request).course_ids)()
+    term = await sync_to_async(selected_term)(request)
+    records = AttendanceRecord.objects.filter(student=student, attendance__course_id__in=faculty_courses)
+    results = Result.objects.filter(student=student, exam__course_id__in=faculty_courses)
+    if term:
+        records = records.filter(attendance__term=term)
+        results = results.filter(exam__term=term)
+    data = await fan_out(
+        attendance=lambda: records.aggregate(total=Count('id'), present=Count('id', filter=Q(status=True))),
+        results=lambda: list(results.select_related('exam', 'exam__course').order_by('-exam__date')),
     )
-    total_classes = attendance_records.count()
-    present_count = attendance_records.filter(status=True).count()
+    total_classes = data['attendance']['total']
+    present_count = data['attendance']['present']
     attendance_pct = round(present_count / total_classes * 100, 1) if total_classes > 0 else 0
 
-    # Results for courses taught by this faculty
-    results = Result.objects.filter(
-        student=student,
-        exam__course__in=faculty_courses
-    ).select_related('exam', 'exam__course').order_by('-exam__date')
-
     context = {
         'student': student,
         'total_classes': total_classes,
         'present_count': present_count,
         'attendance_pct': attendance_pct,
-        'results': results,
+        'results': data['results'],
+        **await sync_to_async(term_context)(term),
     }
-    return render(request, 'teacher/student_profile.html', context)
+    return await sync_to_async(render)(request, 'teacher/student_profile.html', context)
 
 
 # ═══════════════════════════════════════════════════════════════════════════
 #  7. REPORTS
 # ═══════════════════════════════════════════════════════════════════════════
 @faculty_required
+@read_from_replica()
 def teacher_reports(request):
     faculty = request.user.faculty
-    courses = Course.objects.filter(faculty=faculty)
+    courses = list(Course.objects.filter(faculty=faculty))
 
     selected_course = None
     report_type = request.GET.get('report_type', 'performance')
     report_data = []
     summary = {}
     
+    term = selected_term(request)
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
 
     if request.GET.get('course'):
-        try:
-            selected_course = Course.objects.get(id=request.GET['course'], faculty=faculty)
-        except Course.DoesNotExist:
-            pass
+        selected_course = _pick(courses, request.GET['course'])
 
     if selected_course:
         enrolled = selected_course.students.select_related('user').all()
 
         if report_type == 'attendance':
-            # Attendance report
-            for student in enrolled:
-                records = AttendanceRecord.objects.filter(
-                    student=student,
-                    attendance__course=selected_course
+            # Attendance report, counted per student in one grouped query
+            records = AttendanceRecord.objects.filter(attendance__course=selected_course)
+            if term:
+                records = records.filter(attendance__term=term)
+            if start_date:
+                records = records.filter(attendance__date__gte=start_date)
+            if end_date:
+                records = records.filter(attendance__date__lte=end_date)
+            counts = {
+                row['student']: row
+                for row in records.values('student').annotate(
+                    total=Count('id'), present=Count('id', filter=Q(status=True))
                 )
-                
-                if start_date:
-                    records = records.filter(attendance__date__gte=start_date)
-                if end_date:
-                    records = records.filter(attendance__date__lte=end_date)
-                
-                total = records.count()
-                present = records.filter(status=True).count()
+            }
+
+            for student in enrolled:
+                total = counts.get(student.id, {}).get('total', 0)
+                present = counts.get(student.id, {}).get('present', 0)
                 absent = total - present
                 pct = round(present / total * 100, 1) if total > 0 else 0
                 report_data.append({
@@ -564,6 +599,8 @@ def teacher_reports(request):
             results = Result.objects.filter(
                 exam__course=selected_course
             ).select_related('student', 'student__user', 'exam')
+            if term:
+                results = results.filter(exam__term=term)
 
             all_marks = []
             passed_count = 0
@@ -601,6 +638,7 @@ def teacher_reports(request):
         'summary': summary,
         'start_date': start_date,
         'end_date': end_date,
+        **term_context(term),
     }
     return render(request, 'teacher/reports.html', context)
 
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fees', '0004_feepayment_collected_by_feepayment_payment_mode_and_more'),
+        ('students', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feepayment',
+            index=models.Index(fields=['status', 'payment_date'], name='feepay_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feepayment',
+            index=models.Index(fields=['student', 'status'], name='feepay_student_status_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+from core.terms import term_for_date
 
 class FeeStructure(models.Model):
     department = models.ForeignKey('departments.Department', on_delete=models.CASCADE)
@@ -22,6 +25,8 @@ class FeePayment(models.Model):
     student = models.ForeignKey('students.Student', on_delete=models.CASCADE)
     amount_paid = models.DecimalField(max_digits=10, decimal_places=2)
     payment_date = models.DateField(auto_now_add=True)
+    # Academic term of ``payment_date`` (core.terms), set on save
+    term = models.CharField(max_length=20, editable=False)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     payment_mode = models.CharField(max_length=20, choices=PaymentMode.choices, default=PaymentMode.CASH)
     receipt_no = models.CharField(max_length=50, unique=True, blank=True, null=True)
@@ -32,10 +37,22 @@ class FeePayment(models.Model):
         related_name='collected_payments'
     )
 
+    class Meta:
+        indexes = [
+            # Collection reports by date range, and a student's paid/pending totals
+            models.Index(fields=['status', 'payment_date'], name='feepay_status_date_idx'),
+            models.Index(fields=['student', 'status'], name='feepay_student_status_idx'),
+            # The same, within a term
+            models.Index(fields=['term', 'status', 'payment_date'], name='feepay_term_status_date_idx'),
+            models.Index(fields=['term', 'student', 'status'], name='feepay_term_student_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.receipt_no:
             import uuid
             self.receipt_no = f"RCP-{uuid.uuid4().hex[:8].upper()}"
+        # payment_date is only filled in by the insert itself
+        self.term = term_for_date(self.payment_date or timezone.localdate())
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -1,3 +1,42 @@
 from django.test import TestCase
 
-# Create your tests here.
+from core.tests.regression import QueryCountMixin
+
+
+class FeeViewQueryCountTests(QueryCountMixin, TestCase):
+    """Every route in fees/urls.py runs a flat number of queries."""
+
+    def get_cases(self):
+        uni = self.uni
+        admin, accountant = uni.admin, uni.accountant
+        cases = [
+            # Admin-facing
+            (admin, 'fee_structure_list', None, None, 5),
+            (admin, 'fee_structure_add', None, None, 5),
+            (admin, 'fee_structure_edit', {'pk': uni.fee_structure.pk}, None, 6),
+            (admin, 'fee_structure_delete', {'pk': uni.fee_structure.pk}, None, 6),
+            (admin, 'fee_payment_list', None, None, 5),
+            (admin, 'fee_payment_add', None, None, 5),
+            (admin, 'fee_receipt_download_admin', {'payment_id': uni.payment.pk}, None, 8),
+            # Accountant panel
+            (accountant, 'accountant_dashboard', None, None, 2),
+            # Reads the active term (UniversitySetting) on a cold cache
+            (accountant, 'accountant_dashboard_widget', {'name': 'totals'}, None, 5),
+            # The months before the active academic year also read the archive table
+            (accountant, 'accountant_dashboard_widget', {'name': 'revenue_chart'}, None, 5),
+            (accountant, 'accountant_dashboard_widget', {'name': 'recent_payments'}, None, 3),
+            (accountant, 'accountant_collect_fees', None, None, 4),
+            (accountant, 'accountant_collect_fees', None, {'q': 'ENR', 'student_id': uni.student.pk}, 8),
+            (accountant, 'accountant_payment_history', None, None, 5),
+            (accountant, 'accountant_payment_history', None, {'q': 'ENR'}, 5),
+            (accountant, 'accountant_receipt', {'payment_id': uni.payment.pk}, None, 5),
+            (accountant, 'accountant_reports', None, None, 4),
+            (accountant, 'accountant_notices', None, None, 5),
+            (accountant, 'accountant_post_notice', None, None, 4),
+            (accountant, 'accountant_profile', None, None, 4),
+        ]
+        for report_type in ('monthly', 'annual', 'department'):
+            params = {'report_type': report_type, 'year': uni.today.year, 'month': uni.today.month}
+            cases.append((accountant, 'accountant_reports', None, params, 6))
+            cases.append((accountant, 'accountant_reports_export', None, params, 6))
+        return cases
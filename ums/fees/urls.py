@@ -15,6 +15,7 @@ urlpatterns = [
     # ── Accountant Panel (6 pages) ─────────────────────
     # 1. Dashboard
     path('dashboard/', views.accountant_dashboard, name='accountant_dashboard'),
+    path('dashboard/widgets/<slug:name>/', views.accountant_dashboard_widget, name='accountant_dashboard_widget'),
 
     # 2. Collect Fees
     path('collect/', views.accountant_collect_fees, name='accountant_collect_fees'),
@@ -1,46 +1,48 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
+import csv
+import datetime
+
+from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Sum, Q, Count
+from django.db.models.functions import ExtractMonth
 from decimal import Decimal
 from django.http import HttpResponse
+from archive import history
+from archive.models import ArchivedFeePayment
+from core.cache_versions import cached
+from core.models import UniversitySetting
+from core.routers import read_from_replica
+from core.terms import active_term, selected_term, term_context
+from core.widgets import Widget, widget_view
 from core.utils import render_to_pdf
 import calendar
 
 from .models import FeeStructure, FeePayment
+from departments.models import Department
 from students.models import Student
 from notices.models import Notice
-
-
-# ── Helper ───────────────────────────────────────────────────────────────────
-def accountant_required(view_func):
-    """Decorator: user must be logged-in AND have ACCOUNTANT or ADMIN role."""
-    @login_required
-    def wrapper(request, *args, **kwargs):
-        if request.user.role not in ('ACCOUNTANT', 'ADMIN') and not request.user.is_superuser:
-            messages.error(request, 'Access denied. Accountant account required.')
-            return redirect('login')
-        return view_func(request, *args, **kwargs)
-    wrapper.__name__ = view_func.__name__
-    wrapper.__doc__ = view_func.__doc__
-    return wrapper
+from accounts.permissions import MANAGE_FEES, CapabilityRequiredMixin, accountant_required
 
 
 # ── Admin-facing CBVs (kept for backward compat) ───────────────────────────
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
-from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 
 
-class FeeStructureListView(LoginRequiredMixin, ListView):
+class FeeManagerMixin(CapabilityRequiredMixin):
+    required_capability = MANAGE_FEES
+
+
+class FeeStructureListView(FeeManagerMixin, ListView):
     model = FeeStructure
+    queryset = FeeStructure.objects.select_related('department')
     template_name = 'fees/fee_structure_list.html'
     context_object_name = 'structures'
     ordering = ['department', 'semester']
 
 
-class FeeStructureCreateView(LoginRequiredMixin, CreateView):
+class FeeStructureCreateView(FeeManagerMixin, CreateView):
     model = FeeStructure
     fields = ['department', 'semester', 'amount']
     template_name = 'fees/fee_structure_form.html'
@@ -51,7 +53,7 @@ class FeeStructureCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
-class FeeStructureUpdateView(LoginRequiredMixin, UpdateView):
+class FeeStructureUpdateView(FeeManagerMixin, UpdateView):
     model = FeeStructure
     fields = ['department', 'semester', 'amount']
     template_name = 'fees/fee_structure_form.html'
@@ -62,7 +64,7 @@ class FeeStructureUpdateView(LoginRequiredMixin, UpdateView):
         return super().form_valid(form)
 
 
-class FeeStructureDeleteView(LoginRequiredMixin, DeleteView):
+class FeeStructureDeleteView(FeeManagerMixin, DeleteView):
     model = FeeStructure
     template_name = 'fees/fee_structure_confirm_delete.html'
     success_url = reverse_lazy('fee_structure_list')
@@ -73,14 +75,14 @@ class FeeStructureDeleteView(LoginRequiredMixin, DeleteView):
 
 
 
-class FeePaymentListView(LoginRequiredMixin, ListView):
+class FeePaymentListView(FeeManagerMixin, ListView):
     model = FeePayment
     template_name = 'fees/payment_list.html'
     context_object_name = 'payments'
     ordering = ['-payment_date']
 
     def get_queryset(self):
-        qs = super().get_queryset()
+        qs = super().get_queryset().select_related('student', 'student__user')
         start_date = self.request.GET.get('start_date')
         end_date = self.request.GET.get('end_date')
 
@@ -98,12 +100,18 @@ class FeePaymentListView(LoginRequiredMixin, ListView):
         return context
 
 
-class FeePaymentCreateView(LoginRequiredMixin, CreateView):
+class FeePaymentCreateView(FeeManagerMixin, CreateView):
     model = FeePayment
     fields = ['student', 'amount_paid', 'status', 'payment_mode']
     template_name = 'fees/payment_form.html'
     success_url = reverse_lazy('fee_payment_list')
 
+    def get_form(self, form_class=None):
+        form = super().get_form(form_class)
+        # Student.__str__ reads the user, so load it with the choices
+        form.fields['student'].queryset = Student.objects.select_related('user')
+        return form
+
     def form_valid(self, form):
         messages.success(self.request, "Payment recorded successfully.")
         return super().form_valid(form)
@@ -114,32 +122,44 @@ class FeePaymentCreateView(LoginRequiredMixin, CreateView):
 # ═══════════════════════════════════════════════════════════════════════════
 @accountant_required
 def accountant_dashboard(request):
-    today = timezone.localdate()
+    # The figures and lists are widgets loaded by the page (ACCOUNTANT_WIDGETS)
+    return render(request, 'accountant/dashboard.html')
 
-    total_collected = FeePayment.objects.filter(status='PAID').aggregate(
-        Sum('amount_paid'))['amount_paid__sum'] or 0
 
-    total_pending = FeePayment.objects.filter(status='PENDING').aggregate(
-        Sum('amount_paid'))['amount_paid__sum'] or 0
+def _totals_widget(request):
+    today = timezone.localdate()
+    term = active_term()
+    # This month can belong to a closed, archived year once the next one is active
+    totals = history.merged_total(history.querysets_since(FeePayment, today.replace(day=1)), lambda qs: qs.aggregate(
+        collected=Sum('amount_paid', filter=Q(term=term, status='PAID')),
+        pending=Sum('amount_paid', filter=Q(term=term, status='PENDING')),
+        this_month=Sum('amount_paid', filter=Q(
+            status='PAID',
+            payment_date__year=today.year,
+            payment_date__month=today.month
+        )),
+    ))
+    return {
+        'total_collected': totals['collected'] or 0,
+        'total_pending': totals['pending'] or 0,
+        'this_month_collected': totals['this_month'] or 0,
+        'total_students': Student.objects.count(),
+        'term': term,
+    }
 
-    this_month_collected = FeePayment.objects.filter(
-        status='PAID',
-        payment_date__year=today.year,
-        payment_date__month=today.month
-    ).aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
 
-    total_students = Student.objects.count()
+def _revenue_chart_widget(request):
+    current_year = timezone.localdate().year
 
-    # Monthly revenue data (CSS bar chart)
-    current_year = today.year
+    # Monthly revenue data (CSS bar chart); the months before the academic year are archived
+    monthly_totals = _monthly_totals([
+        payments.filter(status='PAID', payment_date__year=current_year)
+        for payments in history.querysets_since(FeePayment, datetime.date(current_year, 1, 1))
+    ])
     monthly_data = []
     max_amount = 1  # avoid div by zero
     for m in range(1, 13):
-        amt = FeePayment.objects.filter(
-            status='PAID',
-            payment_date__year=current_year,
-            payment_date__month=m
-        ).aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
+        amt = monthly_totals.get(m, {}).get('amount') or 0
         monthly_data.append({
             'label': calendar.month_abbr[m],
             'amount': amt,
@@ -150,25 +170,39 @@ def accountant_dashboard(request):
     for item in monthly_data:
         item['height'] = round(float(item['amount']) / float(max_amount) * 100) if max_amount > 0 else 0
 
+    return {'current_year': current_year, 'monthly_data': monthly_data}
+
+
+def _recent_payments_widget(request):
     recent_payments = FeePayment.objects.select_related(
         'student', 'student__user'
     ).order_by('-payment_date')[:10]
+    return {'recent_payments': recent_payments}
 
-    context = {
-        'total_collected': total_collected,
-        'total_pending': total_pending,
-        'this_month_collected': this_month_collected,
-        'total_students': total_students,
-        'monthly_data': monthly_data,
-        'current_year': current_year,
-        'recent_payments': recent_payments,
-    }
-    return render(request, 'accountant/dashboard.html', context)
+
+# Every accountant sees the same figures: one cache entry per widget.
+ACCOUNTANT_WIDGETS = {
+    'totals': Widget('accountant/widgets/totals.html', _totals_widget,
+                     models=[FeePayment, ArchivedFeePayment, Student, UniversitySetting], shared=True),
+    'revenue_chart': Widget('accountant/widgets/revenue_chart.html', _revenue_chart_widget,
+                            models=[FeePayment, ArchivedFeePayment], shared=True),
+    'recent_payments': Widget('accountant/widgets/recent_payments.html', _recent_payments_widget,
+                              models=[FeePayment, Student], shared=True),
+}
+
+accountant_dashboard_widget = accountant_required(widget_view(ACCOUNTANT_WIDGETS))
 
 
 # ═══════════════════════════════════════════════════════════════════════════
 #  2. COLLECT FEES
 # ═══════════════════════════════════════════════════════════════════════════
+def _term_paid(student):
+    # Paid in the active term, as the student's own dues and fee status count it
+    return FeePayment.objects.filter(
+        term=active_term(), student=student, status='PAID'
+    ).aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
+
+
 @accountant_required
 def accountant_collect_fees(request):
     query = request.GET.get('q', '').strip()
@@ -195,9 +229,7 @@ def accountant_collect_fees(request):
                 semester=selected_student.semester
             )
             total_payable = fee_structures.aggregate(Sum('amount'))['amount__sum'] or 0
-            total_paid = FeePayment.objects.filter(
-                student=selected_student, status='PAID'
-            ).aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
+            total_paid = _term_paid(selected_student)
             fee_info = {
                 'total_payable': total_payable,
                 'total_paid': total_paid,
@@ -226,9 +258,7 @@ def accountant_collect_fees(request):
                     semester=student.semester
                 )
                 total_payable = fee_structures.aggregate(Sum('amount'))['amount__sum'] or 0
-                total_paid_so_far = FeePayment.objects.filter(
-                    student=student, status='PAID'
-                ).aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
+                total_paid_so_far = _term_paid(student)
                 
                 pending_dues = total_payable - total_paid_so_far
                 
@@ -262,9 +292,7 @@ def accountant_collect_fees(request):
                     semester=selected_student.semester
                 )
                 total_payable = fee_structures.aggregate(Sum('amount'))['amount__sum'] or 0
-                total_paid = FeePayment.objects.filter(
-                    student=selected_student, status='PAID'
-                ).aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
+                total_paid = _term_paid(selected_student)
                 fee_info = {
                     'total_payable': total_payable,
                     'total_paid': total_paid,
@@ -287,41 +315,40 @@ def accountant_collect_fees(request):
 # ═══════════════════════════════════════════════════════════════════════════
 @accountant_required
 def accountant_payment_history(request):
-    payments_qs = FeePayment.objects.select_related(
-        'student', 'student__user'
-    ).order_by('-payment_date')
-
     query = request.GET.get('q', '').strip()
+    term = selected_term(request)
     from_date = request.GET.get('from_date', '')
     to_date = request.GET.get('to_date', '')
 
-    if query:
-        payments_qs = payments_qs.filter(
-            Q(student__enrollment_no__icontains=query) |
-            Q(student__user__first_name__icontains=query) |
-            Q(student__user__last_name__icontains=query)
-        )
+    def filtered(payments_qs):
+        if query:
+            payments_qs = payments_qs.filter(
+                Q(student__enrollment_no__icontains=query) |
+                Q(student__user__first_name__icontains=query) |
+                Q(student__user__last_name__icontains=query)
+            )
+        if from_date:
+            payments_qs = payments_qs.filter(payment_date__gte=from_date)
+        if to_date:
+            payments_qs = payments_qs.filter(payment_date__lte=to_date)
+        return payments_qs.select_related('student', 'student__user').order_by('-payment_date')
 
-    if from_date:
-        payments_qs = payments_qs.filter(payment_date__gte=from_date)
-    if to_date:
-        payments_qs = payments_qs.filter(payment_date__lte=to_date)
+    # Hot payments, and archived ones for closed years (archive.history)
+    payments = history.rows(FeePayment, term, filtered, key=lambda p: p.payment_date, reverse=True, limit=100)
 
     context = {
-        'payments': payments_qs[:100],
+        'payments': payments,
         'query': query,
         'from_date': from_date,
         'to_date': to_date,
+        **term_context(term),
     }
     return render(request, 'accountant/payment_history.html', context)
 
 
 @accountant_required
 def accountant_receipt(request, payment_id):
-    payment = get_object_or_404(
-        FeePayment.objects.select_related('student', 'student__user', 'student__department', 'collected_by'),
-        id=payment_id
-    )
+    payment = history.get_payment('student', 'student__user', 'student__department', 'collected_by', id=payment_id)
     return render(request, 'accountant/receipt.html', {'payment': payment})
 
 
@@ -329,6 +356,7 @@ def accountant_receipt(request, payment_id):
 #  4. FINANCIAL REPORTS
 # ═══════════════════════════════════════════════════════════════════════════
 @accountant_required
+@read_from_replica()
 def accountant_reports(request):
     today = timezone.localdate()
     current_year = today.year
@@ -346,15 +374,14 @@ def accountant_reports(request):
     }
 
     if report_type:
-        data = _get_report_data(report_type, selected_year, selected_month, formatted=True)
+        data = _cached_report_data(report_type, selected_year, selected_month, formatted=True)
         context.update(data)
     
     return render(request, 'accountant/reports.html', context)
 
-import csv
-from django.http import HttpResponse
 
 @accountant_required
+@read_from_replica()
 def accountant_reports_export(request):
     today = timezone.localdate()
     current_year = today.year
@@ -363,7 +390,7 @@ def accountant_reports_export(request):
     selected_year = int(request.GET.get('year', current_year))
     selected_month = int(request.GET.get('month', today.month))
 
-    data = _get_report_data(report_type, selected_year, selected_month, formatted=False)
+    data = _cached_report_data(report_type, selected_year, selected_month, formatted=False)
     
     response = HttpResponse(content_type='text/csv')
     filename = f"{report_type}_report_{selected_year}_{selected_month}.csv"
@@ -384,6 +411,36 @@ def accountant_reports_export(request):
         
     return response
 
+def _monthly_totals(payment_querysets):
+    """
+    Sum / count the given payments per month, one grouped query per queryset
+    (hot and archived payments, see ``archive.history``).
+    Returns {month: {'amount', 'collected', 'pending', 'count'}}.
+    """
+    totals = {}
+    for payments in payment_querysets:
+        rows = payments.annotate(month=ExtractMonth('payment_date')).values('month').annotate(
+            amount=Sum('amount_paid'),
+            collected=Sum('amount_paid', filter=Q(status='PAID')),
+            pending=Sum('amount_paid', filter=Q(status='PENDING')),
+            count=Count('id'),
+        ).order_by()
+        for row in rows:
+            month = totals.setdefault(row['month'], {'amount': 0, 'collected': 0, 'pending': 0, 'count': 0})
+            for name in month:
+                month[name] += row[name] or 0
+    return totals
+
+
+def _cached_report_data(report_type, selected_year, selected_month, formatted=False):
+    """``_get_report_data``, cached until a payment, student or department changes."""
+    return cached(
+        'fee_report', [FeePayment, ArchivedFeePayment, Student, Department],
+        lambda: _get_report_data(report_type, selected_year, selected_month, formatted),
+        report_type, selected_year, selected_month, formatted,
+    )
+
+
 def _get_report_data(report_type, selected_year, selected_month, formatted=False):
     report_data = []
     report_headers = []
@@ -401,10 +458,14 @@ def _get_report_data(report_type, selected_year, selected_month, formatted=False
         report_title = f'Monthly Collection – {month_name} {selected_year}'
         report_headers = ['#', 'Date', 'Receipt #', 'Student', 'Mode', f'Amount{" (₹)" if formatted else ""}', 'Status']
 
-        payments = FeePayment.objects.filter(
-            payment_date__year=selected_year,
-            payment_date__month=selected_month
-        ).select_related('student', 'student__user').order_by('payment_date')
+        payments = history.merged_rows(
+            history.querysets_since(FeePayment, datetime.date(selected_year, selected_month, 1)),
+            lambda qs: qs.filter(
+                payment_date__year=selected_year,
+                payment_date__month=selected_month
+            ).select_related('student', 'student__user').order_by('payment_date'),
+            key=lambda p: p.payment_date,
+        )
 
         total = Decimal('0')
         for i, p in enumerate(payments, 1):
@@ -434,18 +495,15 @@ def _get_report_data(report_type, selected_year, selected_month, formatted=False
         grand_pending = Decimal('0')
         total_txns = 0
 
+        monthly_totals = _monthly_totals([
+            payments.filter(payment_date__year=selected_year)
+            for payments in history.querysets_since(FeePayment, datetime.date(selected_year, 1, 1))
+        ])
         for m in range(1, 13):
-            collected = FeePayment.objects.filter(
-                payment_date__year=selected_year, payment_date__month=m, status='PAID'
-            ).aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
-
-            pending = FeePayment.objects.filter(
-                payment_date__year=selected_year, payment_date__month=m, status='PENDING'
-            ).aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
-
-            txns = FeePayment.objects.filter(
-                payment_date__year=selected_year, payment_date__month=m
-            ).count()
+            month_totals = monthly_totals.get(m, {})
+            collected = month_totals.get('collected') or 0
+            pending = month_totals.get('pending') or 0
+            txns = month_totals.get('count', 0)
 
             report_data.append([
                 calendar.month_name[m],
@@ -468,25 +526,24 @@ def _get_report_data(report_type, selected_year, selected_month, formatted=False
         report_title = f'Department-wise Collection – {selected_year}'
         report_headers = ['Department', 'Students', f'Collected{" (₹)" if formatted else ""}', f'Pending{" (₹)" if formatted else ""}']
 
-        from departments.models import Department
-        departments = Department.objects.all()
+        departments = Department.objects.annotate(student_count=Count('student'))
+        dept_totals = {}
+        for payments in history.querysets_since(FeePayment, datetime.date(selected_year, 1, 1)):
+            for row in payments.filter(payment_date__year=selected_year).values('student__department').annotate(
+                collected=Sum('amount_paid', filter=Q(status='PAID')),
+                pending=Sum('amount_paid', filter=Q(status='PENDING')),
+            ).order_by():
+                dept = dept_totals.setdefault(row['student__department'], {'collected': 0, 'pending': 0})
+                dept['collected'] += row['collected'] or 0
+                dept['pending'] += row['pending'] or 0
         grand_collected = Decimal('0')
         grand_pending = Decimal('0')
         total_students = 0
 
         for dept in departments:
-            dept_students = Student.objects.filter(department=dept)
-            collected = FeePayment.objects.filter(
-                student__department=dept, status='PAID',
-                payment_date__year=selected_year
-            ).aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
-
-            pending = FeePayment.objects.filter(
-                student__department=dept, status='PENDING',
-                payment_date__year=selected_year
-            ).aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
-
-            student_count = dept_students.count()
+            collected = dept_totals.get(dept.id, {}).get('collected') or 0
+            pending = dept_totals.get(dept.id, {}).get('pending') or 0
+            student_count = dept.student_count
             report_data.append([
                 dept.name,
                 student_count,
@@ -520,7 +577,7 @@ def _get_report_data(report_type, selected_year, selected_month, formatted=False
 def accountant_notices(request):
     notices = Notice.objects.filter(
         Q(target_audience='ALL') | Q(posted_by=request.user)
-    ).distinct().order_by('-created_at')
+    ).select_related('posted_by').distinct().order_by('-created_at')
     return render(request, 'accountant/notices.html', {'notices': notices})
 
 
@@ -553,7 +610,7 @@ def download_receipt_admin(request, payment_id):
     Generate Fee Receipt PDF for Admin/Accountant.
     Reuses the student receipt template.
     """
-    payment = get_object_or_404(FeePayment, id=payment_id)
+    payment = history.get_payment('student', id=payment_id)
     student = payment.student
 
     context = {
@@ -15,5 +15,11 @@ class Notice(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     posted_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            # Notice boards: newest notices for an audience
+            models.Index(fields=['target_audience', '-created_at'], name='notice_audience_created_idx'),
+        ]
+
     def __str__(self):
         return self.title
@@ -1,16 +1,16 @@
 from django.views.generic import ListView, CreateView, DeleteView
-from django.contrib.auth.mixins import LoginRequiredMixin
+from accounts.permissions import CapabilityRequiredMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
 from .models import Notice
 
-class NoticeListView(LoginRequiredMixin, ListView):
+class NoticeListView(CapabilityRequiredMixin, ListView):
     model = Notice
     template_name = 'notices/notice_list.html'
     context_object_name = 'notices'
     ordering = ['-created_at']
 
-class NoticeCreateView(LoginRequiredMixin, CreateView):
+class NoticeCreateView(CapabilityRequiredMixin, CreateView):
     model = Notice
     fields = ['title', 'description', 'target_audience', 'attachment']
     template_name = 'notices/notice_form.html'
@@ -21,7 +21,7 @@ class NoticeCreateView(LoginRequiredMixin, CreateView):
         messages.success(self.request, "Notice posted successfully.")
         return super().form_valid(form)
 
-class NoticeDeleteView(LoginRequiredMixin, DeleteView):
+class NoticeDeleteView(CapabilityRequiredMixin, DeleteView):
     model = Notice
     template_name = 'notices/notice_confirm_delete.html'
     success_url = reverse_lazy('notice_list')
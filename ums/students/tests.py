@@ -1,3 +1,120 @@
-from django.test import TestCase
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from core.tests.regression import QueryCountMixin, SeededUniversity, reset_caches
+from examinations.models import Result
+from notices.models import Notice
+
+
+class StudentViewQueryCountTests(QueryCountMixin, TestCase):
+    """Every route in students/urls.py runs a flat number of queries."""
+
+    def get_cases(self):
+        uni = self.uni
+        admin, student = uni.admin, uni.student.user
+        return [
+            # Admin-facing
+            (admin, 'student_list', None, None, 6),
+            (admin, 'student_list', None, {'department': uni.department.pk, 'semester': 1, 'q': 'ENR'}, 6),
+            # The active term (UniversitySetting, cold cache); every term adds the archive tables
+            (admin, 'student_detail', {'pk': uni.student.pk}, None, 10),
+            (admin, 'student_detail', {'pk': uni.student.pk}, {'term': 'all'}, 15),
+            (admin, 'add_student', None, None, 5),
+            (admin, 'edit_student', {'pk': uni.student.pk}, None, 7),
+            (admin, 'delete_student', {'pk': uni.student.pk}, None, 6),
+            (admin, 'promote_students', None, {'department': uni.department.pk, 'semester': 1}, 6),
+            # Student panel
+            (student, 'student_dashboard', None, None, 2),
+            (student, 'student_dashboard_widget', {'name': 'enrolled'}, None, 3),
+            # Term-scoped widgets read the active term (UniversitySetting) on a cold cache
+            (student, 'student_dashboard_widget', {'name': 'attendance'}, None, 4),
+            (student, 'student_dashboard_widget', {'name': 'dues'}, None, 5),
+            (student, 'student_dashboard_widget', {'name': 'exams'}, None, 3),
+            (student, 'student_dashboard_widget', {'name': 'courses'}, None, 3),
+            (student, 'student_dashboard_widget', {'name': 'upcoming_exams'}, None, 3),
+            (student, 'student_dashboard_widget', {'name': 'recent_results'}, None, 4),
+            (student, 'student_my_courses', None, None, 5),
+            (student, 'student_course_detail', {'course_id': uni.course.pk}, None, 9),
+            (student, 'student_my_attendance', None, None, 7),
+            (student, 'student_my_attendance', None, {'course': uni.course.pk}, 7),
+            (student, 'student_timetable', None, None, 5),
+            (student, 'student_my_results', None, None, 6),
+            (student, 'student_fee_status', None, None, 8),
+            (student, 'student_notices', None, None, 5),
+            (student, 'student_profile', None, None, 4),
+            (student, 'download_results_pdf', None, None, 5),
+            (student, 'download_id_card_pdf', None, None, 4),
+            (student, 'download_receipt_pdf', {'payment_id': uni.payment.pk}, None, 5),
+        ]
+
+
+@override_settings(CACHE_SHARED=True)
+class ConditionalGetTests(TestCase):
+    """Student pages answer 304 until the data behind them changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.uni = SeededUniversity(departments=1, courses_per_department=1, students_per_department=2)
+
+    def setUp(self):
+        reset_caches()
+        self.addCleanup(reset_caches)
+        self.client.force_login(self.uni.student.user)
+        # A browser already has the CSRF cookie from the login page.
+        self.get('student_profile')
+
+    def get(self, url_name, etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(reverse(url_name), headers=headers)
+
+    def test_unchanged_page_returns_304_without_running_the_view(self):
+        for url_name in ('student_my_results', 'student_fee_status', 'student_notices', 'student_timetable'):
+            with self.subTest(url_name=url_name):
+                first = self.get(url_name)
+                self.assertEqual(first.status_code, 200)
+                self.assertIn('private', first['Cache-Control'])
+                with CaptureQueriesContext(connections['default']) as ctx:
+                    second = self.get(url_name, first['ETag'])
+                self.assertEqual(second.status_code, 304)
+                # Session and user (with profile) only
+                self.assertEqual(len(ctx.captured_queries), 2)
+
+    def test_no_etag_without_a_shared_cache(self):
+        # Other workers would not see a write's bump and keep answering 304
+        with override_settings(CACHE_SHARED=False):
+            response = self.get('student_my_results')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+    def test_data_change_changes_the_etag(self):
+        etag = self.get('student_my_results')['ETag']
+        result = Result.objects.filter(student=self.uni.student).first()
+        result.marks_obtained += 1
+        result.save()
+        self.assertEqual(self.get('student_my_results', etag).status_code, 200)
+
+        etag = self.get('student_notices')['ETag']
+        Notice.objects.create(title='Result day', description='Results are out',
+                              target_audience='STUDENT', posted_by=self.uni.admin)
+        self.assertEqual(self.get('student_notices', etag).status_code, 200)
+
+        etag = self.get('student_timetable')['ETag']
+        self.uni.course.students.remove(self.uni.student)
+        self.assertEqual(self.get('student_timetable', etag).status_code, 200)
+
+    def test_etag_is_per_user(self):
+        etag = self.get('student_fee_status')['ETag']
+        self.client.force_login(self.uni.students[1].user)
+        self.assertEqual(self.get('student_fee_status', etag).status_code, 200)
+
+    def test_no_etag_while_messages_are_pending(self):
+        etag = self.get('student_notices')['ETag']
+        self.client.post(reverse('student_profile'), {'first_name': 'Renamed'})
+        response = self.get('student_notices', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertContains(response, 'Profile updated successfully.')
+        # The new name is part of the ETag as well
+        self.assertNotEqual(self.get('student_notices')['ETag'], etag)
@@ -22,6 +22,7 @@ urlpatterns = [
 
     # 1. Dashboard
     path('dashboard/', views.student_dashboard, name='student_dashboard'),
+    path('dashboard/widgets/<slug:name>/', views.student_dashboard_widget, name='student_dashboard_widget'),
 
     # 2. My Courses
     path('courses/', views.student_my_courses, name='student_my_courses'),
@@ -1,17 +1,24 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
 from django.urls import reverse
 from django.http import HttpResponse
+from archive import history
+from core.concurrent import fan_out
+from core.conditional import versioned_etag
+from core.models import UniversitySetting
+from core.terms import active_term, selected_term, term_context
+from core.widgets import Widget, widget_view
 from core.utils import render_to_pdf, log_activity
 from django.contrib.admin.models import ADDITION
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Sum, Q
+from django.db.models import Sum, Q, Count
 from decimal import Decimal
 
 from .models import Student
 from departments.models import Department
 from accounts.models import CustomUser
+from accounts.permissions import admin_required, get_capabilities, student_required
 from courses.models import Course
 from attendance.models import Attendance, AttendanceRecord
 from examinations.models import Exam, Result
@@ -23,22 +30,8 @@ import random
 import string
 
 
-# ── Helper ───────────────────────────────────────────────────────────────────
-def student_required(view_func):
-    """Decorator: user must be logged-in AND be a Student."""
-    @login_required
-    def wrapper(request, *args, **kwargs):
-        if not hasattr(request.user, 'student'):
-            messages.error(request, 'Access denied. Student account required.')
-            return redirect('login')
-        return view_func(request, *args, **kwargs)
-    wrapper.__name__ = view_func.__name__
-    wrapper.__doc__ = view_func.__doc__
-    return wrapper
-
-
 # ── Admin-facing views (unchanged) ──────────────────────────────────────────
-@login_required
+@admin_required
 def student_list(request):
     dept_id = request.GET.get('department')
     semester = request.GET.get('semester')
@@ -68,44 +61,62 @@ def student_list(request):
     })
 
 
-@login_required
-def student_detail(request, pk):
-    student = get_object_or_404(Student, pk=pk)
+@admin_required
+async def student_detail(request, pk):
+    student = await aget_object_or_404(Student.objects.select_related('user', 'department'), pk=pk)
+    # The active term by default; the archive is read only for closed years (archive.history)
+    term = await sync_to_async(selected_term)(request)
+
+    # Independent queries, run concurrently (core.concurrent)
+    data = await fan_out(
+        attendance=lambda: history.total(AttendanceRecord, term, lambda qs: qs.filter(student=student).aggregate(
+            total=Count('id'), present=Count('id', filter=Q(status=True)),
+        )),
+        recent_attendance=lambda: history.rows(  # Recent 50
+            AttendanceRecord, term,
+            lambda qs: qs.filter(student=student).select_related(
+                'attendance', 'attendance__course').order_by('-attendance__date'),
+            key=lambda r: r.attendance.date, reverse=True, limit=50,
+        ),
+        results=lambda: history.rows(
+            Result, term, lambda qs: qs.filter(student=student).select_related('exam', 'exam__course'),
+        ),
+        payments=lambda: history.rows(
+            FeePayment, term, lambda qs: qs.filter(student=student).order_by('-payment_date'),
+            key=lambda p: p.payment_date, reverse=True,
+        ),
+        total_payable=lambda: FeeStructure.objects.filter(
+            department=student.department_id, semester=student.semester
+        ).aggregate(Sum('amount'))['amount__sum'] or 0,
+    )
 
-    attendance_records = AttendanceRecord.objects.filter(student=student)
-    total_attendance = attendance_records.count()
-    present_attendance = attendance_records.filter(status=True).count()
+    total_attendance = data['attendance']['total']
+    present_attendance = data['attendance']['present']
     attendance_percentage = (present_attendance / total_attendance * 100) if total_attendance > 0 else 0
 
-    results = Result.objects.filter(student=student).select_related('exam', 'exam__course')
-    
     # Fees
-    payments = FeePayment.objects.filter(student=student).order_by('-payment_date')
-
-    try:
-        fee_structures = FeeStructure.objects.filter(department=student.department, semester=student.semester)
-        total_payable = fee_structures.aggregate(Sum('amount'))['amount__sum'] or 0
-        total_paid = payments.filter(status='PAID').aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
-        pending_dues = total_payable - total_paid
-    except Exception:
-        total_payable = total_paid = pending_dues = 0
+    payments = data['payments']
+    total_payable = data['total_payable']
+    total_paid = sum((p.amount_paid for p in payments if p.status == 'PAID'), Decimal('0'))
+    pending_dues = total_payable - total_paid
 
     context = {
         'student': student,
         'attendance_percentage': round(attendance_percentage, 2),
         'total_attendance': total_attendance,
         'present_attendance': present_attendance,
-        'attendance_records': attendance_records.select_related('attendance', 'attendance__course').order_by('-attendance__date')[:50], # Recent 50
-        'results': results,
+        'attendance_records': data['recent_attendance'],
+        'results': data['results'],
         'payments': payments,
         'total_payable': total_payable,
         'total_paid': total_paid,
         'pending_dues': pending_dues,
+        **await sync_to_async(term_context)(term),
     }
-    return render(request, 'students/student_detail.html', context)
+    return await sync_to_async(render)(request, 'students/student_detail.html', context)
 
 
-@login_required
+@admin_required
 def add_student(request):
     if request.method == 'POST':
         first_name = request.POST.get('first_name')
@@ -156,7 +167,7 @@ def add_student(request):
     return render(request, 'students/add_student.html', {'departments': departments})
 
 
-@login_required
+@admin_required
 def edit_student(request, pk):
     student = get_object_or_404(Student, pk=pk)
     user = student.user
@@ -183,7 +194,7 @@ def edit_student(request, pk):
     return render(request, 'students/edit_student.html', {'student': student, 'departments': departments})
 
 
-@login_required
+@admin_required
 def delete_student(request, pk):
     student = get_object_or_404(Student, pk=pk)
     if request.method == 'POST':
@@ -194,7 +205,7 @@ def delete_student(request, pk):
     return render(request, 'students/student_confirm_delete.html', {'student': student})
 
 
-@login_required
+@admin_required
 def promote_students(request):
     """
     View for promoting students to the next semester.
@@ -259,50 +270,78 @@ def promote_students(request):
 # ═══════════════════════════════════════════════════════════════════════════
 @student_required
 def student_dashboard(request):
-    student = request.user.student
-    courses = Course.objects.filter(students=student).select_related('department', 'faculty', 'faculty__user')
-    enrolled_count = courses.count()
+    # The figures and lists are widgets loaded by the page (STUDENT_WIDGETS)
+    return render(request, 'student/dashboard.html', {'student': request.role_profile})
 
-    # Attendance
-    att_records = AttendanceRecord.objects.filter(student=student)
-    total_att = att_records.count()
-    present_att = att_records.filter(status=True).count()
-    attendance_percentage = round(present_att / total_att * 100, 1) if total_att > 0 else 0
 
-    # Fee Status
-    try:
-        fee_structures = FeeStructure.objects.filter(department=student.department, semester=student.semester)
-        total_payable = fee_structures.aggregate(Sum('amount'))['amount__sum'] or 0
-        total_paid = FeePayment.objects.filter(student=student, status='PAID').aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
-        pending_dues = total_payable - total_paid
-    except Exception:
-        total_payable = total_paid = 0
-        pending_dues = 0
-
-    # Upcoming exams
-    today = timezone.localdate()
-    upcoming_exams = Exam.objects.filter(
-        course__in=courses,
-        date__gte=today
-    ).select_related('course').order_by('date')[:5]
-    upcoming_exams_count = Exam.objects.filter(course__in=courses, date__gte=today).count()
-
-    # Recent results
+def _student_courses(student):
+    return Course.objects.filter(students=student)
+
+
+def _enrolled_widget(request):
+    return {'enrolled_count': _student_courses(request.role_profile).count()}
+
+
+def _attendance_widget(request):
+    totals = AttendanceRecord.objects.filter(
+        student=request.role_profile, attendance__term=active_term()
+    ).aggregate(
+        total=Count('id'), present=Count('id', filter=Q(status=True)),
+    )
+    total_att = totals['total']
+    attendance_percentage = round(totals['present'] / total_att * 100, 1) if total_att > 0 else 0
+    return {'attendance_percentage': attendance_percentage}
+
+
+def _dues_widget(request):
+    student = request.role_profile
+    fee_structures = FeeStructure.objects.filter(department=student.department_id, semester=student.semester)
+    total_payable = fee_structures.aggregate(Sum('amount'))['amount__sum'] or 0
+    total_paid = FeePayment.objects.filter(
+        term=active_term(), student=student, status='PAID'
+    ).aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
+    return {'pending_dues': total_payable - total_paid}
+
+
+def _upcoming_exams(student):
+    return Exam.objects.filter(course__in=_student_courses(student), date__gte=timezone.localdate())
+
+
+def _exams_widget(request):
+    return {'upcoming_exams_count': _upcoming_exams(request.role_profile).count()}
+
+
+def _courses_widget(request):
+    return {'courses': _student_courses(request.role_profile)[:6]}
+
+
+def _upcoming_exams_widget(request):
+    return {'upcoming_exams': _upcoming_exams(request.role_profile).select_related('course').order_by('date')[:5]}
+
+
+def _recent_results_widget(request):
     recent_results = Result.objects.filter(
-        student=student
+        student=request.role_profile, exam__term=active_term()
     ).select_related('exam', 'exam__course').order_by('-exam__date')[:5]
+    return {'recent_results': recent_results}
 
-    context = {
-        'student': student,
-        'courses': courses[:6],
-        'enrolled_count': enrolled_count,
-        'attendance_percentage': attendance_percentage,
-        'pending_dues': pending_dues,
-        'upcoming_exams': upcoming_exams,
-        'upcoming_exams_count': upcoming_exams_count,
-        'recent_results': recent_results,
-    }
-    return render(request, 'student/dashboard.html', context)
+
+# Enrolment changes bump the Student generation (core.cache_versions), and
+# switching the active term the UniversitySetting one.
+STUDENT_WIDGETS = {
+    'enrolled': Widget('student/widgets/enrolled.html', _enrolled_widget, models=[Student, Course]),
+    'attendance': Widget('student/widgets/attendance.html', _attendance_widget,
+                         models=[AttendanceRecord, UniversitySetting]),
+    'dues': Widget('student/widgets/dues.html', _dues_widget,
+                   models=[Student, FeeStructure, FeePayment, UniversitySetting]),
+    'exams': Widget('student/widgets/exams.html', _exams_widget, models=[Student, Course, Exam]),
+    'courses': Widget('student/widgets/courses.html', _courses_widget, models=[Student, Course]),
+    'upcoming_exams': Widget('student/widgets/upcoming_exams.html', _upcoming_exams_widget, models=[Student, Course, Exam]),
+    'recent_results': Widget('student/widgets/recent_results.html', _recent_results_widget,
+                             models=[Result, Exam, Course, UniversitySetting]),
+}
+
+student_dashboard_widget = student_required(widget_view(STUDENT_WIDGETS))
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -311,16 +350,21 @@ def student_dashboard(request):
 @student_required
 def student_my_courses(request):
     student = request.user.student
-    courses = Course.objects.filter(students=student).select_related(
-        'department', 'faculty', 'faculty__user'
-    )
+    # Annotate before filtering so the count isn't limited to this student
+    courses = Course.objects.annotate(
+        num_students=Count('students', distinct=True)
+    ).filter(students=student).select_related('department', 'faculty', 'faculty__user')
     return render(request, 'student/my_courses.html', {'courses': courses})
 
 
 @student_required
 def student_course_detail(request, course_id):
     student = request.user.student
-    course = get_object_or_404(Course, id=course_id, students=student)
+    course = get_object_or_404(
+        Course.objects.annotate(num_students=Count('students', distinct=True))
+        .select_related('department', 'faculty', 'faculty__user'),
+        id=course_id, students=student
+    )
 
     # Attendance for this course
     att_records = AttendanceRecord.objects.filter(
@@ -358,34 +402,43 @@ def student_my_attendance(request):
     courses = Course.objects.filter(students=student)
 
     # Filters
+    term = selected_term(request)
     selected_course_id = request.GET.get('course')
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
 
-    records_qs = AttendanceRecord.objects.filter(
-        student=student
-    ).select_related('attendance', 'attendance__course').order_by('-attendance__date')
-
     if selected_course_id:
         try:
             selected_course_id = int(selected_course_id)
-            records_qs = records_qs.filter(attendance__course_id=selected_course_id)
         except ValueError:
             selected_course_id = None
 
-    if start_date:
-        records_qs = records_qs.filter(attendance__date__gte=start_date)
-    if end_date:
-        records_qs = records_qs.filter(attendance__date__lte=end_date)
-
-    records = list(records_qs)
-
-    # Course-wise attendance summary
+    def filtered(records_qs):
+        records_qs = records_qs.filter(student=student)
+        if selected_course_id:
+            records_qs = records_qs.filter(attendance__course_id=selected_course_id)
+        if start_date:
+            records_qs = records_qs.filter(attendance__date__gte=start_date)
+        if end_date:
+            records_qs = records_qs.filter(attendance__date__lte=end_date)
+        return records_qs.select_related('attendance', 'attendance__course').order_by('-attendance__date')
+
+    # Hot records, and archived ones for closed years (archive.history)
+    records = history.rows(AttendanceRecord, term, filtered, key=lambda r: r.attendance.date, reverse=True)
+
+    # Course-wise attendance summary, one grouped query for all courses (per table)
+    course_counts = {}
+    for records_qs in history.querysets(AttendanceRecord, term):
+        for row in (records_qs.filter(student=student).values('attendance__course')
+                    .annotate(total=Count('id'), present=Count('id', filter=Q(status=True)))):
+            counts = course_counts.setdefault(row['attendance__course'], {'total': 0, 'present': 0})
+            counts['total'] += row['total']
+            counts['present'] += row['present']
     course_summary = []
     for course in courses:
-        c_records = AttendanceRecord.objects.filter(student=student, attendance__course=course)
-        total = c_records.count()
-        present = c_records.filter(status=True).count()
+        counts = course_counts.get(course.id, {})
+        total = counts.get('total', 0)
+        present = counts.get('present', 0)
         absent = total - present
         pct = round(present / total * 100, 1) if total > 0 else 0
         course_summary.append({
@@ -404,6 +457,7 @@ def student_my_attendance(request):
         'selected_course_id': selected_course_id,
         'start_date': start_date,
         'end_date': end_date,
+        **term_context(term),
     }
     return render(request, 'student/my_attendance.html', context)
 
@@ -414,29 +468,32 @@ from core.utils import render_to_pdf
 #  4. MY RESULTS
 # ═══════════════════════════════════════════════════════════════════════════
 @student_required
+@versioned_etag(Result, Exam, Course, Student)
 def student_my_results(request):
     student = request.user.student
     courses = Course.objects.filter(students=student)
 
-    results_qs = Result.objects.filter(
-        student=student
-    ).select_related('exam', 'exam__course').order_by('-exam__date')
-
     # Filters
+    term = selected_term(request)
     selected_course_id = request.GET.get('course')
     selected_exam_type = request.GET.get('exam_type')
 
     if selected_course_id:
         try:
             selected_course_id = int(selected_course_id)
-            results_qs = results_qs.filter(exam__course_id=selected_course_id)
         except ValueError:
             selected_course_id = None
 
-    if selected_exam_type:
-        results_qs = results_qs.filter(exam__exam_type=selected_exam_type)
+    def filtered(results_qs):
+        results_qs = results_qs.filter(student=student)
+        if selected_course_id:
+            results_qs = results_qs.filter(exam__course_id=selected_course_id)
+        if selected_exam_type:
+            results_qs = results_qs.filter(exam__exam_type=selected_exam_type)
+        return results_qs.select_related('exam', 'exam__course').order_by('-exam__date')
 
-    results = list(results_qs)
+    # Hot results, and archived ones for closed years (archive.history)
+    results = history.rows(Result, term, filtered, key=lambda r: r.exam.date, reverse=True)
 
     # Summary
     summary = {}
@@ -458,6 +515,7 @@ def student_my_results(request):
         'summary': summary,
         'selected_course_id': selected_course_id,
         'selected_exam_type': selected_exam_type or '',
+        **term_context(term),
     }
     return render(request, 'student/my_results.html', context)
 
@@ -468,11 +526,14 @@ def download_results_pdf(request):
     Generate PDF of student transcript.
     """
     student = request.user.student
-    
-    # Fetch all results ordered by date
-    results = Result.objects.filter(student=student).select_related(
-        'exam', 'exam__course', 'exam__course__department'
-    ).order_by('exam__date')
+
+    # Every term unless ?term= asks for one; closed years come from the archive
+    term = selected_term(request) if 'term' in request.GET else None
+    results = history.rows(
+        Result, term,
+        lambda qs: qs.filter(student=student).select_related('exam', 'exam__course', 'exam__course__department'),
+        key=lambda r: r.exam.date,
+    )
     
     # Calculate Summary
     total_marks_obtained = 0
@@ -540,8 +601,8 @@ def download_receipt_pdf(request, payment_id):
     Generate Fee Receipt PDF for Student.
     """
     student = request.user.student
-    # Ensure the payment belongs to the logged-in student
-    payment = get_object_or_404(FeePayment, id=payment_id, student=student)
+    # Ensure the payment belongs to the logged-in student; it may have been archived
+    payment = history.get_payment(id=payment_id, student=student)
 
     context = {
         'payment': payment,
@@ -563,6 +624,7 @@ def download_receipt_pdf(request, payment_id):
 #  5. FEE STATUS
 # ═══════════════════════════════════════════════════════════════════════════
 @student_required
+@versioned_etag(FeePayment, FeeStructure, Student)
 def student_fee_status(request):
     student = request.user.student
 
@@ -571,8 +633,13 @@ def student_fee_status(request):
     ).select_related('department')
     total_payable = fee_structures.aggregate(Sum('amount'))['amount__sum'] or 0
 
-    payments = FeePayment.objects.filter(student=student).order_by('-payment_date')
-    total_paid = payments.filter(status='PAID').aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
+    # Paid within the selected term, against this semester's fees
+    term = selected_term(request)
+    payments = history.rows(
+        FeePayment, term, lambda qs: qs.filter(student=student).order_by('-payment_date'),
+        key=lambda p: p.payment_date, reverse=True,
+    )
+    total_paid = sum((p.amount_paid for p in payments if p.status == 'PAID'), Decimal('0'))
     pending_dues = total_payable - total_paid
 
     context = {
@@ -581,6 +648,7 @@ def student_fee_status(request):
         'total_payable': total_payable,
         'total_paid': total_paid,
         'pending_dues': pending_dues,
+        **term_context(term),
     }
     return render(request, 'student/fee_status.html', context)
 
@@ -589,18 +657,16 @@ def student_fee_status(request):
 #  6. NOTICES
 # ═══════════════════════════════════════════════════════════════════════════
 @student_required
+@versioned_etag(Notice, Course, Student)
 def student_notices(request):
-    student = request.user.student
-    enrolled_courses = Course.objects.filter(students=student)
-
     filter_type = request.GET.get('type', 'all')
 
     # Notices targeted at ALL or STUDENT, plus course-specific notices for
     # courses this student is enrolled in
     notices_qs = Notice.objects.filter(
         Q(target_audience__in=['ALL', 'STUDENT']) |
-        Q(target_course__in=enrolled_courses)
-    ).distinct().order_by('-created_at')
+        Q(target_course_id__in=get_capabilities(request).course_ids)
+    ).select_related('posted_by', 'target_course').order_by('-created_at')
 
     if filter_type == 'general':
         notices_qs = notices_qs.filter(target_course__isnull=True)
@@ -615,6 +681,7 @@ def student_notices(request):
 
 
 @student_required
+@versioned_etag(Timetable, Course, Student)
 def student_timetable(request):
     student = request.user.student
     courses = Course.objects.filter(students=student)
@@ -1,5 +1,5 @@
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
-from django.contrib.auth.mixins import LoginRequiredMixin
+from accounts.permissions import CapabilityRequiredMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
 from .models import Timetable
@@ -8,7 +8,7 @@ from departments.models import Department
 from faculty.models import Faculty
 from .forms import TimetableForm
 
-class TimetableListView(LoginRequiredMixin, ListView):
+class TimetableListView(CapabilityRequiredMixin, ListView):
     model = Timetable
     template_name = 'timetable/timetable_list.html'
     context_object_name = 'timetables'
@@ -44,7 +44,7 @@ class TimetableListView(LoginRequiredMixin, ListView):
         
         return context
 
-class TimetableCreateView(LoginRequiredMixin, CreateView):
+class TimetableCreateView(CapabilityRequiredMixin, CreateView):
     model = Timetable
     form_class = TimetableForm
     template_name = 'timetable/timetable_form.html'
@@ -54,7 +54,7 @@ class TimetableCreateView(LoginRequiredMixin, CreateView):
         messages.success(self.request, "Timetable entry created successfully.")
         return super().form_valid(form)
 
-class TimetableUpdateView(LoginRequiredMixin, UpdateView):
+class TimetableUpdateView(CapabilityRequiredMixin, UpdateView):
     model = Timetable
     form_class = TimetableForm
     template_name = 'timetable/timetable_form.html'
@@ -68,7 +68,7 @@ class TimetableUpdateView(LoginRequiredMixin, UpdateView):
         messages.success(self.request, "Timetable entry updated successfully.")
         return super().form_valid(form)
 
-class TimetableDeleteView(LoginRequiredMixin, DeleteView):
+class TimetableDeleteView(CapabilityRequiredMixin, DeleteView):
     model = Timetable
     template_name = 'timetable/timetable_confirm_delete.html'
     success_url = reverse_lazy('timetable_list')
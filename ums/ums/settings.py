@@ -14,6 +14,7 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 load_dotenv()
 
@@ -61,39 +62,69 @@ INSTALLED_APPS = [
     'timetable',
     'core',
     'notices',
+    'archive',
 ]
 
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
+AUTHENTICATION_BACKENDS = [
+    # Loads the user with its Student/Faculty profile in one query.
+    'accounts.backends.RoleProfileBackend',
+    # Kept so that sessions created before the backend above keep working.
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.QueryProfilerMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.RoleProfileMiddleware',
+    'core.middleware.CProfileMiddleware',
+    'core.middleware.MemoryProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Last, so that its view span starts right before the view.
+    'core.middleware.TracingMiddleware',
 ]
 
 ROOT_URLCONF = 'ums.urls'
 
+# Templates are compiled once per process and kept by the cached loader.
+# With DEBUG on (or TEMPLATE_CACHE=False) they are re-read on every render so
+# that edits show up without a restart.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if os.environ.get('TEMPLATE_CACHE', str(not DEBUG)) == 'True':
+    TEMPLATE_LOADERS = [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Stock Django backend, plus render timing for the query profiler.
+        'BACKEND': 'core.profiling.ProfilingDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.university',
+                'core.context_processors.fragment_cache',
             ],
+            'loaders': TEMPLATE_LOADERS,
         },
     },
 ]
 
 WSGI_APPLICATION = 'ums.wsgi.application'
+# The detail pages are async views: serve them with an ASGI server, e.g.
+#   uvicorn ums.asgi:application --workers 4
+ASGI_APPLICATION = 'ums.asgi.application'
 
 
 # Database
@@ -102,9 +133,168 @@ WSGI_APPLICATION = 'ums.wsgi.application'
 DATABASES = {
     'default': dj_database_url.config(
         default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
-        conn_max_age=600
+        conn_max_age=600,
+        conn_health_checks=True,
+    )
+}
+
+# ── Read replica ────────────────────────────────────────────────────────────
+# REPLICA_DATABASE_URL adds a read-only 'replica' alias.  Reports, exports and
+# the admin dashboard read from it (core.routers.read_from_replica); all
+# writes and every other read stay on the primary.  A copy of the SQLite
+# file is enough to try it locally:
+#   sqlite3 db.sqlite3 ".backup replica.sqlite3"
+#   REPLICA_DATABASE_URL=sqlite:///replica.sqlite3
+REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL', '')
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        REPLICA_DATABASE_URL, conn_max_age=600, conn_health_checks=True,
     )
+    # Tests run against the primary's test database.
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Values cached from replica reads may predate the write that invalidated them.
+REPLICA_CACHE_TIMEOUT = int(os.environ.get('REPLICA_CACHE_TIMEOUT', '60'))
+
+# ── PostgreSQL: native connection pool (production) ─────────────────────────
+# DATABASE_POOL=True gives each process a pool of open connections (psycopg 3
+# with psycopg_pool) instead of one persistent connection per thread.  The
+# pool checks each connection before lending it (CONN_HEALTH_CHECKS), and it
+# replaces connections older than max_lifetime or idle longer than max_idle.
+DATABASE_POOL = os.environ.get('DATABASE_POOL', 'False') == 'True'
+DATABASE_POOL_OPTIONS = {
+    'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', '2')),
+    'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', '10')),
+    'timeout': float(os.environ.get('DATABASE_POOL_TIMEOUT', '10')),  # seconds waiting for a free connection
+    'max_lifetime': float(os.environ.get('DATABASE_POOL_MAX_LIFETIME', '1800')),
+    'max_idle': float(os.environ.get('DATABASE_POOL_MAX_IDLE', '300')),
+}
+if DATABASE_POOL:
+    for _db in DATABASES.values():
+        if 'postgresql' not in _db['ENGINE']:
+            raise ImproperlyConfigured('DATABASE_POOL needs PostgreSQL database URLs.')
+        _db['CONN_MAX_AGE'] = 0  # the pool keeps connections instead
+        _db.setdefault('OPTIONS', {})['pool'] = dict(DATABASE_POOL_OPTIONS)
+
+# ── SQLite: WAL journal and pragmas ─────────────────────────────────────────
+# Applied to every new connection.  In WAL mode, readers and the single
+# writer do not block each other.  IMMEDIATE transactions take the write lock
+# up front. They then wait up to busy_timeout for it. Deferred transactions
+# instead fail with "database is locked" when two of them read, then both try
+# to write.  SQLITE_TUNING=False keeps SQLite's defaults.
+SQLITE_TUNING = os.environ.get('SQLITE_TUNING', 'True') == 'True'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # durable with WAL; fsync at checkpoints only
+    'cache_size': -int(os.environ.get('SQLITE_CACHE_KB', '32768')),  # negative = KiB
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_BYTES', str(256 * 1024 * 1024))),
+    'temp_store': 'MEMORY',
+}
+SQLITE_OPTIONS = {
+    'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+    'transaction_mode': 'IMMEDIATE',
+}
+if SQLITE_TUNING:
+    for _db in DATABASES.values():
+        if 'sqlite3' in _db['ENGINE']:
+            _db.setdefault('OPTIONS', {}).update(SQLITE_OPTIONS)
+
+# Async views run their independent queries side by side on a thread pool
+# (core.concurrent).  Each worker thread holds its own database connection.
+CONCURRENT_QUERIES_ENABLED = os.environ.get('CONCURRENT_QUERIES_ENABLED', 'True') == 'True'
+CONCURRENT_QUERY_WORKERS = int(os.environ.get('CONCURRENT_QUERY_WORKERS', '4'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# CACHE_URL selects the backend:
+#   locmem://                 per-process memory (default; not shared by workers)
+#   file:///var/tmp/ums-cache shared by all workers on one server
+#   redis://host:6379/0       shared by every server (needs the redis package)
+
+CACHE_URL = os.environ.get('CACHE_URL', 'locmem://')
+
+if CACHE_URL.startswith(('redis://', 'rediss://', 'unix://')):
+    CACHE_BACKEND = 'django.core.cache.backends.redis.RedisCache'
+    CACHE_LOCATION = CACHE_URL
+elif CACHE_URL.startswith('file://'):
+    CACHE_BACKEND = 'django.core.cache.backends.filebased.FileBasedCache'
+    CACHE_LOCATION = CACHE_URL[len('file://'):]
+else:
+    CACHE_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+    CACHE_LOCATION = 'ums'
+
+# Whether every worker process sees the same cache.  Versioned caching
+# (core/cache_versions.py), ETags (core/conditional.py) and cached_db
+# sessions rely on it and are turned off without it.  Set CACHE_SHARED=True
+# with locmem:// only when a single process serves the site.
+CACHE_SHARED = os.environ.get(
+    'CACHE_SHARED', str(not CACHE_BACKEND.endswith('LocMemCache'))
+) == 'True'
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'ums'),
+        'TIMEOUT': int(os.environ.get('CACHE_TIMEOUT', '300')),
+    }
+}
+
+# Sessions
+# SESSION_MODE selects where sessions are kept:
+#   db              the django_session table: one query on every request
+#   cached_db       the same table with the cache in front of it; requests
+#                   read the session from the cache.  The default with a
+#                   shared cache (CACHE_SHARED): with per-process locmem a
+#                   logout would not reach the other workers' caches.
+#   signed_cookies  in the browser, signed with SECRET_KEY: no storage at all,
+#                   but the data is readable by the user and a session cannot
+#                   be revoked before it expires
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
 }
+SESSION_MODE = os.environ.get(
+    'SESSION_MODE', 'cached_db' if CACHE_SHARED else 'db'
+)
+if SESSION_MODE not in SESSION_ENGINES:
+    raise ImproperlyConfigured(f'SESSION_MODE must be one of {", ".join(SESSION_ENGINES)}, not "{SESSION_MODE}".')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+
+# Models whose changes invalidate cached dashboards and reports (see
+# core/cache_versions.py), and how long such entries may live at most.
+# Without CACHE_SHARED nothing is cached under these versions.
+CACHE_VERSIONED_MODELS = [
+    'students.Student',
+    'attendance.AttendanceRecord',
+    'fees.FeePayment',
+    'examinations.Result',
+    'timetable.Timetable',
+    'notices.Notice',
+    'departments.Department',
+    'core.UniversitySetting',
+    'courses.Course',
+    'examinations.Exam',
+    'fees.FeeStructure',
+    'archive.ArchivedFeePayment',
+]
+CACHE_VERSIONED_TIMEOUT = int(os.environ.get('CACHE_VERSIONED_TIMEOUT', '3600'))
+
+# Role sidebars are cached per role, active page and UniversitySetting
+# generation.  After a template change, shared caches (file/redis) serve the
+# old sidebar for up to this many seconds; 0 disables fragment caching.
+# Without CACHE_SHARED they live no longer than UNIVERSITY_SETTINGS_LOCAL_TTL.
+FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('FRAGMENT_CACHE_TIMEOUT', '600'))
+
+# Student pages send an ETag derived from the same generations and answer
+# 304 when nothing changed (core/conditional.py); only with CACHE_SHARED.
+# Change ETAG_SALT on deploys that change those templates, so browsers fetch
+# the new markup.
+CONDITIONAL_GET_ENABLED = os.environ.get('CONDITIONAL_GET_ENABLED', 'True') == 'True'
+ETAG_SALT = os.environ.get('ETAG_SALT', '')
 
 
 # Password validation
@@ -155,3 +345,106 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_REDIRECT_URL = 'dashboard_redirect'
 LOGOUT_REDIRECT_URL = 'login'
 LOGIN_URL = 'login'
+
+
+# Request profiling
+# Every request is logged to the 'ums.profiler' logger as one JSON line.
+# Views running more SQL queries than their budget are logged as warnings.
+# Turning the profiler off keeps measuring requests for /metrics/ unless
+# METRICS_ENABLED is off too.
+
+QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER_ENABLED', 'True') == 'True'
+QUERY_BUDGET = int(os.environ.get('QUERY_BUDGET', '50'))
+
+# Per-view overrides, keyed by dotted view path.
+QUERY_BUDGETS = {
+    'students.views.student_my_attendance': 25,
+    'fees.views.accountant_reports': 40,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        'ums.profiler': {
+            'handlers': ['console'],
+            'level': os.environ.get('PROFILER_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+        'ums.slow_queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+
+# Slow-query log
+# Queries slower than the threshold are logged to 'ums.slow_queries' with
+# their SQL, parameters, view, calling frame and EXPLAIN output.
+
+SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG_ENABLED', 'True') == 'True'
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '200'))
+SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', 'True') == 'True'
+
+
+# Prometheus metrics (served at /metrics/)
+# With several gunicorn workers set METRICS_DIR to a directory shared by all
+# of them (and emptied on every deploy) so each scrape sees every worker.
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+
+# On-demand cProfile capture (superusers add ?_profile=1 to any URL)
+
+CPU_PROFILE_DIR = os.environ.get('CPU_PROFILE_DIR', BASE_DIR / 'profiles')
+CPU_PROFILE_KEEP = int(os.environ.get('CPU_PROFILE_KEEP', '50'))
+
+
+# Request tracing (view / SQL / template / PDF spans, one JSON line per request)
+# Off by default; when on, only TRACING_SAMPLE_RATE of the requests are traced.
+# Each process writes and rotates its own file, TRACE_FILE with its pid
+# before the extension (traces.4242.jsonl); empty the directory on deploys.
+
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'False') == 'True'
+TRACING_SAMPLE_RATE = float(os.environ.get('TRACING_SAMPLE_RATE', '0.01'))
+TRACE_FILE = os.environ.get('TRACE_FILE', BASE_DIR / 'traces' / 'traces.jsonl')
+TRACE_FILE_MAX_BYTES = int(os.environ.get('TRACE_FILE_MAX_BYTES', str(10 * 1024 * 1024)))
+TRACE_FILE_BACKUPS = int(os.environ.get('TRACE_FILE_BACKUPS', '3'))
+TRACE_MAX_SPANS = int(os.environ.get('TRACE_MAX_SPANS', '2000'))
+
+
+# How long each process keeps its own copy of the UniversitySetting row before
+# checking the cache again, and how long the cached row itself lives (saves
+# invalidate both immediately in the saving process; other processes follow
+# within this many seconds).
+
+UNIVERSITY_SETTINGS_LOCAL_TTL = int(os.environ.get('UNIVERSITY_SETTINGS_LOCAL_TTL', '30'))
+
+
+# Academic calendar (core/terms.py).  Attendance, exams and fee payments are
+# filed under the term their date falls in; the year starts on the first of
+# ACADEMIC_YEAR_START_MONTH and is split into equal terms.  UniversitySetting
+# (academic_year "YYYY-YYYY", current_semester) picks the active term.
+
+ACADEMIC_YEAR_START_MONTH = int(os.environ.get('ACADEMIC_YEAR_START_MONTH', '7'))
+ACADEMIC_TERMS_PER_YEAR = int(os.environ.get('ACADEMIC_TERMS_PER_YEAR', '2'))
+if not 1 <= ACADEMIC_YEAR_START_MONTH <= 12:
+    raise ImproperlyConfigured('ACADEMIC_YEAR_START_MONTH must be a month number, 1 to 12.')
+if ACADEMIC_TERMS_PER_YEAR not in (1, 2, 3, 4, 6, 12):
+    raise ImproperlyConfigured('ACADEMIC_TERMS_PER_YEAR must divide the year into whole months.')